@@ -0,0 +1,218 @@
+import numpy as np
+
+from CardEncoding import get_card_encoding
+from DeckSource import DeckSource
+from Outcome import Outcome
+
+# Codes used for the action histories of the batch engine, see Outcome.
+# HISTORY_NAMES[code] (see Outcome) is the name of the code.
+NOT_ATTEMPTED = Outcome.NOT_ATTEMPTED
+SUCCEEDED = Outcome.SUCCEEDED
+ATTEMPTED_BUT_FAILED = Outcome.ATTEMPTED_BUT_FAILED
+
+
+def decision_table(strategy, cards, turns):
+    """
+    Builds the decision table the batch engine looks decisions up in.
+    Only strategies that are stateless by turn and card (see Strategy) are supported.
+
+    :param strategy: the strategy
+    :param cards: the card string of every card id, see CardEncoding
+    :param turns: the amount of turns per game
+    :return: returns a boolean array of shape (turns, len(cards)), True where the strategy takes its action
+    """
+    if not strategy.STATELESS_BY_TURN_AND_CARD:
+        raise ValueError("the batch engine only supports strategies that are stateless by turn and card, "
+                         + type(strategy).__name__ + " is not")
+    return np.array(strategy.turn_decision_table(cards, turns), dtype=bool).reshape(turns, len(cards))
+
+
+def simulate(numbers, player_table, dealer_table, is_king, turns, remove_drawn_cards_from_deck):
+    """
+    Plays one game per row of random numbers (see DeckSource), numbers is not modified.
+
+    :param numbers: the shuffled decks or draws
+    :param player_table: decision table of the player, see decision_table
+    :param dealer_table: decision table of the dealer, see decision_table
+    :param is_king: whether the card of every id is a king
+    :param turns: the amount of turns per game
+    :param remove_drawn_cards_from_deck: whether cards drawn are removed from the deck
+    :return: returns a tuple (player_cards, dealer_cards, player_histories, dealer_histories) of arrays
+             with shape (games, turns)
+    """
+    if remove_drawn_cards_from_deck:
+        return simulate_removed(numbers.copy(), player_table, dealer_table, is_king, turns)
+    return simulate_duplicates(numbers, player_table, dealer_table, is_king, turns)
+
+
+def simulate_removed(decks, player_table, dealer_table, is_king, turns):
+    """
+    Plays one game per row of decks with drawn cards being removed from the deck.
+    Cards are drawn from the end of a row just like LeHer pops them from the end of its deck.
+
+    :param decks: array of shape (games, deck size) with card ids, is modified
+    :param player_table: decision table of the player, see decision_table
+    :param dealer_table: decision table of the dealer, see decision_table
+    :param is_king: whether the card of every id is a king
+    :param turns: the amount of turns per game
+    :return: returns a tuple (player_cards, dealer_cards, player_histories, dealer_histories) of arrays
+             with shape (games, turns)
+    """
+    games = decks.shape[0]
+    rows = np.arange(games)
+    player_cards = np.empty((games, turns), dtype=decks.dtype)
+    dealer_cards = np.empty((games, turns), dtype=decks.dtype)
+    player_histories = np.zeros((games, turns), dtype=np.int8)
+    dealer_histories = np.zeros((games, turns), dtype=np.int8)
+    top = decks.shape[1] - 1
+    for turn in range(0, turns):
+        player_card = decks[:, top]
+        dealer_card = decks[:, top - 1]
+        top -= 2
+
+        attempts = player_table[turn, player_card]
+        failures = attempts & is_king[dealer_card]
+        successes = attempts & ~failures
+        player_histories[failures, turn] = ATTEMPTED_BUT_FAILED
+        player_histories[successes, turn] = SUCCEEDED
+        player_card, dealer_card = (np.where(successes, dealer_card, player_card),
+                                    np.where(successes, player_card, dealer_card))
+
+        attempts = dealer_table[turn, dealer_card]
+        if top < 0:
+            if attempts.any():
+                raise IndexError("the deck has no card left to redraw")
+        else:
+            next_card = decks[:, top].copy()
+            failures = attempts & is_king[next_card]
+            successes = attempts & ~failures
+            dealer_histories[failures, turn] = ATTEMPTED_BUT_FAILED
+            dealer_histories[successes, turn] = SUCCEEDED
+            decks[rows[successes], top] = dealer_card[successes]
+            dealer_card = np.where(successes, next_card, dealer_card)
+
+        player_cards[:, turn] = player_card
+        dealer_cards[:, turn] = dealer_card
+    return player_cards, dealer_cards, player_histories, dealer_histories
+
+
+def simulate_duplicates(draws, player_table, dealer_table, is_king, turns):
+    """
+    Plays one game per row of draws with drawn cards staying in the deck.
+
+    :param draws: array of shape (games, 3, turns) with card ids drawn with replacement,
+                  index 0 are the cards drawn by the player, 1 by the dealer and 2 the cards drawn by a redraw
+    :param player_table: decision table of the player, see decision_table
+    :param dealer_table: decision table of the dealer, see decision_table
+    :param is_king: whether the card of every id is a king
+    :param turns: the amount of turns per game
+    :return: returns a tuple (player_cards, dealer_cards, player_histories, dealer_histories) of arrays
+             with shape (games, turns)
+    """
+    games = draws.shape[0]
+    player_cards = np.empty((games, turns), dtype=draws.dtype)
+    dealer_cards = np.empty((games, turns), dtype=draws.dtype)
+    player_histories = np.zeros((games, turns), dtype=np.int8)
+    dealer_histories = np.zeros((games, turns), dtype=np.int8)
+    # the card the player gets next turn because of a redraw attempt of the dealer, -1 if there is none
+    next_player_card = np.full(games, -1, dtype=np.int16)
+    for turn in range(0, turns):
+        player_card = np.where(next_player_card >= 0, next_player_card, draws[:, 0, turn]).astype(draws.dtype)
+        dealer_card = draws[:, 1, turn]
+
+        attempts = player_table[turn, player_card]
+        failures = attempts & is_king[dealer_card]
+        successes = attempts & ~failures
+        player_histories[failures, turn] = ATTEMPTED_BUT_FAILED
+        player_histories[successes, turn] = SUCCEEDED
+        player_card, dealer_card = (np.where(successes, dealer_card, player_card),
+                                    np.where(successes, player_card, dealer_card))
+
+        attempts = dealer_table[turn, dealer_card]
+        new_card = draws[:, 2, turn]
+        failures = attempts & is_king[new_card]
+        successes = attempts & ~failures
+        dealer_histories[failures, turn] = ATTEMPTED_BUT_FAILED
+        dealer_histories[successes, turn] = SUCCEEDED
+        next_player_card = np.where(successes, dealer_card, np.where(failures, new_card, -1)).astype(np.int16)
+        dealer_card = np.where(successes, new_card, dealer_card)
+
+        player_cards[:, turn] = player_card
+        dealer_cards[:, turn] = dealer_card
+    return player_cards, dealer_cards, player_histories, dealer_histories
+
+
+def play_batch(games, rng, *, unshuffled_deck, scorer, player_ai, dealer_ai, remove_drawn_cards_from_deck,
+               pre_shuffled_deck=None, turns=13, batch_size=100000, include_cards=False, include_history=False,
+               deck_source=None):
+    """
+    Plays games the same way LeHer.auto_play does, but plays batch_size games at once as numpy arrays.
+    The games are the same as those of auto_play if both take them from the same DeckSource.
+    Only strategies that are stateless by turn and card are supported.
+
+    :param games: the amount of games to play
+    :param rng: the numpy Generator used for shuffling and drawing
+    :param unshuffled_deck: the deck to be used
+    :param scorer: the scorer
+    :param player_ai: the player AI
+    :param dealer_ai: the dealer AI
+    :param remove_drawn_cards_from_deck: whether cards drawn should be removed from the deck
+    :param pre_shuffled_deck: the deck to be used for every game instead of a shuffled version of the unshuffled deck
+    :param turns: the amount of turns per game
+    :param batch_size: the amount of games simulated at once
+    :param include_cards: whether the cards in hand at the end of the game are part of the return dictionary
+    :param include_history: whether the attempted actions are part of the return dictionary
+    :param deck_source: the DeckSource the games are taken from, a new one using rng by default
+    :return: returns a dictionary with the same keys as get_results in DataProcessing.
+             Scores are int arrays of shape (games,).
+             Cards are arrays of shape (games, turns) with indices into the list stored under the key 'card_names'.
+             Histories are arrays of shape (games, turns) with the codes of this module.
+             Decks are never included.
+    """
+    card_encoding = get_card_encoding(unshuffled_deck, scorer, pre_shuffled_deck or ())
+    cards = card_encoding.cards
+    deck_ids = card_encoding.deck_array
+    scores = card_encoding.score_array
+    is_king = card_encoding.is_king_array
+    player_table = decision_table(player_ai, cards, turns)
+    dealer_table = decision_table(dealer_ai, cards, turns)
+    if pre_shuffled_deck is not None:
+        pre_shuffled_ids = np.array(card_encoding.encode(pre_shuffled_deck), dtype=card_encoding.id_dtype)
+    elif deck_source is None:
+        deck_source = DeckSource(deck_ids, turns, remove_drawn_cards_from_deck, rng, block_size=batch_size)
+
+    results = {
+        "player_scores": [],
+        "dealer_scores": [],
+        "player_cards": [] if include_cards else None,
+        "dealer_cards": [] if include_cards else None,
+        "player_histories": [] if include_history else None,
+        "dealer_histories": [] if include_history else None,
+        "decks": None
+    }
+    played = 0
+    while played < games:
+        current_batch = min(batch_size, games - played)
+        if pre_shuffled_deck is not None:
+            decks = np.tile(pre_shuffled_ids, (current_batch, 1))
+            batch = simulate_removed(decks, player_table, dealer_table, is_king, turns)
+        elif remove_drawn_cards_from_deck:
+            batch = simulate_removed(deck_source.take(current_batch), player_table, dealer_table, is_king, turns)
+        else:
+            batch = simulate_duplicates(deck_source.take(current_batch), player_table, dealer_table, is_king, turns)
+        player_cards, dealer_cards, player_histories, dealer_histories = batch
+        results["player_scores"].append(scores[player_cards].sum(axis=1))
+        results["dealer_scores"].append(scores[dealer_cards].sum(axis=1))
+        if include_cards:
+            results["player_cards"].append(player_cards)
+            results["dealer_cards"].append(dealer_cards)
+        if include_history:
+            results["player_histories"].append(player_histories)
+            results["dealer_histories"].append(dealer_histories)
+        played += current_batch
+
+    for key, value in results.items():
+        if value is not None:
+            results[key] = np.concatenate(value) if value else np.zeros(0, dtype=np.int32)
+    results["card_names"] = cards
+    return results
@@ -0,0 +1,358 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+import BatchSimulation
+import DataProcessing
+from CardEncoding import get_card_encoding
+from DeckSource import DeckSource
+from Decks import STANDARD_DECK
+from LeHer import LeHer
+from Scorer import standard_scorer
+from Strategies import KeepNAndAbove
+
+# the amount of games (or sizes) every benchmark uses, "full" matches the sizes of the long running sweeps
+SCALES = {
+    "quick": {
+        "auto_play_games": 20000,
+        "batch_play_games": 10 ** 6,
+        "logger_games": 20000,
+        "results_games": [10 ** 4, 10 ** 5],
+        "results_games_log_all": [10 ** 4],
+        "tournament_games": 20000
+    },
+    "full": {
+        "auto_play_games": 10 ** 6,
+        "batch_play_games": 10 ** 7,
+        "logger_games": 10 ** 6,
+        "results_games": [10 ** 5, 10 ** 6, 10 ** 7],
+        "results_games_log_all": [10 ** 5, 10 ** 6],
+        "tournament_games": 10 ** 6
+    }
+}
+LOG_FORMATS = ("json", "jsonl", "jsonl.gz", "binary")
+# the logger auto_play uses for every log format, see make_logger
+LOGGER_NAMES = {"json": "StaggeredLogger", "jsonl": "StreamingLogger", "jsonl.gz": "BackgroundLogger",
+                "binary": "BinaryLogger"}
+# the baseline the results are compared against by default
+DEFAULT_BASELINE = str(Path(__file__).parent) + "/benchmarks/baseline.json"
+# games are generated and logged in chunks of this size, so only the loggers keep games in memory
+SAMPLE_CHUNK_SIZE = 100000
+
+
+def higher_is_better(metric):
+    """
+    :param metric: the name of a metric
+    :return: returns whether a higher value of the metric is better (rates) or a lower value (times, memory)
+    """
+    return metric.endswith("_per_second")
+
+
+def best_time(function, repeat):
+    """
+    :param function: the function to time, called without arguments
+    :param repeat: how often the function is timed
+    :return: returns the shortest wall time in seconds, the least disturbed by other processes
+    """
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+
+def iter_sample_games(games, log_all=True, rng_seed=0):
+    """
+    Yields the keyword arguments of add_game (see StaggeredLogger in DataProcessing) of games played by the
+    batch engine with drawn cards removed from the deck, so loggers and readers can be benchmarked without
+    timing the engine.
+
+    :param games: the amount of games
+    :param log_all: whether everything is yielded or only the scores
+    :param rng_seed: the rng seed
+    """
+    card_encoding = get_card_encoding(STANDARD_DECK, standard_scorer)
+    cards = np.array(card_encoding.cards)
+    player_table = BatchSimulation.decision_table(KeepNAndAbove(n=8, is_player=True), card_encoding.cards, 13)
+    dealer_table = BatchSimulation.decision_table(KeepNAndAbove(n=8, is_player=False), card_encoding.cards, 13)
+    deck_source = DeckSource(card_encoding.deck_array, 13, True, np.random.default_rng(rng_seed),
+                             block_size=SAMPLE_CHUNK_SIZE)
+    played = 0
+    while played < games:
+        current_chunk = min(SAMPLE_CHUNK_SIZE, games - played)
+        decks = deck_source.take(current_chunk)
+        player_cards, dealer_cards, player_histories, dealer_histories = BatchSimulation.simulate(
+            decks, player_table, dealer_table, card_encoding.is_king_array, 13, True)
+        player_scores = card_encoding.score_array[player_cards].sum(axis=1).tolist()
+        dealer_scores = card_encoding.score_array[dealer_cards].sum(axis=1).tolist()
+        if not log_all:
+            for player_score, dealer_score in zip(player_scores, dealer_scores):
+                yield {"player_score": player_score, "dealer_score": dealer_score}
+        else:
+            for game in zip(player_scores, dealer_scores, cards[player_cards].tolist(),
+                            cards[dealer_cards].tolist(), player_histories.tolist(), dealer_histories.tolist(),
+                            cards[decks].tolist()):
+                yield dict(zip(["player_score", "dealer_score", "player_cards", "dealer_cards", "player_history",
+                                "dealer_history", "deck_to_start_of_game"], game))
+        played += current_chunk
+
+
+def make_logger(log_format, output_folder, file_name, log_all):
+    """
+    :param log_format: the format of the log file, see auto_play in LeHer
+    :param output_folder: the folder of the log file
+    :param file_name: the name of the log file with extension
+    :param log_all: whether everything is logged or only the scores
+    :return: returns the logger auto_play uses for the format
+    """
+    if log_format == "jsonl":
+        return DataProcessing.StreamingLogger(output_folder, file_name)
+    if log_format == "jsonl.gz":
+        return DataProcessing.BackgroundLogger(output_folder, file_name)
+    if log_format == "binary":
+        card_encoding = get_card_encoding(STANDARD_DECK, standard_scorer)
+        return DataProcessing.BinaryLogger(output_folder, file_name, cards=card_encoding.cards, turns=13,
+                                           deck_size=len(STANDARD_DECK), log_all=log_all)
+    return DataProcessing.StaggeredLogger(output_folder, file_name)
+
+
+def write_sample_log(log_format, output_folder, file_name, games, log_all):
+    """
+    Writes a log file of sample games (see iter_sample_games) like auto_play would.
+    Json logs are written game by game instead of with StaggeredLogger, so large logs fit into memory.
+    """
+    if log_format != "json":
+        logger = make_logger(log_format, output_folder, file_name, log_all)
+        for game in iter_sample_games(games, log_all):
+            logger.add_game(**game)
+        logger.log_staggered_games()
+        return
+    os.makedirs(output_folder, exist_ok=True)
+    with open(output_folder + file_name, "w") as data_file:
+        data_file.write('{"games": [')
+        for game_id, game in enumerate(iter_sample_games(games, log_all)):
+            if game_id:
+                data_file.write(", ")
+            data_file.write(json.dumps(DataProcessing.game_dictionary(game_id, **game)))
+        data_file.write("]}")
+
+
+def benchmark_auto_play(settings, repeat, output_folder):
+    """
+    Games per second of auto_play (json log) and auto_play_statistics in both deck modes,
+    with LOG_ALL on and off.
+    """
+    games = settings["auto_play_games"]
+    results = {}
+    for remove in [True, False]:
+        mode = "remove" if remove else "dupe"
+        for log_all in [False, True]:
+            name = "auto_play " + mode + (" LOG_ALL" if log_all else "")
+
+            def run():
+                game = LeHer(RNG_SEED=0)
+                game.auto_play(games, output_folder, name, remove, SILENT_MODE=True, LOG_ALL=log_all)
+                os.remove(output_folder + name + ".json")
+
+            results[name] = {"games_per_second": games / best_time(run, repeat)}
+        name = "auto_play_statistics " + mode
+        seconds = best_time(lambda: LeHer(RNG_SEED=0).auto_play_statistics(games, remove, SILENT_MODE=True), repeat)
+        results[name] = {"games_per_second": games / seconds}
+    return results
+
+
+def benchmark_batch_play(settings, repeat, output_folder):
+    """
+    Games per second of batch_play_statistics in both deck modes.
+    """
+    games = settings["batch_play_games"]
+    results = {}
+    for remove in [True, False]:
+        seconds = best_time(lambda: LeHer(RNG_SEED=0).batch_play_statistics(games, remove), repeat)
+        results["batch_play_statistics " + ("remove" if remove else "dupe")] = {"games_per_second": games / seconds}
+    return results
+
+
+def benchmark_loggers(settings, repeat, output_folder):
+    """
+    Games per second and peak memory (traced python allocations) of logging LOG_ALL games with every logger,
+    including writing the file.
+    """
+    games = list(iter_sample_games(settings["logger_games"]))
+    results = {}
+    for log_format in LOG_FORMATS:
+        file_name = DataProcessing.with_log_extension("logger", log_format)
+
+        def run():
+            logger = make_logger(log_format, output_folder, file_name, True)
+            for game in games:
+                logger.add_game(**game)
+            logger.log_staggered_games()
+            os.remove(output_folder + file_name)
+
+        games_per_second = len(games) / best_time(run, repeat)
+        tracemalloc.start()
+        run()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[LOGGER_NAMES[log_format]] = {"games_per_second": games_per_second, "peak_bytes": peak_bytes}
+    return results
+
+
+def benchmark_get_results(settings, repeat, output_folder):
+    """
+    Seconds get_results takes to load the scores (and everything for logs with LOG_ALL) of logs of every format
+    and size.
+    """
+    results = {}
+    for log_all, sizes in [(False, settings["results_games"]), (True, settings["results_games_log_all"])]:
+        for games in sizes:
+            for log_format in LOG_FORMATS:
+                name = "get_results " + log_format + " " + str(games) + (" LOG_ALL" if log_all else "")
+                file_name = DataProcessing.with_log_extension("results", log_format)
+                write_sample_log(log_format, output_folder, file_name, games, log_all)
+                results[name] = {"scores_seconds": best_time(
+                    lambda: DataProcessing.get_results(output_folder, file_name), repeat)}
+                if log_all:
+                    results[name]["all_seconds"] = best_time(
+                        lambda: DataProcessing.get_results(output_folder, file_name, include_cards=True,
+                                                           include_deck=True, include_history=True), repeat)
+                os.remove(output_folder + file_name)
+    return results
+
+
+def benchmark_tournament(settings, repeat, output_folder):
+    """
+    Wall time of a 3 x 3 tournament grid in one process with the batch engine and with auto_play_statistics.
+    """
+    from Main import tournament
+
+    player_strategies = [(KeepNAndAbove(n=n, is_player=True), "keep " + str(n)) for n in [7, 8, 9]]
+    dealer_strategies = [(KeepNAndAbove(n=n, is_player=False), "keep " + str(n)) for n in [7, 8, 9]]
+    results = {}
+    for use_batch_engine in [True, False]:
+        def run():
+            # tournament prints the result matrices
+            with contextlib.redirect_stdout(io.StringIO()):
+                tournament(player_strategies, dealer_strategies, output_folder, REMOVE_DRAWN_CARDS_FROM_DECK=True,
+                           GAMES_TO_AUTOPLAY=settings["tournament_games"], OUTPUT_FOLDER="tournament/",
+                           USE_BATCH_ENGINE=use_batch_engine, RNG_SEED=0, LOG_GAMES=False)
+
+        name = "tournament 3x3 " + ("batch_play" if use_batch_engine else "auto_play_statistics")
+        results[name] = {"seconds": best_time(run, repeat)}
+    return results
+
+
+BENCHMARKS = {
+    "auto_play": benchmark_auto_play,
+    "batch_play": benchmark_batch_play,
+    "loggers": benchmark_loggers,
+    "get_results": benchmark_get_results,
+    "tournament": benchmark_tournament
+}
+
+
+def run_benchmarks(scale="quick", benchmarks=None, repeat=3, settings=None):
+    """
+    Runs the benchmarks in a temporary folder.
+
+    :param scale: the scale of the benchmarks, see SCALES
+    :param benchmarks: the names of the benchmarks to run (keys of BENCHMARKS), None runs all of them
+    :param repeat: how often every measurement is repeated, the best one is kept
+    :param settings: overrides single settings of the scale
+    :return: returns a json serializable dictionary with the scale, the machine ('machine')
+             and the metrics of every measurement ('results', name -> metric -> value)
+    """
+    current_settings = dict(SCALES[scale])
+    current_settings.update(settings or {})
+    results = {}
+    with tempfile.TemporaryDirectory() as output_folder:
+        for name in benchmarks or BENCHMARKS:
+            results.update(BENCHMARKS[name](current_settings, repeat, output_folder + "/"))
+    return {
+        "scale": scale,
+        "machine": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count()
+        },
+        "results": results
+    }
+
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    Compares every metric measured in both runs.
+
+    :param results: the results of run_benchmarks
+    :param baseline: earlier results of run_benchmarks at the same scale
+    :param tolerance: the relative change of a metric (in its worse direction) that counts as regression
+    :return: returns a list of tuples (name, metric, baseline value, value, relative change, regressed)
+             where a positive relative change is an improvement
+    """
+    if results["scale"] != baseline["scale"]:
+        raise ValueError("cannot compare scale " + results["scale"] + " to a baseline of scale " + baseline["scale"])
+    comparisons = []
+    for name, metrics in results["results"].items():
+        for metric, value in metrics.items():
+            baseline_value = baseline["results"].get(name, {}).get(metric)
+            if not baseline_value:
+                continue
+            change = (value - baseline_value) / baseline_value
+            if not higher_is_better(metric):
+                change = -change
+            comparisons.append((name, metric, baseline_value, value, change, change < -tolerance))
+    return comparisons
+
+
+def format_comparisons(comparisons):
+    """
+    :param comparisons: the comparisons, see compare
+    :return: returns a table of the comparisons as string, regressions are marked
+    """
+    lines = []
+    for name, metric, baseline_value, value, change, regressed in comparisons:
+        lines.append("{:<45} {:<17} {:>14.6g} {:>14.6g} {:>+8.1%}{}".format(
+            name, metric, baseline_value, value, change, "  REGRESSION" if regressed else ""))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser("benchmark", description="Benchmarks the engines, loggers and get_results. "
+                                                              "The results are compared against a baseline, "
+                                                              "exits with 1 if any metric regressed.")
+    parser.add_argument("--scale", choices=list(SCALES), default="quick")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="the benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=3, help="how often every measurement is repeated")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="the baseline json file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="the relative change that counts as regression")
+    parser.add_argument("--output", help="also saves the results to this json file")
+    parser.add_argument("--save-baseline", action="store_true", help="saves the results as the new baseline")
+    args = parser.parse_args()
+
+    current_results = run_benchmarks(args.scale, args.only, args.repeat)
+    for path in [args.output, args.baseline if args.save_baseline else None]:
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "w") as results_file:
+                json.dump(current_results, results_file, indent=2)
+    if args.save_baseline or not os.path.exists(args.baseline):
+        print(json.dumps(current_results["results"], indent=2))
+        exit(0)
+    with open(args.baseline) as baseline_file:
+        current_comparisons = compare(current_results, json.load(baseline_file), args.tolerance)
+    print(format_comparisons(current_comparisons))
+    exit(1 if any(comparison[-1] for comparison in current_comparisons) else 0)
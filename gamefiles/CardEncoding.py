@@ -0,0 +1,111 @@
+import functools
+
+import numpy as np
+
+from Scorer import standard_scorer
+
+
+class CardEncoding:
+    """
+    Maps the cards of a deck to small integer ids and precomputes everything the engine needs to know about a card.
+
+    Every distinct card gets an id in order of first appearance (deck first, then the extra cards).
+    The lookup lists (and numpy arrays for vectorized code) are indexed by id,
+    so the engine never has to look at the card strings while playing.
+    Card strings are only needed at the boundaries (strategies, logging and the gui), see encode and decode.
+    """
+
+    def __init__(self, deck, scorer=standard_scorer, extra_cards=()):
+        """
+        :param deck: the deck (list of card strings)
+        :param scorer: the scorer
+        :param extra_cards: cards that need an id without being part of the deck (e.g. a pre shuffled deck)
+        """
+        self.cards = []
+        self.ids = {}
+        for card in list(deck) + list(extra_cards):
+            if card not in self.ids:
+                self.ids[card] = len(self.cards)
+                self.cards.append(card)
+        self.deck = [self.ids[card] for card in deck]
+        self.ranks = [card[:-1] for card in self.cards]
+        self.scores = [scorer(card) for card in self.cards]
+        self.is_king = [card[0] == "K" for card in self.cards]
+
+        self.id_dtype = np.int8 if len(self.cards) < 128 else np.int16
+        self.deck_array = np.array(self.deck, dtype=self.id_dtype)
+        self.score_array = np.array(self.scores, dtype=np.int32)
+        self.is_king_array = np.array(self.is_king, dtype=bool)
+
+    def encode(self, cards):
+        """
+        :param cards: list of card strings
+        :return: returns the list of ids of the cards
+        """
+        ids = self.ids
+        return [ids[card] for card in cards]
+
+    def decode(self, card_ids):
+        """
+        :param card_ids: iterable of card ids
+        :return: returns the list of card strings of the ids
+        """
+        cards = self.cards
+        return [cards[card_id] for card_id in card_ids]
+
+
+@functools.lru_cache(maxsize=64)
+def cached_card_encoding(deck, scorer, extra_cards):
+    return CardEncoding(deck, scorer, extra_cards)
+
+
+def get_card_encoding(deck, scorer=standard_scorer, extra_cards=()):
+    """
+    Returns the CardEncoding of a deck and scorer.
+    Encodings are cached, so every combination of deck, scorer and extra cards is only built once.
+
+    :param deck: the deck (list of card strings)
+    :param scorer: the scorer
+    :param extra_cards: cards that need an id without being part of the deck (e.g. a pre shuffled deck)
+    :return: returns the CardEncoding
+    """
+    return cached_card_encoding(tuple(deck), scorer, tuple(extra_cards or ()))
+
+
+class CodeView:
+    """
+    A read only list of values backed by a list of codes, e.g. card ids and their card strings
+    or history codes and their Outcomes.
+    Used to show the state of the engine to strategies without converting every code.
+    Only the first length codes are part of the view, so the engine can reuse a list of fixed size.
+    """
+
+    __slots__ = ("codes", "names", "length")
+
+    def __init__(self, codes, names, length=None):
+        """
+        :param codes: the list of codes, changes to it are visible through the view
+        :param names: the value of every code
+        :param length: the amount of codes that are part of the view, all by default
+        """
+        self.codes = codes
+        self.names = names
+        self.length = length
+
+    def __getitem__(self, index):
+        length = len(self)
+        if isinstance(index, slice):
+            return [self.names[self.codes[i]] for i in range(*index.indices(length))]
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("view index out of range")
+        return self.names[self.codes[index]]
+
+    def __len__(self):
+        return len(self.codes) if self.length is None else self.length
+
+    def __iter__(self):
+        names = self.names
+        codes = self.codes
+        return (names[codes[i]] for i in range(0, len(self)))
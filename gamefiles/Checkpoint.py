@@ -0,0 +1,70 @@
+import json
+import os
+
+# increased whenever the saved state changes, checkpoints of older versions are not resumed
+# (version 2 added the score difference histogram to the saved GameStatistics)
+CHECKPOINT_VERSION = 2
+
+
+class Checkpoint:
+    """
+    A json file with the state of a run of games (e.g. auto_play), so an interrupted run can be resumed.
+
+    The state is saved every every_games games and once the run is finished.
+    A saved state consists of the amount of games played, the state of the random stream (see get_random_state in LeHer)
+    and what the run accumulated so far (aggregates or the position of the end of the log file).
+    A resumed run continues from the last saved state and ends with the same results as an uninterrupted run.
+    Strategies are assumed to not keep any state between games besides caches and their random numbers,
+    which are part of the random state (see get_random_state in Strategy).
+
+    The file is written to a temporary file first and then replaces the old file,
+    so a crash while saving leaves the previous state intact.
+    """
+
+    def __init__(self, file_path, every_games=100000):
+        """
+        :param file_path: the path of the checkpoint file, its folder is created if missing
+        :param every_games: save the state every this many games
+        """
+        self.file_path = file_path
+        self.every_games = every_games
+
+    def next_save(self, games, total_games):
+        """
+        :param games: the amount of games played
+        :param total_games: the amount of games of the run
+        :return: returns the amount of games after which the state is saved next
+        """
+        return min(games + self.every_games, total_games)
+
+    def load(self, run):
+        """
+        :param run: json serializable description of the run, a saved state of another run is not resumed
+        :return: returns the saved state (see save) or None if there is none
+        """
+        if not os.path.exists(self.file_path):
+            return None
+        with open(self.file_path) as checkpoint_file:
+            data = json.load(checkpoint_file)
+        # json turns tuples into lists, so the run is compared the way it was saved
+        if data["version"] != CHECKPOINT_VERSION or data["run"] != json.loads(json.dumps(run)):
+            raise ValueError(self.file_path + " is a checkpoint of a different run")
+        return data
+
+    def save(self, run, games, finished, **state):
+        """
+        :param run: json serializable description of the run
+        :param games: the amount of games played
+        :param finished: whether the run is finished
+        :param state: the json serializable state of the run
+        """
+        folder = os.path.dirname(self.file_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        data = {"version": CHECKPOINT_VERSION, "run": run, "games": games, "finished": finished, **state}
+        temporary_path = self.file_path + ".tmp"
+        with open(temporary_path, "w") as checkpoint_file:
+            json.dump(data, checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temporary_path, self.file_path)
@@ -0,0 +1,235 @@
+import argparse
+import os
+import sys
+
+# Every command imports what it needs when it runs, so the parser starts without numpy and Qt is only
+# loaded by the gui command.
+
+# the log formats of simulate and tournament, "none" only keeps running aggregates (see auto_play_statistics)
+LOG_FORMATS = ("json", "jsonl", "jsonl.gz", "binary", "none")
+# the AIs of a tournament if none are given
+DEFAULT_TOURNAMENT_STRATEGIES = ("keep:7", "keep:8", "keep:9")
+# the amount of turns of the games played by the commands, the most thresholds a 'turns:' strategy can have
+TURNS_PER_GAME = 13
+# the values of a summary (see tournament_summary in Main) shown for a run
+SUMMARY_KEYS = ("games", "win_rate", "win_rate_ci", "draw_rate", "dealer_win_rate", "net_win_rate", "net_win_rate_ci",
+                "mean_margin", "mean_margin_ci", "margin_std")
+
+
+def parse_strategy(specification, is_player):
+    """
+    Creates a strategy from its command line specification:
+    'keep:N' for KeepNAndAbove with threshold N and 'turns:N1,N2,...' for KeepNAndAbovePerTurn
+    with a threshold per turn (1 to TURNS_PER_GAME thresholds).
+
+    :param specification: the specification
+    :param is_player: whether the strategy is used by the player
+    :return: returns a tuple (strategy, name) like the strategies of tournament in Main
+    """
+    from Strategies import KeepNAndAbove, KeepNAndAbovePerTurn
+
+    kind, _, value = specification.partition(":")
+    try:
+        if kind == "keep":
+            return KeepNAndAbove(n=int(value), is_player=is_player), "keep " + value + " and above"
+        if kind == "turns":
+            thresholds = [int(threshold) for threshold in value.split(",")]
+            if len(thresholds) > TURNS_PER_GAME:
+                raise argparse.ArgumentTypeError("invalid strategy " + specification + ", at most "
+                                                 + str(TURNS_PER_GAME) + " thresholds")
+            return KeepNAndAbovePerTurn(thresholds, is_player=is_player), "keep per turn " + value
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError("invalid strategy " + specification + ", use keep:N or turns:N1,N2,...")
+
+
+def player_strategy(specification):
+    return parse_strategy(specification, True)
+
+
+def dealer_strategy(specification):
+    return parse_strategy(specification, False)
+
+
+def folder(path):
+    """
+    :param path: a folder
+    :return: returns the folder with a trailing slash, the output folders are joined with file names
+    """
+    return os.path.join(path, "")
+
+
+def print_summary(summary, file=None):
+    """
+    Prints the values of every cell of a summary (see tournament_summary in Main) as a row of a table.
+
+    :param summary: the summary
+    :param file: the stream the table is written to, sys.stdout by default
+    """
+    file = file or sys.stdout
+    print("\t".join(["player_strategy", "dealer_strategy"] + list(SUMMARY_KEYS)), file=file)
+    for i, player_name in enumerate(summary["player_strategies"].tolist()):
+        for j, dealer_name in enumerate(summary["dealer_strategies"].tolist()):
+            values = [summary[key][i, j].item() for key in SUMMARY_KEYS]
+            print("\t".join([player_name, dealer_name] + [str(value) if isinstance(value, int) else
+                                                          "{:.6f}".format(value) for value in values]), file=file)
+
+
+def simulate(args):
+    """
+    Plays games of one player AI against one dealer AI, optionally logs them and prints a summary of the results.
+    """
+    from Checkpoint import Checkpoint
+    from LeHer import LeHer
+    from Main import tournament_summary
+    from Progress import ProgressReporter, ConsoleOutput, JsonLineOutput
+    from Statistics import GameStatistics
+
+    (player_ai, player_name), (dealer_ai, dealer_name) = args.player, args.dealer
+    game = LeHer(PLAYER_AI=player_ai, DEALER_AI=dealer_ai, RNG_SEED=args.seed)
+    progress = None
+    if args.progress == "console":
+        progress = ProgressReporter([ConsoleOutput(sys.stderr)])
+    elif args.progress == "json":
+        progress = ProgressReporter([JsonLineOutput(sys.stderr, player=player_name, dealer=dealer_name)])
+    checkpoint = None if args.checkpoint is None else Checkpoint(args.checkpoint, args.checkpoint_every)
+    if args.engine == "batch":
+        statistics = game.batch_play_statistics(args.games, args.remove, CHECKPOINT=checkpoint)
+    elif args.format == "none":
+        statistics = game.auto_play_statistics(args.games, args.remove, SILENT_MODE=True, PROGRESS=progress,
+                                               CHECKPOINT=checkpoint)
+    else:
+        results = game.auto_play(args.games, args.output, args.name, args.remove, SILENT_MODE=True,
+                                 LOG_ALL=args.log_all, LOG_FORMAT=args.format, PROGRESS=progress,
+                                 CHECKPOINT=checkpoint)
+        statistics = GameStatistics(game.TURNS_PER_GAME)
+        statistics.add_batch(results["player_scores"], results["dealer_scores"])
+    print_summary(tournament_summary([player_name], [dealer_name], [[statistics]], args.confidence))
+
+
+def tournament(args):
+    """
+    Plays a tournament of every player AI against every dealer AI, see tournament in Main.
+    """
+    from Main import tournament as play_tournament
+
+    player_strategies = args.player or [player_strategy(spec) for spec in DEFAULT_TOURNAMENT_STRATEGIES]
+    dealer_strategies = args.dealer or [dealer_strategy(spec) for spec in DEFAULT_TOURNAMENT_STRATEGIES]
+    play_tournament(player_strategies, dealer_strategies, "", REMOVE_DRAWN_CARDS_FROM_DECK=args.remove,
+                    GAMES_TO_AUTOPLAY=args.games, OUTPUT_FOLDER=args.output, USE_BATCH_ENGINE=args.engine == "batch",
+                    WORKERS=args.workers or None, GAMES_PER_CHUNK=args.chunk, RNG_SEED=args.seed,
+                    LOG_FORMAT="jsonl" if args.format == "none" else args.format, LOG_GAMES=args.format != "none",
+                    CHECKPOINT_FOLDER=args.checkpoint_folder, CHECKPOINT_EVERY=args.checkpoint_every)
+
+
+def analyze(args):
+    """
+    Prints the summary of a tournament folder (see save_tournament_summary in Main) or of the games of a log file.
+    """
+    from Main import load_tournament_summary, tournament_summary
+
+    if os.path.isdir(args.path):
+        print_summary(load_tournament_summary(folder(args.path)))
+        return
+    import DataProcessing
+    from Statistics import GameStatistics
+
+    statistics = GameStatistics()
+    where = {"all": None, "won": DataProcessing.player_won, "lost": DataProcessing.player_lost,
+             "draw": DataProcessing.is_draw}[args.where]
+    output_folder, file_name = os.path.split(args.path)
+    for chunk in DataProcessing.iter_game_chunks(folder(output_folder), file_name, ["player_score", "dealer_score"],
+                                                 id_range=None if args.range is None else tuple(args.range),
+                                                 where=where):
+        statistics.add_batch(chunk["player_score"], chunk["dealer_score"])
+    print_summary(tournament_summary(["player"], ["dealer"], [[statistics]], args.confidence))
+
+
+def gui(args):
+    """
+    Starts the GUI.
+    """
+    from GUI import GUI
+
+    GUI(folder(os.path.dirname(os.path.abspath(__file__))), gui_language=args.language)
+
+
+def build_parser():
+    """
+    :return: returns the argument parser of the command line interface
+    """
+    parser = argparse.ArgumentParser("leher", description="Plays and analyzes games of LeHer without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_game_arguments(command):
+        command.add_argument("--games", type=int, default=100000, help="the amount of games (per matchup)")
+        command.add_argument("--remove", action="store_true", help="removes drawn cards from the deck")
+        command.add_argument("--seed", type=int, help="the rng seed, random if not given")
+        command.add_argument("--engine", choices=["auto", "batch"], default="auto",
+                             help="batch plays the games with the vectorized engine (only aggregates are kept)")
+        command.add_argument("--format", choices=LOG_FORMATS, default="jsonl",
+                             help="the log format, none to not log the games")
+        command.add_argument("--output", type=folder, default="output/", help="the folder of the logs")
+        command.add_argument("--checkpoint-every", type=int, default=1000000,
+                             help="the amount of games between two checkpoints")
+
+    simulate_command = commands.add_parser("simulate", help="plays games of one matchup")
+    simulate_command.add_argument("--player", type=player_strategy, default="keep:8",
+                                  help="the player AI, keep:N or turns:N1,N2,...")
+    simulate_command.add_argument("--dealer", type=dealer_strategy, default="keep:8",
+                                  help="the dealer AI, keep:N or turns:N1,N2,...")
+    add_game_arguments(simulate_command)
+    simulate_command.add_argument("--name", default="simulation", help="the name of the log file")
+    simulate_command.add_argument("--log-all", action="store_true", help="logs everything, not only the scores")
+    simulate_command.add_argument("--progress", choices=["console", "json", "none"], default="none",
+                                  help="reports the progress to stderr")
+    simulate_command.add_argument("--checkpoint", help="the checkpoint file the run is saved to and resumed from")
+    simulate_command.add_argument("--confidence", type=float, default=0.95,
+                                  help="the confidence level of the intervals")
+    simulate_command.set_defaults(function=simulate)
+
+    tournament_command = commands.add_parser("tournament", help="plays every player AI against every dealer AI")
+    tournament_command.add_argument("--player", type=player_strategy, nargs="+",
+                                    help="the player AIs, keep 7, 8 and 9 and above by default")
+    tournament_command.add_argument("--dealer", type=dealer_strategy, nargs="+",
+                                    help="the dealer AIs, keep 7, 8 and 9 and above by default")
+    add_game_arguments(tournament_command)
+    tournament_command.add_argument("--workers", type=int, default=1,
+                                    help="the amount of worker processes, 0 for one per cpu core")
+    tournament_command.add_argument("--chunk", type=int, help="the maximum amount of games per chunk")
+    tournament_command.add_argument("--checkpoint-folder", type=folder,
+                                    help="the folder of the checkpoint files of the chunks")
+    tournament_command.set_defaults(function=tournament)
+
+    analyze_command = commands.add_parser("analyze", help="summarizes a tournament folder or a log file")
+    analyze_command.add_argument("path", help="a folder with results.npz or a log file")
+    analyze_command.add_argument("--range", type=int, nargs=2, metavar=("START", "STOP"),
+                                 help="only the games with ids from START to STOP (exclusive)")
+    analyze_command.add_argument("--where", choices=["all", "won", "lost", "draw"], default="all",
+                                 help="only the games the player won, lost or drew")
+    analyze_command.add_argument("--confidence", type=float, default=0.95,
+                                 help="the confidence level of the intervals")
+    analyze_command.set_defaults(function=analyze)
+
+    gui_command = commands.add_parser("gui", help="starts the GUI")
+    gui_command.add_argument("language", nargs="?", default="GER", help="the language, EN or GER")
+    gui_command.set_defaults(function=gui)
+    return parser
+
+
+def main(argv=None):
+    """
+    :param argv: the arguments, sys.argv by default
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # invalid settings only found while running (e.g. too few thresholds or a log of another run) are reported
+    # like invalid arguments instead of as a traceback
+    try:
+        args.function(args)
+    except ValueError as error:
+        parser.error(str(error))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import numpy as np
+
+from Decks import STANDARD_DECK
+from Scorer import standard_scorer
+import BatchSimulation
+from CardEncoding import get_card_encoding
+from DeckSource import DeckSource
+from LeHer import LeHer
+from Statistics import GameStatistics, confidence_half_width
+
+
+def matchup_grid(player_ais, dealer_ais):
+    """
+    :param player_ais: the player AIs
+    :param dealer_ais: the dealer AIs
+    :return: returns a (player AI, dealer AI) tuple for every combination, the dealer AI changing fastest
+    """
+    return [(player_ai, dealer_ai) for player_ai in player_ais for dealer_ai in dealer_ais]
+
+
+def compare_matchups(matchups, games, REMOVE_DRAWN_CARDS_FROM_DECK, *, rng_seed=None, unshuffled_deck=STANDARD_DECK,
+                     scorer=standard_scorer, turns=13, batch_size=100000, confidence=0.95, deck_source=None):
+    """
+    Plays every matchup on the same shuffled decks (or the same draws if drawn cards are not removed from the deck),
+    so the differences between two matchups only come from the strategies and not from the cards
+    (common random numbers).
+    Because the outcomes of two matchups are positively correlated game by game, the confidence interval of their
+    paired difference is usually much narrower than that of two independently played matchups.
+
+    Matchups of strategies that are stateless by turn and card are played by the batch engine,
+    all others by LeHer replaying the same random numbers (see play_game), both play the same games.
+
+    :param matchups: list of (player AI, dealer AI) tuples, see matchup_grid
+    :param games: the amount of games played per matchup
+    :param REMOVE_DRAWN_CARDS_FROM_DECK: whether cards drawn should be removed from the deck
+    :param rng_seed: the rng seed
+    :param unshuffled_deck: the deck to be used
+    :param scorer: the scorer
+    :param turns: the amount of turns per game
+    :param batch_size: the amount of games played per matchup at once
+    :param confidence: the confidence level of the intervals
+    :param deck_source: the DeckSource the games are taken from, a new one seeded with rng_seed by default
+    :return: returns a dictionary with a GameStatistics (see Statistics) of every matchup ('statistics'),
+             the paired differences of the net win rate of the player (see GameStatistics) between every two matchups
+             (numpy array 'differences', row minus column), the half widths of their confidence intervals
+             (numpy array 'half_widths') and the amount of games played per matchup ('games')
+    """
+    card_encoding = get_card_encoding(unshuffled_deck, scorer)
+    is_king = card_encoding.is_king_array
+    scores = card_encoding.score_array
+    if deck_source is None:
+        deck_source = DeckSource(card_encoding.deck_array, turns, REMOVE_DRAWN_CARDS_FROM_DECK,
+                                 np.random.default_rng(rng_seed), block_size=batch_size)
+    statistics = [GameStatistics(turns) for _ in matchups]
+    engines = []
+    for player_ai, dealer_ai in matchups:
+        if player_ai.STATELESS_BY_TURN_AND_CARD and dealer_ai.STATELESS_BY_TURN_AND_CARD:
+            engines.append((BatchSimulation.decision_table(player_ai, card_encoding.cards, turns),
+                            BatchSimulation.decision_table(dealer_ai, card_encoding.cards, turns)))
+        else:
+            engines.append(LeHer(UNSHUFFLED_DECK=unshuffled_deck, SCORER=scorer, PLAYER_AI=player_ai,
+                                 DEALER_AI=dealer_ai, TURNS_PER_GAME=turns))
+    # sums of the outcomes and of the products of the outcomes of every two matchups
+    outcome_sums = np.zeros(len(matchups))
+    outcome_products = np.zeros((len(matchups), len(matchups)))
+
+    played = 0
+    while played < games:
+        current_batch = min(batch_size, games - played)
+        numbers = deck_source.take(current_batch)
+        outcomes = np.empty((len(matchups), current_batch))
+        for index, engine in enumerate(engines):
+            if isinstance(engine, LeHer):
+                player_scores, dealer_scores = replay(engine, numbers, REMOVE_DRAWN_CARDS_FROM_DECK)
+                statistics[index].add_batch(player_scores, dealer_scores)
+            else:
+                player_cards, dealer_cards, player_histories, dealer_histories = BatchSimulation.simulate(
+                    numbers, engine[0], engine[1], is_king, turns, REMOVE_DRAWN_CARDS_FROM_DECK)
+                player_scores = scores[player_cards].sum(axis=1)
+                dealer_scores = scores[dealer_cards].sum(axis=1)
+                statistics[index].add_batch(player_scores, dealer_scores, player_histories, dealer_histories)
+            outcomes[index] = np.sign(player_scores - dealer_scores)
+        outcome_sums += outcomes.sum(axis=1)
+        outcome_products += outcomes @ outcomes.T
+        played += current_batch
+
+    means = outcome_sums / games
+    differences = means[:, np.newaxis] - means[np.newaxis, :]
+    squares = np.diag(outcome_products)
+    # mean of the squared paired differences, then the sample variance of the paired differences
+    squared_differences = (squares[:, np.newaxis] + squares[np.newaxis, :] - 2 * outcome_products) / games
+    variances = np.maximum(squared_differences - differences ** 2, 0) * games / max(games - 1, 1)
+    half_widths = np.vectorize(lambda variance: confidence_half_width(variance, games, confidence))(variances)
+    return {
+        "statistics": statistics,
+        "differences": differences,
+        "half_widths": half_widths,
+        "games": games
+    }
+
+
+def replay(game, numbers, REMOVE_DRAWN_CARDS_FROM_DECK):
+    """
+    Plays one game per row of random numbers with the scalar engine.
+
+    :param game: the LeHer instance
+    :param numbers: the shuffled decks or draws, see DeckSource
+    :param REMOVE_DRAWN_CARDS_FROM_DECK: whether cards drawn are removed from the deck
+    :return: returns a tuple (player_scores, dealer_scores) of int arrays
+    """
+    game.update_decision_tables()
+    player_scores = np.empty(len(numbers), dtype=np.int64)
+    dealer_scores = np.empty(len(numbers), dtype=np.int64)
+    for i, game_numbers in enumerate(numbers.tolist()):
+        game.play_game(REMOVE_DRAWN_CARDS_FROM_DECK, REPLAYED_NUMBERS=game_numbers)
+        player_scores[i], dealer_scores[i] = game.get_scores()
+    return player_scores, dealer_scores
@@ -1,24 +1,422 @@
 import os
+import re
+import gzip
 import json
+import queue
+import threading
+
+import numpy as np
+
+from Outcome import HISTORY_NAMES, OUTCOME_OF, pack_history, unpack_history, history_names
+
+# file extension of every log format
+LOG_FILE_EXTENSIONS = {
+    "json": ".json",
+    "jsonl": ".jsonl",
+    "jsonl.gz": ".jsonl.gz",
+    "binary": ".bin"
+}
+
+# first bytes of every binary log file, followed by the header length (uint32) and the json header
+BINARY_LOG_MAGIC = b"LEHERLOG"
+BINARY_LOG_VERSION = 1
+# appended to the name of a binary log file for the file listing its segments (the runs appended to it)
+BINARY_SEGMENTS_EXTENSION = ".segments.json"
+# binary logs encode a missing card (e.g. the unused end of a deck) as this code
+NO_CARD = 255
+# the ways get_results can return histories, see convert_history
+HISTORY_FORMATS = ("names", "outcomes", "packed")
+# the fields of a logged game, see game_dictionary
+GAME_FIELDS = ("id", "player_score", "dealer_score", "deck_to_start_of_game", "player_history", "dealer_history",
+               "player_cards", "dealer_cards")
+# the fields logged as lists of cards, all other fields are ints (histories are lists of names in older logs)
+CARD_FIELDS = ("deck_to_start_of_game", "player_cards", "dealer_cards")
+HISTORY_FIELDS = ("player_history", "dealer_history")
+# a game object in a json log, game objects do not contain other objects
+GAME_OBJECT_PATTERN = re.compile(r"\{[^{}]*\}")
+# the value of a field in the json text of a game, either an int or a list without nested lists
+FIELD_PATTERNS = {field: re.compile(r'"' + field + r'"\s*:\s*(-?\d+|\[[^\]]*\])') for field in GAME_FIELDS}
+# json texts of games shorter than this are parsed whole instead of cutting out fields, see iter_json_columns
+SHORT_GAME_LENGTH = 100
+# the amount of characters of a json log read at once
+READ_BUFFER_SIZE = 1 << 20
+
+
+def with_log_extension(file_name, log_format="json"):
+    """
+    :param file_name: name of the log file with or without extension
+    :param log_format: the format of the log file, see LOG_FILE_EXTENSIONS
+    :return: returns the file name with the extension of the log format
+    """
+    extension = LOG_FILE_EXTENSIONS[log_format]
+    if file_name.endswith(extension):
+        return file_name
+    return file_name + extension
+
+
+def iter_games(output_folder, file_name, fields=None, id_range=None, where=None):
+    """
+    Yields the game dictionaries of the specified file one at a time.
+    All formats are read lazily with bounded memory: json and json lines files in blocks of READ_BUFFER_SIZE
+    characters (see iter_json_blocks) and binary files (.bin) in chunks of records.
+    Histories are returned as they are stored (packed, see pack_history in Outcome, or lists of names in older logs),
+    see convert_history.
+
+    With fields only the requested fields are parsed, see iter_json_columns.
+    The id of a game is its position in the log, so games outside of id_range are skipped without being parsed.
+
+    :param output_folder: path (as string) to output folder, can be relative or absolute
+    :param file_name: name of the log file (with extension)
+    :param fields: the fields (see GAME_FIELDS) of the yielded dictionaries, None for all logged fields
+    :param id_range: tuple (start, stop) of the ids of the games, stop is exclusive and can be None,
+                     None for all games
+    :param where: predicate on a game dictionary, only games it returns True for are yielded,
+                  it only sees the requested fields (e.g. player_lost)
+    """
+    start, stop = id_range or (0, None)
+    if file_name.endswith(LOG_FILE_EXTENSIONS["binary"]):
+        if fields is None:
+            games = iter_binary_games(output_folder, file_name, id_range=(start, stop))
+        else:
+            games = iter_rows(iter_game_chunks(output_folder, file_name, fields, id_range=(start, stop)))
+    elif fields is None:
+        games = (game for text, _ in iter_json_blocks(output_folder + file_name, start, stop)
+                 for game in json.loads("[" + text + "]"))
+    else:
+        games = iter_rows(iter_json_columns(output_folder + file_name, fields, start, stop))
+    if where is None:
+        yield from games
+    else:
+        yield from filter(where, games)
+
+
+def iter_json_blocks(file_path, start=0, stop=None):
+    """
+    Reads a json or json lines log in blocks of about READ_BUFFER_SIZE characters and yields the json text
+    of the games of every block (the game objects separated by commas) and the amount of games, without parsing them.
+    Game objects do not contain other objects, so they are counted by their braces
+    and only blocks that are cut by start or stop are split into games.
+    This assumes that no string in a game (cards and history names) contains braces or brackets,
+    a block with unbalanced braces or brackets raises a ValueError instead of being yielded.
+
+    :param file_path: path (as string) to the log file
+    :param start: the position (id) of the first game
+    :param stop: the position (id) after the last game, None for all games from start
+    """
+    index = 0
+    with open_json_log(file_path) as data_file:
+        if file_path.endswith((LOG_FILE_EXTENSIONS["jsonl"], LOG_FILE_EXTENSIONS["jsonl.gz"])):
+            blocks = iter(lambda: ",".join(line for line in data_file.readlines(READ_BUFFER_SIZE) if line.strip()),
+                          "")
+        else:
+            blocks = iter_game_objects(data_file)
+        for text in blocks:
+            count = text.count("{")
+            if count != text.count("}") or text.count("[") != text.count("]"):
+                raise ValueError(file_path + " has unbalanced braces or brackets, they can not be part of strings")
+            first = max(start - index, 0)
+            last = count if stop is None else min(stop - index, count)
+            index += count
+            if first == 0 and last == count:
+                yield text, count
+            elif first < last:
+                yield ",".join(GAME_OBJECT_PATTERN.findall(text)[first:last]), last - first
+            if stop is not None and index >= stop:
+                return
+
+
+def open_json_log(file_path):
+    """
+    :param file_path: path (as string) to a json or json lines log, files ending with .gz are decompressed
+    :return: returns the log file opened for reading text
+    """
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, "rt")
+    return open(file_path)
+
+
+def iter_game_objects(data_file):
+    """
+    Yields the json text of the game objects of a json log ({"games": [...]}) block by block,
+    every block starts with the first and ends with the last complete game object in it.
+
+    :param data_file: the opened log file
+    """
+    # the games list starts after the first [
+    text = data_file.read(READ_BUFFER_SIZE).partition("[")[2]
+    while text:
+        block = data_file.read(READ_BUFFER_SIZE)
+        # an object cut off at the end of the block is completed by the next block,
+        # the last block ends with the end of the games list and of the log object
+        end = text.rfind("}", 0, len(text) if block else text.rfind("]")) + 1
+        begin = text.find("{")
+        if 0 <= begin < end:
+            yield text[begin:end]
+        text = text[end:] + block if block else ""
+
+
+def iter_json_columns(file_path, fields, start=0, stop=None):
+    """
+    Yields the requested fields of the games of a json or json lines log as dictionaries field -> list of values
+    (None for games that do not log the field), one per block (see iter_json_blocks).
+
+    Every field is cut out of all games of a block at once (see FIELD_PATTERNS) and only its values are parsed,
+    so the time spent does not depend on the fields that are not requested.
+    Lists of cards and short games (e.g. of logs with only scores) are parsed faster by the json parser,
+    so such blocks are parsed whole.
+
+    :param file_path: path (as string) to the log file
+    :param fields: the fields, see GAME_FIELDS
+    :param start: the position (id) of the first game
+    :param stop: the position (id) after the last game, None for all games from start
+    """
+    parse_cards = any(field in CARD_FIELDS for field in fields)
+    for text, count in iter_json_blocks(file_path, start, stop):
+        if parse_cards or len(text) < SHORT_GAME_LENGTH * count:
+            games = json.loads("[" + text + "]")
+            yield {field: [game.get(field) for game in games] for field in fields}
+            continue
+        columns = {}
+        for field in fields:
+            values = FIELD_PATTERNS[field].findall(text)
+            if len(values) != count:
+                # some games do not log the field, so the values can not be matched to the games
+                values = [parse_game_field(game, field) for game in GAME_OBJECT_PATTERN.findall(text)]
+            elif field in CARD_FIELDS or (values and values[0][0] == "["):
+                values = json.loads("[" + ",".join(values) + "]")
+            else:
+                values = list(map(int, values))
+            columns[field] = values
+        yield columns
+
+
+def parse_game_field(text, field):
+    """
+    :param text: the json text of a game
+    :param field: the field, see GAME_FIELDS
+    :return: returns the value of the field or None if it is not logged
+    """
+    match = FIELD_PATTERNS[field].search(text)
+    if match is None:
+        return None
+    return json.loads(match.group(1))
+
+
+def iter_rows(chunks):
+    """
+    Yields the games of chunks of columns (see iter_json_columns and iter_game_chunks) as dictionaries
+    like iter_games.
+    """
+    for chunk in chunks:
+        columns = column_lists(chunk)
+        for values in zip(*columns.values()):
+            yield dict(zip(columns.keys(), values))
+
+
+def column_lists(chunk):
+    """
+    :param chunk: dictionary field -> list or numpy array of values (see iter_json_columns and iter_game_chunks)
+    :return: returns a dictionary field -> list of values in the format of iter_games
+    """
+    columns = {}
+    for field, values in chunk.items():
+        if isinstance(values, list):
+            columns[field] = values
+        elif field in CARD_FIELDS:
+            # removes the padding of shorter decks
+            columns[field] = [[card for card in cards if card] for cards in values.tolist()]
+        else:
+            columns[field] = values.tolist()
+    return columns
+
+
+def iter_game_chunks(output_folder, file_name, fields, chunk_size=100000, id_range=None, where=None):
+    """
+    Yields the requested fields of the games of the specified file as dictionaries of numpy arrays,
+    at most chunk_size games at a time, so the memory needed does not depend on the size of the log.
+    Binary logs are sliced without reading the games outside of id_range.
+
+    Ids and scores are int64 arrays of shape (games,), histories are packed (see pack_history in Outcome)
+    into int64 arrays of shape (games,) and cards are string arrays of shape (games, length),
+    decks of different length (drawn cards with replacement) are padded with empty strings.
+
+    :param output_folder: path (as string) to output folder, can be relative or absolute
+    :param file_name: name of the log file (with extension)
+    :param fields: the fields of the chunks, see GAME_FIELDS
+    :param chunk_size: the maximum amount of games per chunk (before filtering with where)
+    :param id_range: tuple (start, stop) of the ids of the games, see iter_games
+    :param where: vectorized predicate on a chunk returning a boolean array, only the games it is True for are kept,
+                  it only sees the requested fields (e.g. player_lost)
+    """
+    fields = list(fields)
+    if file_name.endswith(LOG_FILE_EXTENSIONS["binary"]):
+        chunks = iter_binary_chunks(output_folder, file_name, fields, chunk_size, id_range)
+    else:
+        chunks = iter_json_chunks(output_folder, file_name, fields, chunk_size, id_range)
+    for chunk in chunks:
+        if where is not None:
+            mask = np.asarray(where(chunk), dtype=bool)
+            chunk = {field: values[mask] for field, values in chunk.items()}
+        if len(chunk[fields[0]]):
+            yield chunk
+
+
+def iter_json_chunks(output_folder, file_name, fields, chunk_size, id_range):
+    """
+    iter_game_chunks of json and json lines logs.
+    """
+    start, stop = id_range or (0, None)
+    columns = {field: [] for field in fields}
+    for block in iter_json_columns(output_folder + file_name, fields, start, stop):
+        for field in fields:
+            columns[field].extend(block[field])
+        while len(columns[fields[0]]) >= chunk_size:
+            yield json_columns_to_arrays({field: values[:chunk_size] for field, values in columns.items()}, file_name)
+            columns = {field: values[chunk_size:] for field, values in columns.items()}
+    if columns[fields[0]]:
+        yield json_columns_to_arrays(columns, file_name)
+
+
+def json_columns_to_arrays(columns, file_name):
+    """
+    :param columns: dictionary field -> list of the values of the games
+    :param file_name: name of the log file (for error messages)
+    :return: returns a dictionary field -> numpy array, see iter_game_chunks
+    """
+    arrays = {}
+    for field, values in columns.items():
+        if any(value is None for value in values):
+            raise ValueError(file_name + " does not contain " + field + " for every game")
+        if field in CARD_FIELDS:
+            length = max(len(cards) for cards in values)
+            arrays[field] = np.array([cards + [""] * (length - len(cards)) for cards in values], dtype=str)
+        elif field in HISTORY_FIELDS:
+            arrays[field] = np.array([convert_history(history, "packed") for history in values], dtype=np.int64)
+        else:
+            arrays[field] = np.array(values, dtype=np.int64)
+    return arrays
+
+
+def iter_binary_chunks(output_folder, file_name, fields, chunk_size, id_range):
+    """
+    iter_game_chunks of binary logs.
+    """
+    header, records = read_binary_log(output_folder, file_name)
+    if any(field in CARD_FIELDS + HISTORY_FIELDS for field in fields) and not header["log_all"]:
+        raise ValueError(file_name + " only contains scores")
+    start, stop = id_range or (0, None)
+    stop = len(records) if stop is None else min(stop, len(records))
+    # the card of every code, NO_CARD is the padding of shorter decks
+    card_names = np.array(header["cards"] + [""] * (NO_CARD + 1 - len(header["cards"])), dtype=str)
+    history_bytes = (header["turns"] + 3) // 4
+    for chunk_start in range(start, stop, chunk_size):
+        chunk = records[chunk_start:min(stop, chunk_start + chunk_size)]
+        arrays = {}
+        for field in fields:
+            if field == "id":
+                arrays[field] = np.arange(chunk_start, chunk_start + len(chunk), dtype=np.int64)
+            elif field in CARD_FIELDS:
+                arrays[field] = card_names[chunk[field]]
+            elif field in HISTORY_FIELDS:
+                # the bytes of pack_histories are the packed history (little endian) without its turn marker
+                packed = np.full(len(chunk), 1 << (2 * header["turns"]), dtype=np.int64)
+                for byte in range(0, history_bytes):
+                    packed |= chunk[field][:, byte].astype(np.int64) << (8 * byte)
+                arrays[field] = packed
+            else:
+                arrays[field] = chunk[field].astype(np.int64)
+        yield arrays
+
+
+def player_won(game):
+    """
+    Filter for iter_games, iter_game_chunks and get_results, needs the scores.
+    """
+    return game["player_score"] > game["dealer_score"]
+
+
+def player_lost(game):
+    """
+    Filter for iter_games, iter_game_chunks and get_results, needs the scores.
+    """
+    return game["player_score"] < game["dealer_score"]
+
+
+def is_draw(game):
+    """
+    Filter for iter_games, iter_game_chunks and get_results, needs the scores.
+    """
+    return game["player_score"] == game["dealer_score"]
+
+
+def convert_history(history, history_format="names"):
+    """
+    :param history: a logged history, packed (see pack_history in Outcome) or a list of Outcomes, codes or names
+    :param history_format: "names" for a list of the names of the Outcomes (the format of older logs),
+                           "outcomes" for a list of Outcomes, "packed" for a packed history
+    :return: returns the history in the specified format
+    """
+    if history_format == "names":
+        return history_names(history)
+    if history_format == "outcomes":
+        return unpack_history(history) if isinstance(history, int) else [OUTCOME_OF[outcome] for outcome in history]
+    if history_format == "packed":
+        return history if isinstance(history, int) else pack_history(history)
+    raise ValueError("unknown history format " + str(history_format) + ", use one of " + str(HISTORY_FORMATS))
+
+
+def convert_histories(histories, history_format, converted):
+    """
+    convert_history of every history, packed histories are only converted the first time they occur.
+
+    :param histories: list of logged histories
+    :param history_format: the format of the histories, see convert_history
+    :param converted: dictionary packed history -> converted history, shared between calls
+    :return: returns the list of the converted histories (every list is a new list)
+    """
+    result = []
+    for history in histories:
+        if not isinstance(history, int):
+            result.append(convert_history(history, history_format))
+            continue
+        value = converted.get(history)
+        if value is None:
+            value = converted[history] = convert_history(history, history_format)
+        result.append(value if history_format == "packed" else list(value))
+    return result
 
 
 def get_results(output_folder, file_name, include_scores=True, include_cards=False, include_deck=False,
-                include_history=False):
+                include_history=False, history_format="names", id_range=None, where=None):
     """
     Returns a dictionary with the data from the specified file.
-    Only data specified in the parameters in included in the dictionary.
+    Only data specified in the parameters in included in the dictionary and only that data is parsed
+    (see iter_games), use iter_games or iter_game_chunks to process large logs with bounded memory.
     If data is not included in the dictionary the value for the key is None.
     The keys are (without '):
     'decks','player_cards', 'dealer_cards', 'player_histories', 'dealer_histories', 'player_scores' and 'dealer_scores'
 
     :param output_folder: path (as string) to output folder, can be relative or absolute
-    :param file_name: name of the log file (with extension)
+    :param file_name: name of the log file (with extension), files ending with .jsonl are read as json lines,
+                      files ending with .bin are read with get_binary_results (values are numpy arrays then)
     :param include_scores: whether scores are part of the return dictionary
     :param include_cards: whether cards in hand at the end of the game are part of the return dictionary
     :param include_deck: whether the decks at the start of the game are part of the return dictionary
     :param include_history: whether the attempted actions are part of the return dictionary
+    :param history_format: the format of the histories, see convert_history
+    :param id_range: tuple (start, stop) of the ids of the games, see iter_games
+    :param where: predicate on a game dictionary, see iter_games (it only sees the included data,
+                  e.g. player_lost needs the scores)
     :return: returns a dictionary with the results
     """
+    if file_name.endswith(LOG_FILE_EXTENSIONS["binary"]) and id_range is None and where is None:
+        results = get_binary_results(output_folder, file_name, include_scores=include_scores,
+                                     include_cards=include_cards, include_deck=include_deck,
+                                     include_history=include_history, decode=True)
+        if include_history and history_format != "names":
+            for key in ["player_histories", "dealer_histories"]:
+                results[key] = [convert_history(history, history_format) for history in results[key]]
+        return results
     results = {
         "player_scores": None,
         "dealer_scores": None,
@@ -28,8 +426,6 @@ def get_results(output_folder, file_name, include_scores=True, include_cards=Fal
         "dealer_histories": None,
         "decks": None
     }
-    with open(output_folder + file_name) as data_file:
-        data = json.load(data_file)
 
     player_scores = []
     dealer_scores = []
@@ -39,18 +435,38 @@ def get_results(output_folder, file_name, include_scores=True, include_cards=Fal
     dealer_histories = []
     decks = []
 
-    for game in data['games']:
+    fields = []
+    if include_cards:
+        fields += ["player_cards", "dealer_cards"]
+    if include_scores:
+        fields += ["player_score", "dealer_score"]
+    if include_history:
+        fields += ["player_history", "dealer_history"]
+    if include_deck:
+        fields += ["deck_to_start_of_game"]
+    if where is not None:
+        games = list(iter_games(output_folder, file_name, fields, id_range, where))
+        chunks = [{field: [game[field] for game in games] for field in fields}]
+    elif file_name.endswith(LOG_FILE_EXTENSIONS["binary"]):
+        chunks = map(column_lists, iter_game_chunks(output_folder, file_name, fields, id_range=id_range))
+    else:
+        start, stop = id_range or (0, None)
+        chunks = iter_json_columns(output_folder + file_name, fields, start, stop)
+    # the converted packed histories, games repeat only a few distinct histories
+    converted = {}
+    # the results are collected a block of games at a time, see iter_json_columns
+    for chunk in chunks:
         if include_cards:
-            player_cards.append(game['player_cards'])
-            dealer_cards.append(game['dealer_cards'])
+            player_cards += chunk['player_cards']
+            dealer_cards += chunk['dealer_cards']
         if include_scores:
-            player_scores.append(game['player_score'])
-            dealer_scores.append(game['dealer_score'])
+            player_scores += chunk['player_score']
+            dealer_scores += chunk['dealer_score']
         if include_history:
-            player_histories.append(game['player_history'])
-            dealer_histories.append(game['dealer_history'])
+            player_histories += convert_histories(chunk['player_history'], history_format, converted)
+            dealer_histories += convert_histories(chunk['dealer_history'], history_format, converted)
         if include_deck:
-            decks.append(game['deck_to_start_of_game'])
+            decks += chunk['deck_to_start_of_game']
 
     if include_cards:
         results["player_cards"] = player_cards
@@ -63,10 +479,39 @@ def get_results(output_folder, file_name, include_scores=True, include_cards=Fal
         results["dealer_histories"] = dealer_histories
     if include_deck:
         results["decks"] = decks
+    if file_name.endswith(LOG_FILE_EXTENSIONS["binary"]):
+        results["header"] = read_binary_header(output_folder + file_name)[0]
 
     return results
 
 
+def game_dictionary(game_id, *, deck_to_start_of_game=None, player_score=None, dealer_score=None,
+                    player_history=None, dealer_history=None, player_cards=None, dealer_cards=None):
+    """
+    Returns the dictionary a game is logged as.
+    Data that is None is left out, histories are packed (see pack_history in Outcome).
+    See add_game of StaggeredLogger for the parameters.
+
+    :param game_id: the id of the game
+    """
+    new_data = {"id": game_id}
+    if player_score is not None:
+        new_data["player_score"] = player_score
+    if dealer_score is not None:
+        new_data["dealer_score"] = dealer_score
+    if deck_to_start_of_game is not None:
+        new_data["deck_to_start_of_game"] = deck_to_start_of_game
+    if player_history is not None:
+        new_data["player_history"] = pack_history(player_history)
+    if dealer_history is not None:
+        new_data["dealer_history"] = pack_history(dealer_history)
+    if player_cards is not None:
+        new_data["player_cards"] = player_cards
+    if dealer_cards is not None:
+        new_data["dealer_cards"] = dealer_cards
+    return new_data
+
+
 class StaggeredLogger:
     """
     This class handles the logging of game data in the form of json files.
@@ -105,27 +550,16 @@ class StaggeredLogger:
         :param deck_to_start_of_game: the deck at the start of the game
         :param player_score: the score of the player
         :param dealer_score: the score of the dealer
-        :param player_history: the action history of the player
-        :param dealer_history: the action history of the dealer
+        :param player_history: the action history of the player (Outcomes, codes or names)
+        :param dealer_history: the action history of the dealer (Outcomes, codes or names)
         :param player_cards: the cards the player has in their hand at the end of the game
         :param dealer_cards: the cards the dealer has in their hand at the end of the game
         """
-        new_data = {"id": self.index + self.offset}
+        new_data = game_dictionary(self.index + self.offset, deck_to_start_of_game=deck_to_start_of_game,
+                                   player_score=player_score, dealer_score=dealer_score,
+                                   player_history=player_history, dealer_history=dealer_history,
+                                   player_cards=player_cards, dealer_cards=dealer_cards)
         self.index += 1
-        if player_score is not None:
-            new_data["player_score"] = player_score
-        if dealer_score is not None:
-            new_data["dealer_score"] = dealer_score
-        if deck_to_start_of_game is not None:
-            new_data["deck_to_start_of_game"] = deck_to_start_of_game
-        if player_history is not None:
-            new_data["player_history"] = player_history
-        if dealer_history is not None:
-            new_data["dealer_history"] = dealer_history
-        if player_cards is not None:
-            new_data["player_cards"] = player_cards
-        if dealer_cards is not None:
-            new_data["dealer_cards"] = dealer_cards
         self.data['games'].append(new_data)
 
     def log_staggered_games(self):
@@ -136,3 +570,576 @@ class StaggeredLogger:
         """
         with open(self.file_path, "w+") as data_file:
             json.dump(self.data, data_file)
+
+    def log_position(self):
+        """
+        Logs all staggered games (rewriting the whole file) and returns the position of the end of the log,
+        see truncate_log.
+
+        :return: returns a json serializable position
+        """
+        self.log_staggered_games()
+        return {"games": len(self.data["games"])}
+
+
+class StreamingLogger:
+    """
+    This class handles the logging of game data in the form of json lines files (one json object per game and line).
+
+    It has the same methods as StaggeredLogger, but only keeps up to batch_size games in memory.
+    Once batch_size games have been added they are appended to the file,
+    the remaining games are appended with the log_staggered_games method.
+    """
+
+    def __init__(self, output_folder, file_name, batch_size=10000):
+        """
+        If there is a log file with that name in the specified directory the data will be appended to the old file.
+        Only the last line of an old file is read to continue the ids, no compatibility checks are done.
+
+        :param output_folder: path (as string) to output folder, can be relative or absolute
+        :param file_name: name of the log file (with extension)
+        :param batch_size: the maximum amount of games kept in memory before they are appended to the file
+        """
+        self.index = 0
+        self.batch_size = batch_size
+        self.lines = []
+        self.file_path = output_folder + file_name
+        if not os.path.exists(output_folder):
+            os.makedirs(output_folder)
+        last_line = read_last_line(self.file_path) if os.path.exists(self.file_path) else None
+        if last_line is None:
+            self.offset = 0
+        else:
+            self.offset = json.loads(last_line)["id"] + 1
+
+    def add_game(self, *, deck_to_start_of_game=None, player_score=None,
+                 dealer_score=None, player_history=None, dealer_history=None,
+                 player_cards=None, dealer_cards=None):
+        """
+        See add_game of StaggeredLogger.
+        """
+        new_data = game_dictionary(self.index + self.offset, deck_to_start_of_game=deck_to_start_of_game,
+                                   player_score=player_score, dealer_score=dealer_score,
+                                   player_history=player_history, dealer_history=dealer_history,
+                                   player_cards=player_cards, dealer_cards=dealer_cards)
+        self.index += 1
+        self.lines.append(json.dumps(new_data))
+        if len(self.lines) >= self.batch_size:
+            self.log_staggered_games()
+
+    def log_staggered_games(self):
+        """
+        Appends all games that have not been written yet to the file specified at class instance creation.
+        """
+        with open(self.file_path, "a") as data_file:
+            if self.lines:
+                data_file.write("\n".join(self.lines) + "\n")
+        self.lines = []
+
+    def log_position(self):
+        """
+        See log_position of StaggeredLogger.
+        """
+        self.log_staggered_games()
+        return {"bytes": os.path.getsize(self.file_path)}
+
+
+class BackgroundLogger:
+    """
+    This class handles the logging of game data in the form of json lines files like StreamingLogger,
+    but the games are serialized, compressed and written by a background writer thread,
+    so writing the games overlaps with playing the next ones.
+
+    Every batch_size games are handed to the writer over a queue of at most queue_size batches,
+    add_game blocks while the queue is full (backpressure), so the games kept in memory are bounded.
+    Files ending with .gz are gzip compressed with every batch as its own gzip member
+    (concatenated members are a valid gzip file, see open_json_log), so the file can be truncated after any batch.
+    With fsync every batch is on disk before the next one is written.
+    The json serialization holds the GIL, compressing and writing do not and run in parallel with the games.
+
+    log_staggered_games waits until every game is written and stops the writer, adding games starts it again.
+    An error of the writer is raised by the next add_game or log_staggered_games.
+    """
+
+    def __init__(self, output_folder, file_name, batch_size=10000, queue_size=4, fsync=True, compress_level=1):
+        """
+        If there is a log file with that name in the specified directory the data will be appended to the old file.
+        The ids of an old compressed file are continued by counting its lines, no compatibility checks are done.
+
+        :param output_folder: path (as string) to output folder, can be relative or absolute
+        :param file_name: name of the log file (with extension), files ending with .gz are compressed
+        :param batch_size: the amount of games handed to the writer at once
+        :param queue_size: the maximum amount of batches waiting for the writer
+        :param fsync: whether every batch is flushed to disk (os.fsync) before the next one is written
+        :param compress_level: the gzip compression level (1 fastest to 9 smallest), level 1 compresses
+                               the logs about 4 times at a fraction of the cost of higher levels
+        """
+        self.index = 0
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.compress = file_name.endswith(".gz")
+        self.compress_level = compress_level
+        self.games = []
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writer = None
+        self.error = None
+        self.file_path = output_folder + file_name
+        if not os.path.exists(output_folder):
+            os.makedirs(output_folder)
+        if not os.path.exists(self.file_path):
+            open(self.file_path, "xb").close()
+            self.offset = 0
+        elif self.compress:
+            with open_json_log(self.file_path) as data_file:
+                self.offset = sum(1 for line in data_file if line.strip())
+        else:
+            last_line = read_last_line(self.file_path)
+            self.offset = 0 if last_line is None else json.loads(last_line)["id"] + 1
+
+    def add_game(self, *, deck_to_start_of_game=None, player_score=None,
+                 dealer_score=None, player_history=None, dealer_history=None,
+                 player_cards=None, dealer_cards=None):
+        """
+        See add_game of StaggeredLogger.
+        """
+        self.games.append(game_dictionary(self.index + self.offset, deck_to_start_of_game=deck_to_start_of_game,
+                                          player_score=player_score, dealer_score=dealer_score,
+                                          player_history=player_history, dealer_history=dealer_history,
+                                          player_cards=player_cards, dealer_cards=dealer_cards))
+        self.index += 1
+        if len(self.games) >= self.batch_size:
+            self.hand_off()
+
+    def hand_off(self):
+        """
+        Hands the added games to the writer (starting it if needed), blocks while the queue is full.
+        """
+        self.raise_writer_error()
+        if self.writer is None:
+            self.writer = threading.Thread(target=self.write_batches, name="BackgroundLogger writer", daemon=True)
+            self.writer.start()
+        self.queue.put(self.games)
+        self.games = []
+
+    def write_batches(self):
+        """
+        The loop of the writer thread, writes the batches of the queue until it gets None.
+        """
+        try:
+            with open(self.file_path, "ab") as data_file:
+                for games in iter(self.queue.get, None):
+                    data = ("\n".join(map(json.dumps, games)) + "\n").encode()
+                    if self.compress:
+                        data = gzip.compress(data, self.compress_level)
+                    data_file.write(data)
+                    data_file.flush()
+                    if self.fsync:
+                        os.fsync(data_file.fileno())
+        except Exception as error:
+            self.error = error
+            # the remaining batches are dropped, so hand_off does not block on a full queue
+            for _ in iter(self.queue.get, None):
+                pass
+
+    def stop_writer(self):
+        """
+        Waits until the writer has written every batch handed to it and stops it.
+        """
+        if self.writer is not None:
+            self.queue.put(None)
+            self.writer.join()
+            self.writer = None
+
+    def raise_writer_error(self):
+        """
+        Stops the writer and raises its error if it failed.
+        """
+        if self.error is not None:
+            self.stop_writer()
+            error, self.error = self.error, None
+            raise error
+
+    def log_staggered_games(self):
+        """
+        Hands the remaining games to the writer and waits until every game is written.
+        """
+        if self.games:
+            self.hand_off()
+        self.stop_writer()
+        self.raise_writer_error()
+
+    def log_position(self):
+        """
+        See log_position of StaggeredLogger.
+        """
+        self.log_staggered_games()
+        return {"bytes": os.path.getsize(self.file_path)}
+
+
+def truncate_log(output_folder, file_name, position):
+    """
+    Removes every game logged after a position of the log, e.g. the games logged after the last checkpoint
+    of an interrupted run (see Checkpoint).
+
+    :param output_folder: path (as string) to output folder, can be relative or absolute
+    :param file_name: name of the log file (with extension)
+    :param position: a position returned by log_position of the logger of the file
+    """
+    file_path = output_folder + file_name
+    if "bytes" in position:
+        os.truncate(file_path, position["bytes"])
+        return
+    with open(file_path) as data_file:
+        data = json.load(data_file)
+    if len(data["games"]) > position["games"]:
+        del data["games"][position["games"]:]
+        with open(file_path, "w") as data_file:
+            json.dump(data, data_file)
+
+
+def read_last_line(file_path):
+    """
+    Reads the last non-empty line of a file without reading the rest of the file.
+
+    :param file_path: path (as string) to the file
+    :return: returns the last line as string or None if the file has no non-empty line
+    """
+    with open(file_path, "rb") as data_file:
+        position = data_file.seek(0, os.SEEK_END)
+        tail = b""
+        while position > 0:
+            step = min(4096, position)
+            position -= step
+            data_file.seek(position)
+            tail = data_file.read(step) + tail
+            lines = tail.strip().split(b"\n")
+            if len(lines) > 1 or (position == 0 and lines[0]):
+                return lines[-1].decode()
+    return None
+
+
+def binary_record_dtype(header):
+    """
+    :param header: the header of a binary log
+    :return: returns the numpy dtype of a single game record of a binary log with that header
+    """
+    history_bytes = (header["turns"] + 3) // 4
+    fields = [("player_score", header["score_dtype"]), ("dealer_score", header["score_dtype"])]
+    if header["log_all"]:
+        fields += [("player_cards", "u1", (header["turns"],)), ("dealer_cards", "u1", (header["turns"],)),
+                   ("player_history", "u1", (history_bytes,)), ("dealer_history", "u1", (history_bytes,)),
+                   ("deck_to_start_of_game", "u1", (header["deck_size"],))]
+    return np.dtype(fields)
+
+
+def pack_histories(codes):
+    """
+    Packs history codes (see Outcome) into 2 bits per turn, 4 turns per byte.
+    The code of turn t is stored in byte t // 4 at bit 2 * (t % 4).
+
+    :param codes: array of shape (..., turns) with history codes
+    :return: returns an uint8 array of shape (..., ceil(turns / 4))
+    """
+    codes = np.asarray(codes, dtype=np.uint8)
+    turns = codes.shape[-1]
+    padded = np.zeros(codes.shape[:-1] + ((turns + 3) // 4 * 4,), dtype=np.uint8)
+    padded[..., :turns] = codes
+    padded = padded.reshape(codes.shape[:-1] + (-1, 4))
+    return padded[..., 0] | (padded[..., 1] << 2) | (padded[..., 2] << 4) | (padded[..., 3] << 6)
+
+
+def unpack_histories(packed, turns):
+    """
+    Reverses pack_histories.
+
+    :param packed: uint8 array of shape (..., ceil(turns / 4))
+    :param turns: the amount of turns per game
+    :return: returns an uint8 array of shape (..., turns) with history codes
+    """
+    packed = np.asarray(packed, dtype=np.uint8)
+    codes = np.stack([(packed >> shift) & 3 for shift in (0, 2, 4, 6)], axis=-1)
+    return codes.reshape(packed.shape[:-1] + (-1,))[..., :turns]
+
+
+def read_binary_header(file_path):
+    """
+    :param file_path: path (as string) to a binary log file
+    :return: returns a tuple (header, offset) with the header dictionary and the offset of the first record in bytes,
+             the segments of the file (see BinaryLogger) are added to the header under the key 'segments'
+    """
+    with open(file_path, "rb") as data_file:
+        if data_file.read(len(BINARY_LOG_MAGIC)) != BINARY_LOG_MAGIC:
+            raise ValueError(file_path + " is not a binary log file")
+        header_length = int.from_bytes(data_file.read(4), "little")
+        header = json.loads(data_file.read(header_length).decode())
+    header["segments"] = []
+    if os.path.exists(file_path + BINARY_SEGMENTS_EXTENSION):
+        with open(file_path + BINARY_SEGMENTS_EXTENSION) as segments_file:
+            header["segments"] = json.load(segments_file)
+    return header, len(BINARY_LOG_MAGIC) + 4 + header_length
+
+
+def read_binary_log(output_folder, file_name):
+    """
+    Memory maps the records of a binary log file.
+    Nothing but the header is read, the records are read by the operating system when they are accessed.
+
+    :param output_folder: path (as string) to output folder, can be relative or absolute
+    :param file_name: name of the log file (with extension)
+    :return: returns a tuple (header, records) where records is a structured (read only) numpy array with one
+             element per game, see binary_record_dtype
+    """
+    file_path = output_folder + file_name
+    header, offset = read_binary_header(file_path)
+    dtype = binary_record_dtype(header)
+    games = (os.path.getsize(file_path) - offset) // dtype.itemsize
+    if games == 0:
+        return header, np.zeros(0, dtype=dtype)
+    return header, np.memmap(file_path, dtype=dtype, mode="r", offset=offset, shape=(games,))
+
+
+def get_binary_results(output_folder, file_name, include_scores=True, include_cards=False, include_deck=False,
+                       include_history=False, decode=False):
+    """
+    Returns a dictionary with the data from the specified binary log file, like get_results.
+    By default the values are numpy views into the memory mapped file, so nothing is copied or read in advance:
+    scores are int arrays of shape (games,),
+    cards are arrays of shape (games, turns) with codes into the list header['cards'],
+    histories are arrays of shape (games, ceil(turns / 4)) with packed history codes (see unpack_histories)
+    and decks are arrays of shape (games, header['deck_size']) with card codes padded with NO_CARD.
+    The header is included under the key 'header'.
+
+    :param output_folder: path (as string) to output folder, can be relative or absolute
+    :param file_name: name of the log file (with extension)
+    :param include_scores: whether scores are part of the return dictionary
+    :param include_cards: whether cards in hand at the end of the game are part of the return dictionary
+    :param include_deck: whether the decks at the start of the game are part of the return dictionary
+    :param include_history: whether the attempted actions are part of the return dictionary
+    :param decode: whether the data is decoded to the lists of strings get_results returns for json files
+                   (this reads the whole file into memory)
+    :return: returns a dictionary with the results
+    """
+    header, records = read_binary_log(output_folder, file_name)
+    results = {
+        "player_scores": None,
+        "dealer_scores": None,
+        "player_cards": None,
+        "dealer_cards": None,
+        "player_histories": None,
+        "dealer_histories": None,
+        "decks": None,
+        "header": header
+    }
+    if (include_cards or include_history or include_deck) and not header["log_all"]:
+        raise ValueError(file_name + " only contains scores")
+    if include_scores:
+        results["player_scores"] = records["player_score"]
+        results["dealer_scores"] = records["dealer_score"]
+    if include_cards:
+        results["player_cards"] = records["player_cards"]
+        results["dealer_cards"] = records["dealer_cards"]
+    if include_history:
+        results["player_histories"] = records["player_history"]
+        results["dealer_histories"] = records["dealer_history"]
+    if include_deck:
+        results["decks"] = records["deck_to_start_of_game"]
+    if decode:
+        results = decode_binary_results(results)
+    return results
+
+
+def decode_binary_results(results):
+    """
+    Converts the numpy arrays of get_binary_results into the lists get_results returns for json files.
+
+    :param results: the dictionary returned by get_binary_results
+    :return: returns a new dictionary with lists of ints and strings
+    """
+    header = results["header"]
+    cards = header["cards"]
+    decoded = {"header": header}
+    for key in ["player_scores", "dealer_scores"]:
+        decoded[key] = None if results[key] is None else results[key].tolist()
+    for key in ["player_cards", "dealer_cards"]:
+        decoded[key] = None if results[key] is None else [[cards[card] for card in hand] for hand in results[key]]
+    for key in ["player_histories", "dealer_histories"]:
+        if results[key] is None:
+            decoded[key] = None
+        else:
+            codes = unpack_histories(results[key], header["turns"])
+            decoded[key] = [[HISTORY_NAMES[code] for code in history] for history in codes]
+    if results["decks"] is None:
+        decoded["decks"] = None
+    else:
+        decoded["decks"] = [[cards[card] for card in deck if card != NO_CARD] for deck in results["decks"]]
+    return decoded
+
+
+def iter_binary_games(output_folder, file_name, chunk_size=10000, id_range=None):
+    """
+    Yields the games of a binary log file as the same dictionaries json logs contain.
+    Only chunk_size games are decoded at a time.
+
+    :param output_folder: path (as string) to output folder, can be relative or absolute
+    :param file_name: name of the log file (with extension)
+    :param chunk_size: the amount of games decoded at once
+    :param id_range: tuple (start, stop) of the ids of the games, see iter_games
+    """
+    header, records = read_binary_log(output_folder, file_name)
+    log_all = header["log_all"]
+    first, last = id_range or (0, None)
+    last = len(records) if last is None else min(last, len(records))
+    for start in range(first, last, chunk_size):
+        chunk = records[start:min(last, start + chunk_size)]
+        decoded = decode_binary_results({
+            "header": header,
+            "player_scores": chunk["player_score"],
+            "dealer_scores": chunk["dealer_score"],
+            "player_cards": chunk["player_cards"] if log_all else None,
+            "dealer_cards": chunk["dealer_cards"] if log_all else None,
+            "player_histories": chunk["player_history"] if log_all else None,
+            "dealer_histories": chunk["dealer_history"] if log_all else None,
+            "decks": chunk["deck_to_start_of_game"] if log_all else None
+        })
+        for i in range(0, len(chunk)):
+            if log_all:
+                yield game_dictionary(start + i, deck_to_start_of_game=decoded["decks"][i],
+                                      player_score=decoded["player_scores"][i],
+                                      dealer_score=decoded["dealer_scores"][i],
+                                      player_history=decoded["player_histories"][i],
+                                      dealer_history=decoded["dealer_histories"][i],
+                                      player_cards=decoded["player_cards"][i], dealer_cards=decoded["dealer_cards"][i])
+            else:
+                yield game_dictionary(start + i, player_score=decoded["player_scores"][i],
+                                      dealer_score=decoded["dealer_scores"][i])
+
+
+class BinaryLogger:
+    """
+    This class handles the logging of game data in the form of binary files with one fixed size record per game.
+
+    It has the same methods as StaggeredLogger, but only keeps up to batch_size games in memory.
+    The file starts with BINARY_LOG_MAGIC, the length of the header as uint32 and a json header describing
+    the run configuration and the layout of the records (see binary_record_dtype).
+    Scores are stored as uint8 (uint16 if the scorer allows higher scores), cards as uint8 codes into the card list
+    of the header, histories as 2 bit codes (see pack_histories) and the deck as one code per card.
+    The id of a game is the index of its record.
+    Every run appended to the file starts a segment, the segments are listed in a json file next to the log
+    (its name plus BINARY_SEGMENTS_EXTENSION) with the id of their first game and what differs between the runs
+    (e.g. the seed), as the header can not grow without moving every record.
+    """
+
+    def __init__(self, output_folder, file_name, *, cards, turns, deck_size, log_all, max_score=255,
+                 run_configuration=None, segment=None, resume=False, batch_size=10000):
+        """
+        If there is a log file with that name in the specified directory the data will be appended to the old file.
+        The old file has to have the same cards, record layout and run configuration,
+        as the header describes every game of the file.
+
+        :param output_folder: path (as string) to output folder, can be relative or absolute
+        :param file_name: name of the log file (with extension)
+        :param cards: every card that can be logged, the code of a card is its index in this list
+        :param turns: the amount of turns per game
+        :param deck_size: the maximum length of a logged deck
+        :param log_all: whether everything is logged or only the scores
+        :param max_score: the highest score a participant can reach
+        :param run_configuration: dictionary (json serializable) describing the run, stored in the header
+        :param segment: dictionary (json serializable) describing what may differ between the runs appended to the
+                        file (e.g. the seed), stored in the segment of this run
+        :param resume: whether this run resumes the run of the last segment (see Checkpoint)
+                       instead of starting a new segment
+        :param batch_size: the maximum amount of games kept in memory before they are appended to the file
+        """
+        if len(cards) >= NO_CARD:
+            raise ValueError("binary logs support at most " + str(NO_CARD) + " different cards")
+        self.file_path = output_folder + file_name
+        self.codes = {card: code for code, card in enumerate(cards)}
+        header = {
+            "version": BINARY_LOG_VERSION,
+            "cards": list(cards),
+            "turns": turns,
+            "deck_size": deck_size,
+            "log_all": log_all,
+            "score_dtype": "u1" if max_score <= 255 else "u2",
+            "run_configuration": run_configuration or {}
+        }
+        if not os.path.exists(output_folder):
+            os.makedirs(output_folder)
+        segments = []
+        if os.path.exists(self.file_path) and os.path.getsize(self.file_path) > 0:
+            old_header, _ = read_binary_header(self.file_path)
+            if binary_record_dtype(old_header) != binary_record_dtype(header) or old_header["cards"] != header["cards"]:
+                raise ValueError(self.file_path + " has a different record layout")
+            # json turns tuples into lists, so the configuration is compared the way it was saved
+            if old_header["run_configuration"] != json.loads(json.dumps(header["run_configuration"])):
+                raise ValueError(self.file_path + " was logged with a different run configuration")
+            segments = old_header["segments"]
+        else:
+            encoded_header = json.dumps(header).encode()
+            with open(self.file_path, "wb") as data_file:
+                data_file.write(BINARY_LOG_MAGIC + len(encoded_header).to_bytes(4, "little") + encoded_header)
+        self.buffer = np.zeros(batch_size, dtype=binary_record_dtype(header))
+        self.index = 0
+        # the amount of games logged to the file before
+        self.offset = (os.path.getsize(self.file_path) - read_binary_header(self.file_path)[1]) // self.buffer.itemsize
+        if not (resume and segments):
+            segments.append({"first_game": self.offset, **(segment or {})})
+            with open(self.file_path + BINARY_SEGMENTS_EXTENSION, "w") as segments_file:
+                json.dump(segments, segments_file)
+        header["segments"] = segments
+        self.header = header
+
+    def add_game(self, *, deck_to_start_of_game=None, player_score=None,
+                 dealer_score=None, player_history=None, dealer_history=None,
+                 player_cards=None, dealer_cards=None):
+        """
+        See add_game of StaggeredLogger.
+        Cards, histories and the deck are only stored if the logger was created with log_all.
+        """
+        if self.header["log_all"]:
+            codes = self.codes
+            self.add_encoded_game(player_score=player_score, dealer_score=dealer_score,
+                                  player_cards=[codes[card] for card in player_cards],
+                                  dealer_cards=[codes[card] for card in dealer_cards],
+                                  player_history=[OUTCOME_OF[outcome] for outcome in player_history],
+                                  dealer_history=[OUTCOME_OF[outcome] for outcome in dealer_history],
+                                  deck_to_start_of_game=[codes[card] for card in deck_to_start_of_game])
+        else:
+            self.add_encoded_game(player_score=player_score, dealer_score=dealer_score)
+
+    def add_encoded_game(self, *, deck_to_start_of_game=None, player_score=None,
+                         dealer_score=None, player_history=None, dealer_history=None,
+                         player_cards=None, dealer_cards=None):
+        """
+        Like add_game, but cards and the deck are given as codes (indices into the card list of the header)
+        instead of card strings and the histories as Outcomes or codes instead of their names.
+        """
+        record = self.buffer[self.index]
+        record["player_score"] = player_score
+        record["dealer_score"] = dealer_score
+        if self.header["log_all"]:
+            record["player_cards"] = player_cards
+            record["dealer_cards"] = dealer_cards
+            record["player_history"] = pack_histories(player_history)
+            record["dealer_history"] = pack_histories(dealer_history)
+            deck = record["deck_to_start_of_game"]
+            deck[:len(deck_to_start_of_game)] = deck_to_start_of_game
+            deck[len(deck_to_start_of_game):] = NO_CARD
+        self.index += 1
+        if self.index == len(self.buffer):
+            self.log_staggered_games()
+
+    def log_staggered_games(self):
+        """
+        Appends all games that have not been written yet to the file specified at class instance creation.
+        """
+        with open(self.file_path, "ab") as data_file:
+            data_file.write(self.buffer[:self.index].tobytes())
+        self.index = 0
+
+    def log_position(self):
+        """
+        See log_position of StaggeredLogger.
+        """
+        self.log_staggered_games()
+        return {"bytes": os.path.getsize(self.file_path)}
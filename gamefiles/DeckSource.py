@@ -0,0 +1,98 @@
+import numpy as np
+
+
+class DeckSource:
+    """
+    Generates everything random about games in large blocks: a shuffled deck per game if drawn cards are removed
+    from the deck, the draws (see simulate_duplicates in BatchSimulation) of a game otherwise.
+    The games played with them only depend on the strategies, so they can be replayed for different strategies
+    (see CommonRandomNumbers).
+
+    A block of shuffled decks (argsort of a random matrix) or of draws with replacement (integer draws)
+    is generated at once into a preallocated buffer that is refilled in place once every game of it was handed out.
+    The scalar engine takes one game at a time (next_game), the batch engine and common random numbers take many
+    (take), so every engine sharing a source gets its games from the same stream.
+    The stream only depends on the generator and block_size, not on how the games are taken.
+    """
+
+    def __init__(self, deck_ids, turns, remove_drawn_cards_from_deck, rng, block_size=8192):
+        """
+        :param deck_ids: the deck as an array of card ids
+        :param turns: the amount of turns per game
+        :param remove_drawn_cards_from_deck: whether cards drawn are removed from the deck
+        :param rng: the numpy Generator used for shuffling and drawing
+        :param block_size: the amount of games generated at once
+        """
+        self.deck_ids = np.asarray(deck_ids)
+        self.turns = turns
+        self.remove_drawn_cards_from_deck = remove_drawn_cards_from_deck
+        self.rng = rng
+        self.block_size = block_size
+        if remove_drawn_cards_from_deck:
+            game_shape = (len(self.deck_ids),)
+        else:
+            game_shape = (3, turns)
+        self.buffer = np.empty((block_size,) + game_shape, dtype=self.deck_ids.dtype)
+        # the buffer as lists, only built if games are taken one at a time
+        self.rows = None
+        self.position = block_size
+        # the state of the generator before the current block was generated, see restore
+        self.block_state = None
+
+    def refill(self):
+        """
+        Generates the next block into the buffer.
+        """
+        self.block_state = self.rng.bit_generator.state
+        if self.remove_drawn_cards_from_deck:
+            indices = self.rng.random(self.buffer.shape).argsort(axis=1)
+        else:
+            indices = self.rng.integers(0, len(self.deck_ids), size=self.buffer.shape)
+        np.take(self.deck_ids, indices, out=self.buffer)
+        self.rows = None
+        self.position = 0
+
+    def restore(self, block_state, position):
+        """
+        Regenerates a block from the state of the generator before it was generated (block_state of an earlier
+        instance, see get_random_state in LeHer) and continues at position.
+        The generator is left after the block, set its state afterwards if it is shared.
+
+        :param block_state: the state of the generator before the block was generated, None if no block was generated
+        :param position: the amount of games of the block already handed out
+        """
+        if block_state is None:
+            self.position = self.block_size
+            return
+        self.rng.bit_generator.state = block_state
+        self.refill()
+        self.position = position
+
+    def next_game(self):
+        """
+        :return: returns the random numbers of the next game as (nested) list of card ids,
+                 the list must not be modified
+        """
+        if self.position == self.block_size:
+            self.refill()
+        if self.rows is None:
+            self.rows = self.buffer.tolist()
+        self.position += 1
+        return self.rows[self.position - 1]
+
+    def take(self, games):
+        """
+        :param games: the amount of games
+        :return: returns the random numbers of the next games as a new array of shape (games,) + shape of a game
+        """
+        parts = []
+        while games > 0:
+            if self.position == self.block_size:
+                self.refill()
+            current = min(games, self.block_size - self.position)
+            parts.append(self.buffer[self.position:self.position + current].copy())
+            self.position += current
+            games -= current
+        if not parts:
+            return self.buffer[:0].copy()
+        return np.concatenate(parts) if len(parts) > 1 else parts[0]
@@ -0,0 +1,329 @@
+import numpy as np
+
+from Decks import STANDARD_DECK
+from Scorer import standard_scorer
+import BatchSimulation
+from CardEncoding import get_card_encoding
+from ExactEvaluator import outcome_probabilities
+from Outcome import Outcome
+from Strategies import TableStrategy
+
+# the roles, index of the first axis of the regret and strategy arrays
+PLAYER = 0
+DEALER = 1
+# the amount of Outcomes of the last action of the opponent an infoset can see, see TableStrategy
+OUTCOMES = len(Outcome)
+# the version of the state saved to a Checkpoint
+SOLVER_STATE_VERSION = 1
+
+
+class EquilibriumSolver:
+    """
+    Computes equilibrium mixed strategies of a game where drawn cards are not removed from the deck
+    (REMOVE_DRAWN_CARDS_FROM_DECK=False) with counterfactual regret minimization (CFR+).
+
+    Information sets (infosets) are abstracted to what TableStrategy looks at: the turn, the class of the current card
+    (its score and whether it is a king) and the Outcome of the last action of the opponent.
+    Every role has an array with an entry per turn, card class, Outcome and action for its regrets and one for the sum
+    of its strategies, so an iteration updates every infoset at once with array operations.
+    Strategies are arrays of shape (2, turns, card classes, OUTCOMES) with the probability that the player (index
+    PLAYER) or the dealer (index DEALER) takes their action.
+
+    The abstraction forgets the earlier cards and decisions of a role, so every turn acts as a separate agent of its
+    role and the counterfactual values weigh the games of an infoset with the probability that chance, the opponent
+    and the decisions of the other turns reach them.
+    With a single turn per game the abstraction is the game as strategies see it and the average strategies converge
+    to an equilibrium, with more turns they converge to strategies where no single turn of a role gains by deciding
+    differently (see deviation_gains).
+
+    The counterfactual values are computed exactly instead of being sampled: like in evaluate_with_replacement
+    (see ExactEvaluator) the only thing carried from one turn to the next is the card the player gets because of a
+    redraw attempt of the dealer, so the probabilities of reaching every carried card and score difference are
+    propagated forward, the expected outcomes of the player are propagated backwards and both are combined for every
+    turn. The payoff of the player is 1 for a win, 0 for a draw and -1 for a loss (see net_win_rate in GameStatistics).
+    """
+
+    def __init__(self, unshuffled_deck=STANDARD_DECK, scorer=standard_scorer, turns=13):
+        """
+        :param unshuffled_deck: the deck to be used
+        :param scorer: the scorer
+        :param turns: the amount of turns per game
+        """
+        card_encoding = get_card_encoding(unshuffled_deck, scorer)
+        self.unshuffled_deck = list(unshuffled_deck)
+        self.scorer = scorer
+        self.turns = turns
+        keys = [(card_encoding.scores[card_id], card_encoding.is_king[card_id]) for card_id in card_encoding.deck]
+        self.card_classes = sorted(set(keys))
+        class_of_key = {key: card_class for card_class, key in enumerate(self.card_classes)}
+        classes = len(self.card_classes)
+        self.class_probabilities = np.bincount([class_of_key[key] for key in keys], minlength=classes) / len(keys)
+        class_scores = [score for score, _ in self.card_classes]
+        self.score_range = max(class_scores) - min(class_scores)
+        self.offset = turns * self.score_range
+        # carry 0 is no carried card, carry 1 + (outcome - 1) * classes + card_class is a card of the class
+        # the player gets after a redraw attempt of the dealer with the outcome
+        self.carries = 1 + 2 * classes
+        self.regrets = np.zeros((2, turns, classes, OUTCOMES, 2))
+        self.strategy_sums = np.zeros((2, turns, classes, OUTCOMES, 2))
+        self.iterations = 0
+        self.build_paths()
+
+    def build_paths(self):
+        """
+        Lists every path through a turn: the carried card, the cards of the player and the dealer, whether the player
+        tries to trade, whether the dealer tries to redraw and the card of the redraw.
+        For every path the infosets, the actions, the carried card of the next turn, the score difference of the turn
+        and the probability of its cards are kept in arrays, so a turn is evaluated for every path at once.
+        """
+        classes = len(self.card_classes)
+        class_scores = [score for score, _ in self.card_classes]
+        class_is_king = [is_king for _, is_king in self.card_classes]
+        probabilities = self.class_probabilities.tolist()
+        drawn_cards = list(enumerate(probabilities))
+        paths = []
+        for carry in range(0, self.carries):
+            if carry == 0:
+                last_outcome, player_cards = Outcome.NOT_ATTEMPTED, drawn_cards
+            else:
+                last_outcome, card_class = Outcome(1 + (carry - 1) // classes), (carry - 1) % classes
+                player_cards = [(card_class, 1.0)]
+            for player_card, player_probability in player_cards:
+                for dealer_card, dealer_probability in drawn_cards:
+                    for trades in (0, 1):
+                        if not trades:
+                            trade_outcome, held, dealer_held = Outcome.NOT_ATTEMPTED, player_card, dealer_card
+                        elif class_is_king[dealer_card]:
+                            trade_outcome, held, dealer_held = Outcome.ATTEMPTED_BUT_FAILED, player_card, dealer_card
+                        else:
+                            trade_outcome, held, dealer_held = Outcome.SUCCEEDED, dealer_card, player_card
+                        for redraws in (0, 1):
+                            for new_card, new_probability in drawn_cards if redraws else [(None, 1.0)]:
+                                if new_card is None:
+                                    carry_out, final_dealer_card = 0, dealer_held
+                                elif class_is_king[new_card]:
+                                    carry_out, final_dealer_card = 1 + classes + new_card, dealer_held
+                                else:
+                                    carry_out, final_dealer_card = 1 + dealer_held, new_card
+                                paths.append((carry, player_card * OUTCOMES + last_outcome, trades,
+                                              dealer_held * OUTCOMES + trade_outcome, redraws, carry_out,
+                                              class_scores[held] - class_scores[final_dealer_card] + self.score_range,
+                                              player_probability * dealer_probability * new_probability))
+        columns = list(zip(*paths))
+        self.path_carry = np.array(columns[0])
+        self.path_player_infoset = np.array(columns[1])
+        self.path_trades = np.array(columns[2], dtype=bool)
+        self.path_dealer_infoset = np.array(columns[3])
+        self.path_redraws = np.array(columns[4], dtype=bool)
+        self.path_next_carry = np.array(columns[5])
+        self.path_difference = np.array(columns[6])
+        self.path_probability = np.array(columns[7])
+        # the index of the path in the transitions of a turn, see transitions
+        self.path_transition = (self.path_carry * self.carries + self.path_next_carry) * (2 * self.score_range + 1) \
+            + self.path_difference
+
+    def current_strategies(self):
+        """
+        :return: returns the strategies of the current iteration (regret matching on the regrets, see strategy arrays
+                 in EquilibriumSolver), infosets without positive regrets take their action with probability 0.5
+        """
+        positive = np.maximum(self.regrets, 0)
+        totals = positive.sum(axis=-1)
+        return np.divide(positive[..., 1], totals, out=np.full(totals.shape, 0.5), where=totals > 0)
+
+    def average_strategies(self):
+        """
+        :return: returns the average of the strategies of all iterations, later iterations weigh more (CFR+),
+                 the current strategies if there was no iteration yet
+        """
+        totals = self.strategy_sums.sum(axis=-1)
+        if self.iterations == 0:
+            return self.current_strategies()
+        return np.divide(self.strategy_sums[..., 1], totals, out=np.full(totals.shape, 0.5), where=totals > 0)
+
+    def strategies_of(self, player_ai, dealer_ai):
+        """
+        :param player_ai: a player AI that is stateless by turn and card (see Strategy)
+        :param dealer_ai: a dealer AI that is stateless by turn and card
+        :return: returns the strategy array of the AIs, a card class decides like the first card of it in the deck
+        """
+        card_encoding = get_card_encoding(self.unshuffled_deck, self.scorer)
+        class_of_key = {key: card_class for card_class, key in enumerate(self.card_classes)}
+        representative = np.zeros(len(self.card_classes), dtype=np.int64)
+        for card_id in reversed(card_encoding.deck):
+            representative[class_of_key[(card_encoding.scores[card_id], card_encoding.is_king[card_id])]] = card_id
+        strategies = np.zeros((2, self.turns, len(self.card_classes), OUTCOMES))
+        for role, ai in [(PLAYER, player_ai), (DEALER, dealer_ai)]:
+            table = BatchSimulation.decision_table(ai, card_encoding.cards, self.turns)
+            strategies[role] = table[:, representative, np.newaxis]
+        return strategies
+
+    def transitions(self, strategies, turn):
+        """
+        :param strategies: the strategies (see EquilibriumSolver)
+        :param turn: the turn
+        :return: returns a tuple (transitions, player, dealer) with the array transitions[carry, next carry,
+                 score range + score difference of the turn] of probabilities given the carried card and the
+                 probability of the decisions of the player and of the dealer on every path
+        """
+        player = strategies[PLAYER, turn].ravel()[self.path_player_infoset]
+        player = np.where(self.path_trades, player, 1 - player)
+        dealer = strategies[DEALER, turn].ravel()[self.path_dealer_infoset]
+        dealer = np.where(self.path_redraws, dealer, 1 - dealer)
+        transitions = np.bincount(self.path_transition, self.path_probability * player * dealer,
+                                  minlength=self.carries ** 2 * (2 * self.score_range + 1))
+        return transitions.reshape(self.carries, self.carries, 2 * self.score_range + 1), player, dealer
+
+    def reach_probabilities(self, strategies):
+        """
+        :param strategies: the strategies (see EquilibriumSolver)
+        :return: returns a tuple (transitions, reaches) with the transitions of every turn (see transitions)
+                 and the probabilities reaches[turn][carry, offset + score difference] of reaching the start of every
+                 turn and the end of the game (the last entry)
+        """
+        reach = np.zeros((self.carries, 2 * self.offset + 1))
+        reach[0, self.offset] = 1.0
+        turn_transitions = []
+        reaches = [reach]
+        for turn in range(0, self.turns):
+            transitions = self.transitions(strategies, turn)
+            new_reach = np.zeros_like(reach)
+            for difference in np.flatnonzero(transitions[0].any(axis=(0, 1))):
+                new_reach += shift(transitions[0][:, :, difference].T @ reach, difference - self.score_range)
+            turn_transitions.append(transitions)
+            reaches.append(new_reach)
+            reach = new_reach
+        return turn_transitions, reaches
+
+    def action_values(self, strategies):
+        """
+        :param strategies: the strategies (see EquilibriumSolver)
+        :return: returns a tuple (values, value) with the counterfactual value of every action of every infoset
+                 in an array of the shape of regrets (for the player the payoff of the player, for the dealer the
+                 negative) and the expected payoff of the player
+        """
+        turn_transitions, reaches = self.reach_probabilities(strategies)
+        values = np.zeros_like(self.regrets)
+        differences = np.arange(-self.offset, self.offset + 1)
+        expected = np.broadcast_to(np.sign(differences).astype(float), reaches[-1].shape)
+        for turn in range(self.turns - 1, -1, -1):
+            transitions, player, dealer = turn_transitions[turn]
+            # combined[carry, next carry, difference] is the sum of the probability of reaching the start of the turn
+            # times the expected payoff after the turn over every score difference before the turn
+            combined = np.zeros_like(transitions)
+            new_expected = np.zeros_like(expected)
+            for difference in np.flatnonzero(transitions.any(axis=(0, 1))):
+                following = shift(expected, self.score_range - difference)
+                combined[:, :, difference] = reaches[turn] @ following.T
+                new_expected += transitions[:, :, difference] @ following
+            path_values = self.path_probability * combined.ravel()[self.path_transition]
+            infoset_actions = values.shape[2] * OUTCOMES * 2
+            values[PLAYER, turn] = np.bincount(self.path_player_infoset * 2 + self.path_trades, path_values * dealer,
+                                               minlength=infoset_actions).reshape(values.shape[2:])
+            values[DEALER, turn] = -np.bincount(self.path_dealer_infoset * 2 + self.path_redraws,
+                                                path_values * player,
+                                                minlength=infoset_actions).reshape(values.shape[2:])
+            expected = new_expected
+        return values, float(expected[0, self.offset])
+
+    def evaluate(self, strategies):
+        """
+        :param strategies: the strategies (see EquilibriumSolver)
+        :return: returns the outcome probabilities of the strategies in a dictionary like evaluate_with_replacement
+                 (see ExactEvaluator) with the expected payoff of the player added ('net_win_rate')
+        """
+        _, reaches = self.reach_probabilities(strategies)
+        results = outcome_probabilities(reaches[-1].sum(axis=0), self.offset)
+        results["net_win_rate"] = results["win_rate"] - results["dealer_win_rate"]
+        return results
+
+    def deviation_gains(self, strategies):
+        """
+        :param strategies: the strategies (see EquilibriumSolver)
+        :return: returns an array with the most the player and the dealer gain by changing their decisions in a single
+                 turn, with a single turn per game the sum is the exploitability of the strategies
+        """
+        values, _ = self.action_values(strategies)
+        probabilities = np.stack([1 - strategies, strategies], axis=-1)
+        gains = (values.max(axis=-1) - (values * probabilities).sum(axis=-1)).sum(axis=(2, 3))
+        return gains.max(axis=1)
+
+    def iterate(self):
+        """
+        Does one iteration of CFR+: the regrets of the player are updated with the current strategies, then the
+        regrets of the dealer with the updated strategy of the player (alternating updates).
+        Regrets are floored at 0 and the strategy of iteration t is added to the average with weight t.
+        """
+        self.iterations += 1
+        for role in (PLAYER, DEALER):
+            strategies = self.current_strategies()
+            values, _ = self.action_values(strategies)
+            probabilities = np.stack([1 - strategies[role], strategies[role]], axis=-1)
+            expected = (values[role] * probabilities).sum(axis=-1, keepdims=True)
+            self.regrets[role] = np.maximum(self.regrets[role] + values[role] - expected, 0)
+            self.strategy_sums[role] += self.iterations * probabilities
+
+    def solve(self, iterations, checkpoint=None):
+        """
+        Iterates until iterations iterations are done (see iterate).
+        With a Checkpoint (see Checkpoint) the regrets and strategy sums are saved every every_games iterations and
+        at the end, and a solver of the same game continues from the saved state, also to do more iterations.
+
+        :param iterations: the total amount of iterations
+        :param checkpoint: the Checkpoint the solver is saved to and resumed from, None to not save it
+        :return: returns the average strategies (see average_strategies)
+        """
+        run = self.describe()
+        next_checkpoint = -1
+        if checkpoint is not None:
+            saved = checkpoint.load(run)
+            if saved is not None:
+                self.iterations = saved["games"]
+                self.regrets = np.array(saved["regrets"], dtype=float)
+                self.strategy_sums = np.array(saved["strategy_sums"], dtype=float)
+            next_checkpoint = checkpoint.next_save(self.iterations, iterations)
+        while self.iterations < iterations:
+            self.iterate()
+            if self.iterations == next_checkpoint:
+                checkpoint.save(run, self.iterations, self.iterations == iterations, regrets=self.regrets.tolist(),
+                                strategy_sums=self.strategy_sums.tolist())
+                next_checkpoint = checkpoint.next_save(self.iterations, iterations)
+        return self.average_strategies()
+
+    def strategy(self, is_player, strategies=None, rng_seed=None):
+        """
+        :param is_player: whether the strategy is used by the player
+        :param strategies: the strategies (see EquilibriumSolver), the average strategies by default
+        :param rng_seed: the seed of the random numbers of mixed decisions, None for a random seed
+        :return: returns a TableStrategy (see Strategies) that plays the strategy of the role in LeHer
+        """
+        if strategies is None:
+            strategies = self.average_strategies()
+        return TableStrategy(strategies[PLAYER if is_player else DEALER].tolist(), self.card_classes, is_player,
+                             self.scorer, self.unshuffled_deck, rng_seed)
+
+    def describe(self):
+        """
+        :return: returns a json serializable dictionary describing the game that is solved
+        """
+        return {
+            "method": "EquilibriumSolver",
+            "version": SOLVER_STATE_VERSION,
+            "unshuffled_deck": self.unshuffled_deck,
+            "scorer": getattr(self.scorer, "__name__", repr(self.scorer)),
+            "turns": self.turns
+        }
+
+
+def shift(distribution, offset):
+    """
+    :param distribution: an array with the score difference on its last axis
+    :param offset: the amount the score differences are moved by
+    :return: returns the moved array, differences moved out of the array are dropped and missing ones are 0
+    """
+    moved = np.zeros_like(distribution)
+    if offset >= 0:
+        moved[..., offset:] = distribution[..., :distribution.shape[-1] - offset]
+    else:
+        moved[..., :offset] = distribution[..., -offset:]
+    return moved
@@ -0,0 +1,372 @@
+import functools
+
+import numpy as np
+
+from Decks import STANDARD_DECK
+from Scorer import standard_scorer
+import BatchSimulation
+from CardEncoding import get_card_encoding
+
+
+def evaluate_with_replacement(player_ai, dealer_ai, unshuffled_deck=STANDARD_DECK, scorer=standard_scorer,
+                              turns=13):
+    """
+    Computes the exact outcome probabilities of a game where drawn cards are not removed from the deck
+    (REMOVE_DRAWN_CARDS_FROM_DECK=False), without simulating any game.
+
+    Every card is drawn independently, the only thing carried over from one turn to the next is the card the player
+    gets because of a redraw attempt of the dealer (the old card of the dealer or the king that made the redraw fail).
+    The game is therefore a markov chain over that carried card, and the distribution of the score difference is
+    convolved turn by turn for every possible carried card.
+    Cards that score the same, are kings or not and lead to the same decisions are merged into one class.
+
+    Only strategies that are stateless by turn and card (like KeepNAndAbove) are supported, see Strategy.
+    The probabilities are exact up to floating point rounding.
+
+    :param player_ai: the player AI
+    :param dealer_ai: the dealer AI
+    :param unshuffled_deck: the deck to be used
+    :param scorer: the scorer
+    :param turns: the amount of turns per game
+    :return: returns a dictionary with the keys 'win_rate', 'draw_rate', 'dealer_win_rate' (for the player unless
+             stated otherwise), 'score_difference_mean' (player score - dealer score) and
+             'score_difference_distribution', a dictionary from score difference to probability
+    """
+    card_encoding = get_card_encoding(unshuffled_deck, scorer)
+    cards = card_encoding.cards
+    deck_ids = card_encoding.deck_array
+    scores = card_encoding.score_array
+    is_king = card_encoding.is_king_array
+    player_table = BatchSimulation.decision_table(player_ai, cards, turns)
+    dealer_table = BatchSimulation.decision_table(dealer_ai, cards, turns)
+
+    card_class, representative = card_classes(scores, is_king, player_table, dealer_table)
+    classes = len(representative)
+    class_probabilities = np.bincount(card_class[deck_ids], minlength=classes) / len(deck_ids)
+    class_scores = scores[representative]
+    class_is_king = is_king[representative]
+
+    score_range = int(class_scores.max() - class_scores.min())
+    offset = turns * score_range
+    # distribution[carry, offset + difference], carry 0 is no carried card and carry k + 1 is a card of class k
+    distribution = np.zeros((classes + 1, 2 * offset + 1))
+    distribution[0, offset] = 1.0
+
+    player_card, dealer_card, new_card = np.meshgrid(np.arange(classes), np.arange(classes), np.arange(classes),
+                                                     indexing="ij")
+    for turn in range(0, turns):
+        player_decisions = player_table[turn, representative]
+        dealer_decisions = dealer_table[turn, representative]
+        trades = player_decisions[player_card] & ~class_is_king[dealer_card]
+        final_player_card = np.where(trades, dealer_card, player_card)
+        current_dealer_card = np.where(trades, player_card, dealer_card)
+        redraws = dealer_decisions[current_dealer_card]
+        successes = redraws & ~class_is_king[new_card]
+        failures = redraws & class_is_king[new_card]
+        final_dealer_card = np.where(successes, new_card, current_dealer_card)
+        carry_out = np.where(successes, current_dealer_card + 1, np.where(failures, new_card + 1, 0)).ravel()
+        delta = (class_scores[final_player_card] - class_scores[final_dealer_card] + score_range).ravel()
+        # without a redraw the new card does not matter, its probabilities still sum up to 1
+        dealer_and_new_card_probabilities = (class_probabilities[dealer_card] * class_probabilities[new_card]).ravel()
+
+        # transitions[delta, carry in, carry out]
+        transitions = np.zeros((2 * score_range + 1, classes + 1, classes + 1))
+        for carry_in in range(0, classes + 1):
+            if carry_in == 0:
+                player_card_probabilities = class_probabilities[player_card].ravel()
+            else:
+                player_card_probabilities = (player_card == carry_in - 1).ravel().astype(float)
+            np.add.at(transitions, (delta, carry_in, carry_out),
+                      player_card_probabilities * dealer_and_new_card_probabilities)
+
+        new_distribution = np.zeros_like(distribution)
+        for delta_index in np.flatnonzero(transitions.any(axis=(1, 2))):
+            shift = delta_index - score_range
+            moved = transitions[delta_index].T @ distribution
+            if shift >= 0:
+                new_distribution[:, shift:] += moved[:, :moved.shape[1] - shift]
+            else:
+                new_distribution[:, :shift] += moved[:, -shift:]
+        distribution = new_distribution
+
+    return outcome_probabilities(distribution.sum(axis=0), offset)
+
+
+def evaluate_without_replacement(player_ai, dealer_ai, unshuffled_deck=STANDARD_DECK, scorer=standard_scorer,
+                                 turns=13):
+    """
+    Computes the exact outcome probabilities of a game where drawn cards are removed from the deck
+    (REMOVE_DRAWN_CARDS_FROM_DECK=True), without simulating any game.
+
+    Every turn draws the next two cards of the deck, so the turns depend on one another through the cards left.
+    The decisions and whether a trade or redraw fails only depend on the group of a card, cards that are kings or not
+    and lead to the same decisions form a group (for two threshold strategies the cards below, between and from
+    the thresholds and the kings). A game therefore only depends on the order of the groups in the shuffled deck,
+    and the cards of a group are dealt in a uniformly random order, independent of the other groups.
+
+    The game is solved by dynamic programming over the amount of cards left of every group and the group of the top
+    card of the deck if it is known. After a redraw attempt of the dealer the top card is known, it is the old card
+    of the dealer or the king that made the redraw fail, and it is the next card of the player.
+    Every state holds the probabilities of the amount of cards of every group the player holds, games that reach
+    the same state are merged and only one step of states is kept at a time.
+    At the end of the game the player holds a uniformly random subset of the cards of every group that was dealt
+    and the dealer holds the rest, so the score difference of a group is looked up in its table
+    (see group_difference_tables) and the groups are convolved.
+
+    The amount of states grows quickly with the amount of groups (not with the amount of ranks), two threshold
+    strategies take seconds, strategies with different thresholds every turn can take much longer.
+    Only strategies that are stateless by turn and card (like KeepNAndAbove) are supported, see Strategy.
+    The probabilities are exact up to floating point rounding.
+
+    :param player_ai: the player AI
+    :param dealer_ai: the dealer AI
+    :param unshuffled_deck: the deck to be used, it needs at least 2 * turns + 1 cards so the dealer can always redraw
+    :param scorer: the scorer
+    :param turns: the amount of turns per game
+    :return: returns a dictionary like evaluate_with_replacement
+    """
+    if len(unshuffled_deck) < 2 * turns + 1:
+        raise ValueError("a game of " + str(turns) + " turns needs a deck of at least " + str(2 * turns + 1) + " cards")
+    card_encoding = get_card_encoding(unshuffled_deck, scorer)
+    scores = card_encoding.score_array
+    is_king = card_encoding.is_king_array
+    player_table = BatchSimulation.decision_table(player_ai, card_encoding.cards, turns)
+    dealer_table = BatchSimulation.decision_table(dealer_ai, card_encoding.cards, turns)
+    card_group, representative = card_classes(scores, is_king, player_table, dealer_table, by_score=False)
+    groups = range(0, len(representative))
+    deck_ids = card_encoding.deck_array
+    deck_counts = tuple(np.bincount(card_group[deck_ids], minlength=len(groups)).tolist())
+    group_is_king = is_king[representative].tolist()
+    player_decisions = player_table[:, representative].tolist()
+    dealer_decisions = dealer_table[:, representative].tolist()
+
+    # the player holds at most one card per turn, the cards of the largest group are not stored,
+    # they are the turns played minus the cards of the other groups
+    held_shape = [min(count, turns) + 1 for count in deck_counts]
+    implicit_group = int(np.argmax(held_shape))
+    stored_groups = [group for group in groups if group != implicit_group]
+    axis_of_group = {group: axis for axis, group in enumerate(stored_groups)}
+    # the slices that shift the amount of cards of a group the player holds by one
+    axes = range(0, len(stored_groups))
+    shifted_slices = {group: (tuple(slice(1, None) if other == axis else slice(None) for other in axes),
+                              tuple(slice(0, -1) if other == axis else slice(None) for other in axes))
+                      for group, axis in axis_of_group.items()}
+
+    def without(counts, card):
+        return counts[:card] + (counts[card] - 1,) + counts[card + 1:]
+
+    def add(states, key, probabilities):
+        # probabilities is a new array or one of a step that is not used anymore
+        if key in states:
+            states[key] += probabilities
+        else:
+            states[key] = probabilities
+
+    def player_keeps(probabilities, card):
+        if card == implicit_group:
+            return probabilities
+        # the player never holds every card of a group before getting one, so nothing is shifted out
+        kept = np.zeros_like(probabilities)
+        target, source = shifted_slices[card]
+        kept[target] = probabilities[source]
+        return kept
+
+    start = np.zeros([held_shape[group] for group in stored_groups])
+    start[(0,) * start.ndim] = 1.0
+    # states[(counts, top)][held] is the probability of the state, counts includes a known top card
+    states = {(deck_counts, None): start}
+    for turn in range(0, turns):
+        # the player gets their card
+        player_drew = {}
+        for (counts, top), probabilities in states.items():
+            if top is not None:
+                add(player_drew, (without(counts, top), top), probabilities)
+                continue
+            cards_left = sum(counts)
+            for card in groups:
+                if counts[card]:
+                    add(player_drew, (without(counts, card), card), counts[card] / cards_left * probabilities)
+
+        # the dealer gets their card and the player decides whether to trade
+        dealer_holds = {}
+        for (counts, player_card), probabilities in player_drew.items():
+            cards_left = sum(counts)
+            trades = player_decisions[turn][player_card]
+            kept = {}
+            for dealer_card in groups:
+                if not counts[dealer_card]:
+                    continue
+                final_player_card, current_dealer_card = player_card, dealer_card
+                if trades and not group_is_king[dealer_card]:
+                    final_player_card, current_dealer_card = dealer_card, player_card
+                if final_player_card not in kept:
+                    kept[final_player_card] = player_keeps(probabilities, final_player_card)
+                add(dealer_holds, (without(counts, dealer_card), current_dealer_card),
+                    counts[dealer_card] / cards_left * kept[final_player_card])
+
+        # the dealer decides whether to redraw
+        states = {}
+        for (counts, dealer_card), probabilities in dealer_holds.items():
+            if not dealer_decisions[turn][dealer_card]:
+                add(states, (counts, None), probabilities)
+                continue
+            cards_left = sum(counts)
+            for new_card in groups:
+                if not counts[new_card]:
+                    continue
+                if group_is_king[new_card]:
+                    # the king stays on top of the deck
+                    key = (counts, new_card)
+                else:
+                    # the old card of the dealer is put on top of the deck
+                    next_counts = list(without(counts, new_card))
+                    next_counts[dealer_card] += 1
+                    key = (tuple(next_counts), dealer_card)
+                add(states, key, counts[new_card] / cards_left * probabilities)
+
+    # every final state as the amount of cards of every group the player and the dealer hold
+    player_held, dealer_held, probabilities = [], [], []
+    final_states = {}
+    for (counts, _), state_probabilities in states.items():
+        add(final_states, counts, state_probabilities)
+    for counts, state_probabilities in final_states.items():
+        indices = np.nonzero(state_probabilities)
+        held = np.zeros((len(indices[0]), len(groups)), dtype=np.int64)
+        for group, axis in axis_of_group.items():
+            held[:, group] = indices[axis]
+        held[:, implicit_group] = turns - held.sum(axis=1)
+        player_held.append(held)
+        dealer_held.append(np.subtract(deck_counts, counts) - held)
+        probabilities.append(state_probabilities[indices])
+    player_held = np.concatenate(player_held)
+    dealer_held = np.concatenate(dealer_held)
+    probabilities = np.concatenate(probabilities)
+
+    # the difference of a group only depends on the cards of the group the player and the dealer hold
+    group_scores = scores[deck_ids]
+    offset = turns * (max(0, int(group_scores.max())) - min(0, int(group_scores.min())))
+    tables = [group_difference_tables(tuple(sorted(group_scores[card_group[deck_ids] == group].tolist())),
+                                      turns, offset) for group in groups]
+
+    def part_differences(part):
+        """
+        :param part: some of the groups
+        :return: returns a tuple (index, differences) with the index of the distribution of the score difference
+                 of the groups of part of every final state and the distributions
+        """
+        codes = np.zeros(len(probabilities), dtype=np.int64)
+        for group in part:
+            codes = (codes * (turns + 1) + player_held[:, group]) * (turns + 1) + dealer_held[:, group]
+        _, first, index = np.unique(codes, return_index=True, return_inverse=True)
+        differences = np.zeros((len(first), 2 * offset + 1))
+        differences[:, offset] = 1.0
+        for row, final_state in enumerate(first):
+            for group in part:
+                differences[row] = convolve_differences(differences[row], tables[group][
+                    player_held[final_state, group], dealer_held[final_state, group]], offset)
+        return index.reshape(-1), differences
+
+    # the groups are split in half, the first half is summed up by the states of the second half,
+    # so every state of the second half is convolved only once
+    first_index, first_differences = part_differences(groups[:len(groups) // 2])
+    second_index, second_differences = part_differences(groups[len(groups) // 2:])
+    order = np.argsort(second_index, kind="stable")
+    summed = np.zeros_like(second_differences)
+    for start in range(0, len(order), 10000):
+        chunk = order[start:start + 10000]
+        rows, starts = np.unique(second_index[chunk], return_index=True)
+        summed[rows] += np.add.reduceat(probabilities[chunk, None] * first_differences[first_index[chunk]], starts)
+    differences = np.zeros(2 * offset + 1)
+    for row in range(0, len(second_differences)):
+        differences += convolve_differences(summed[row], second_differences[row], offset)
+    return outcome_probabilities(differences, offset)
+
+
+def convolve_differences(first, second, offset):
+    """
+    :param first: the distribution of a score difference, index i is the difference i - offset
+    :param second: the distribution of another score difference
+    :param offset: the offset of the differences, the sum of the differences has to be within it
+    :return: returns the distribution of the sum of both differences
+    """
+    result = np.zeros(len(first))
+    first_support = np.flatnonzero(first)
+    second_support = np.flatnonzero(second)
+    if len(first_support) == 0 or len(second_support) == 0:
+        return result
+    # only the parts that can be non zero are convolved
+    first_low, second_low = first_support[0], second_support[0]
+    convolved = np.convolve(first[first_low:first_support[-1] + 1], second[second_low:second_support[-1] + 1])
+    start = first_low + second_low - offset
+    result[start:start + len(convolved)] = convolved
+    return result
+
+
+@functools.lru_cache(maxsize=64)
+def group_difference_tables(group_scores, turns, offset):
+    """
+    The distribution of the score difference of the cards of a group the player and the dealer hold
+    when the cards are dealt in a uniformly random order.
+    Tables are cached, so evaluations of strategies with the same groups share them.
+
+    :param group_scores: the sorted scores of the cards of the group
+    :param turns: the amount of turns per game, the maximum amount of cards the player or the dealer holds
+    :param offset: the offset of the differences
+    :return: returns an array tables[player cards, dealer cards, offset + difference] with the probability
+             of the difference of the score of the player cards and the dealer cards, if the player holds a uniformly
+             random subset of the cards of the group and the dealer holds a uniformly random subset of the rest
+    """
+    held = min(len(group_scores), turns) + 1
+    # the amount of ways the player and the dealer can hold the cards
+    ways = np.zeros((held, held, 2 * offset + 1))
+    ways[0, 0, offset] = 1.0
+    for score in group_scores:
+        previous = ways.copy()
+        if score >= 0:
+            ways[1:, :, score:] += previous[:-1, :, :2 * offset + 1 - score]
+            ways[:, 1:, :2 * offset + 1 - score] += previous[:, :-1, score:]
+        else:
+            ways[1:, :, :2 * offset + 1 + score] += previous[:-1, :, -score:]
+            ways[:, 1:, -score:] += previous[:, :-1, :2 * offset + 1 + score]
+    totals = ways.sum(axis=2, keepdims=True)
+    return np.divide(ways, totals, out=np.zeros_like(ways), where=totals > 0)
+
+
+def card_classes(scores, is_king, player_table, dealer_table, by_score=True):
+    """
+    Merges cards that score the same, are kings or not and lead to the same decisions into classes.
+
+    :param scores: the score of every card id
+    :param is_king: whether a card id is a king
+    :param player_table: the decision table of the player AI, see decision_table in BatchSimulation
+    :param dealer_table: the decision table of the dealer AI
+    :param by_score: whether cards that do not score the same are in different classes
+    :return: returns a tuple (card_class, representative) of arrays with the class of every card id
+             and a card id of every class
+    """
+    class_of_key = {}
+    card_class = np.empty(len(scores), dtype=np.int64)
+    for card_id in range(0, len(scores)):
+        key = (int(scores[card_id]) if by_score else None, bool(is_king[card_id]), player_table[:, card_id].tobytes(),
+               dealer_table[:, card_id].tobytes())
+        card_class[card_id] = class_of_key.setdefault(key, len(class_of_key))
+    representative = np.zeros(len(class_of_key), dtype=np.int64)
+    representative[card_class] = np.arange(len(scores))
+    return card_class, representative
+
+
+def outcome_probabilities(differences, offset):
+    """
+    :param differences: the probability of every score difference, index i is the difference i - offset
+    :param offset: the offset of the differences
+    :return: returns the dictionary of evaluate_with_replacement
+    """
+    values = np.arange(-offset, offset + 1)
+    return {
+        "win_rate": float(differences[values > 0].sum()),
+        "draw_rate": float(differences[values == 0].sum()),
+        "dealer_win_rate": float(differences[values < 0].sum()),
+        "score_difference_mean": float((differences * values).sum()),
+        "score_difference_distribution": {int(value): float(probability)
+                                          for value, probability in zip(values, differences) if probability > 0}
+    }
@@ -1,13 +1,222 @@
 from PyQt5 import QtWidgets, QtCore, QtGui
 from PyQt5.QtWidgets import QApplication, QMainWindow
+import functools
 import sys
 
 import lang
 from LeHer import LeHer
 from Scorer import standard_scorer
+from Statistics import GameStatistics, confidence_half_width
 from Strategies import KeepNAndAbove
 from Decks import STANDARD_DECK
 
+# the size of the card labels, card art is scaled to it once when it is loaded
+CARD_ART_WIDTH = 80
+CARD_ART_HEIGHT = 140
+# the amount of games the watch mode plays between two updates of its window
+WATCH_GAMES_PER_UPDATE = 2000
+
+
+@functools.lru_cache(maxsize=64)
+def card_art(res_folder, card):
+    """
+    Loads the art of a card the first time it is shown and keeps it for every window of the process,
+    so only the art of cards that are shown is loaded.
+    The cache holds the art of a standard deck and the 'unknown' and 'empty' art.
+
+    :param res_folder: the path of the res folder
+    :param card: the card or 'unknown' or 'empty'
+    :return: returns the art as QPixmap scaled to the size of the card labels
+    """
+    return (QtGui.QPixmap(res_folder + card + ".png")
+            .scaled(QtCore.QSize(CARD_ART_WIDTH, CARD_ART_HEIGHT),
+                    aspectRatioMode=QtCore.Qt.AspectRatioMode.KeepAspectRatio))
+
+
+class AIWorker(QtCore.QObject):
+    """
+    Lets the AIs of a game decide on a worker thread, so a slow AI does not block the GUI.
+    The game is not changed by the GUI while a decision is pending.
+    """
+    # (asks_player_ai, action)
+    decided = QtCore.pyqtSignal(bool, bool)
+
+    def __init__(self, game):
+        """
+        :param game: the LeHer instance whose AIs decide
+        """
+        super().__init__()
+        self.game = game
+
+    @QtCore.pyqtSlot(bool, int)
+    def decide(self, asks_player_ai, current_turn):
+        """
+        Asks an AI for its action (see ask_ai in LeHer) and emits the decision.
+
+        :param asks_player_ai: whether the player AI is the one being asked
+        :param current_turn: the current turn
+        """
+        self.decided.emit(asks_player_ai, bool(self.game.ask_ai(asks_player_ai, current_turn)))
+
+
+class WatchWorker(QtCore.QObject):
+    """
+    Plays games of the player AI against the dealer AI on a worker thread and emits the running aggregates
+    after every batch of games.
+    """
+    # the aggregates of all games played so far (see to_dict in GameStatistics)
+    updated = QtCore.pyqtSignal(dict)
+    finished = QtCore.pyqtSignal()
+
+    def __init__(self, game, remove_drawn_cards_from_deck, games_per_update=WATCH_GAMES_PER_UPDATE, max_games=None):
+        """
+        :param game: the LeHer instance the games are played with
+        :param remove_drawn_cards_from_deck: whether cards drawn should be removed from the deck
+        :param games_per_update: the amount of games played between two updates
+        :param max_games: the amount of games after which the worker stops, it plays until stopped by default
+        """
+        super().__init__()
+        self.game = game
+        self.remove_drawn_cards_from_deck = remove_drawn_cards_from_deck
+        self.games_per_update = games_per_update
+        self.max_games = max_games
+        self.statistics = GameStatistics(game.TURNS_PER_GAME)
+        self.stopped = False
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        """
+        Plays batches of games (see auto_play_statistics in LeHer) until stopped.
+        """
+        while not self.stopped and (self.max_games is None or self.statistics.games < self.max_games):
+            games = self.games_per_update
+            if self.max_games is not None:
+                games = min(games, self.max_games - self.statistics.games)
+            self.statistics.merge(self.game.auto_play_statistics(games, self.remove_drawn_cards_from_deck,
+                                                                 SILENT_MODE=True))
+            # a copy, the statistics keep changing on this thread
+            self.updated.emit(self.statistics.to_dict())
+        self.finished.emit()
+
+    def stop(self):
+        """
+        Stops the worker after the current batch, called from the GUI thread.
+        """
+        self.stopped = True
+
+
+class HistogramWidget(QtWidgets.QWidget):
+    """
+    Paints a histogram of the score differences of games as bars.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.histogram = []
+        self.setMinimumSize(400, 200)
+
+    def set_histogram(self, histogram):
+        """
+        :param histogram: a list of [difference, games] sorted by difference
+        """
+        self.histogram = histogram
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), self.palette().base())
+        if not self.histogram:
+            return
+        low, high = self.histogram[0][0], self.histogram[-1][0]
+        most_games = max(games for _, games in self.histogram)
+        label_height = painter.fontMetrics().height()
+        bar_width = self.width() / (high - low + 1)
+        bar_area_height = self.height() - label_height
+        painter.setPen(QtCore.Qt.NoPen)
+        for difference, games in self.histogram:
+            bar_height = bar_area_height * games / most_games
+            # the games the player won are painted in a different color
+            painter.setBrush(self.palette().highlight() if difference > 0 else self.palette().mid())
+            painter.drawRect(QtCore.QRectF((difference - low) * bar_width, bar_area_height - bar_height,
+                                           max(bar_width - 1, 1), bar_height))
+        painter.setPen(self.palette().text().color())
+        label_area = QtCore.QRectF(0, bar_area_height, self.width(), label_height)
+        painter.drawText(label_area, QtCore.Qt.AlignLeft, str(low))
+        painter.drawText(label_area, QtCore.Qt.AlignRight, str(high))
+
+
+class WatchWindow(QtWidgets.QWidget):
+    """
+    A window that plays games of the player AI against the dealer AI in the background
+    and shows the win rates and a histogram of the score differences as they come in.
+    """
+
+    def __init__(self, game, remove_drawn_cards_from_deck, language_dict, confidence=0.95, **worker_options):
+        """
+        :param game: the LeHer instance the games are played with, it is only used by the worker thread
+        :param remove_drawn_cards_from_deck: whether cards drawn should be removed from the deck
+        :param language_dict: the strings of the language of the gui (see lang)
+        :param confidence: the confidence level of the intervals
+        :param worker_options: passed on to WatchWorker
+        """
+        super().__init__()
+        self.dict = language_dict
+        self.confidence = confidence
+        self.statistics = None
+        self.setWindowTitle(self.dict["watch_title"])
+        self.resize(600, 400)
+        layout = QtWidgets.QVBoxLayout(self)
+        self.SummaryLabel = QtWidgets.QLabel(self.dict["watch_waiting"])
+        self.SummaryLabel.setObjectName("SummaryLabel")
+        layout.addWidget(self.SummaryLabel)
+        self.Histogram = HistogramWidget()
+        self.Histogram.setObjectName("Histogram")
+        layout.addWidget(self.Histogram, 1)
+        self.StopButton = QtWidgets.QPushButton(self.dict["watch_stop"])
+        self.StopButton.setObjectName("StopButton")
+        self.StopButton.clicked.connect(self.stop)
+        layout.addWidget(self.StopButton)
+
+        self.workerThread = QtCore.QThread()
+        self.worker = WatchWorker(game, remove_drawn_cards_from_deck, **worker_options)
+        self.worker.moveToThread(self.workerThread)
+        self.workerThread.started.connect(self.worker.run)
+        self.worker.updated.connect(self.show_statistics)
+        self.worker.finished.connect(lambda: self.StopButton.setEnabled(False))
+        self.workerThread.start()
+
+    def show_statistics(self, statistics_dict):
+        """
+        Shows the aggregates emitted by the worker.
+
+        :param statistics_dict: the aggregates as dict (see to_dict in GameStatistics)
+        """
+        statistics = GameStatistics.from_dict(statistics_dict)
+        self.statistics = statistics
+        lines = [self.dict["watch_games"] + str(statistics.games)]
+        for key, rate in [("watch_player_wins", statistics.win_rate), ("watch_draws", statistics.draw_rate),
+                          ("watch_dealer_wins", statistics.dealer_win_rate)]:
+            half_width = confidence_half_width(rate * (1 - rate), statistics.games, self.confidence)
+            lines.append(self.dict[key] + "{:.2%} ± {:.2%}".format(rate, half_width))
+        half_width = confidence_half_width(statistics.score_difference_variance, statistics.games, self.confidence)
+        lines.append(self.dict["watch_margin"] + "{:+.3f} ± {:.3f}".format(statistics.score_difference_mean,
+                                                                           half_width))
+        self.SummaryLabel.setText("\n".join(lines))
+        self.Histogram.set_histogram(statistics_dict["score_difference_histogram"])
+
+    def stop(self):
+        """
+        Stops the worker and waits for its thread to finish.
+        """
+        self.worker.stop()
+        self.workerThread.quit()
+        self.workerThread.wait()
+        self.StopButton.setEnabled(False)
+
+    def closeEvent(self, event):
+        self.stop()
+        super().closeEvent(event)
+
 
 class GUI:
     """
@@ -36,17 +245,22 @@ class GUI:
         app = QApplication(sys.argv)
         main_window = QtWidgets.QMainWindow()
         main_window.setWindowTitle("Le Her")
-        GUIWindow(path_to_main=path_to_main, main_window=main_window, unshuffled_deck=unshuffled_deck, SCORER=SCORER,
-                  PLAYER_AI=PLAYER_AI,
-                  DEALER_AI=DEALER_AI,
-                  gui_language=gui_language,
-                  RNG_SEED=RNG_SEED, PRE_SHUFFLED_DECK=PRE_SHUFFLED_DECK,
-                  HIDE_UNKNOWN_CARDS=HIDE_UNKNOWN_CARDS)
+        window = GUIWindow(path_to_main=path_to_main, main_window=main_window, unshuffled_deck=unshuffled_deck,
+                           SCORER=SCORER,
+                           PLAYER_AI=PLAYER_AI,
+                           DEALER_AI=DEALER_AI,
+                           gui_language=gui_language,
+                           RNG_SEED=RNG_SEED, PRE_SHUFFLED_DECK=PRE_SHUFFLED_DECK,
+                           HIDE_UNKNOWN_CARDS=HIDE_UNKNOWN_CARDS)
+        app.aboutToQuit.connect(window.stop_threads)
         main_window.show()
         sys.exit(app.exec_())
 
 
 class GUIWindow(QMainWindow):
+    # (asks_player_ai, current_turn), handled by the AIWorker on the AI thread
+    ai_decision_requested = QtCore.pyqtSignal(bool, int)
+
     def __init__(self, path_to_main, main_window,
                  unshuffled_deck=STANDARD_DECK, SCORER=standard_scorer, PLAYER_AI=KeepNAndAbove(8, True),
                  DEALER_AI=KeepNAndAbove(8, False),
@@ -69,7 +283,7 @@ class GUIWindow(QMainWindow):
         super().__init__()
         self.TURNS_PER_GAME = 13
         self.HIDE_UNKNOWN_CARDS = HIDE_UNKNOWN_CARDS
-        self.CARDS = set(unshuffled_deck)
+        self.res_folder = path_to_main + "res/"
         self.game = LeHer(TURNS_PER_GAME=self.TURNS_PER_GAME, RNG_SEED=RNG_SEED, PLAYER_AI=PLAYER_AI,
                           DEALER_AI=DEALER_AI,
                           SCORER=SCORER, PRE_SHUFFLED_DECK=PRE_SHUFFLED_DECK, UNSHUFFLED_DECK=unshuffled_deck)
@@ -80,6 +294,17 @@ class GUIWindow(QMainWindow):
         self.dealer_knows_next_drawn_card = False
         self.is_player = None
         self.current_turn = None
+        # the AIs decide on their own thread, the buttons stay disabled until they did
+        self.aiThread = QtCore.QThread()
+        self.aiWorker = AIWorker(self.game)
+        self.aiWorker.moveToThread(self.aiThread)
+        self.ai_decision_requested.connect(self.aiWorker.decide)
+        self.aiWorker.decided.connect(self.apply_ai_decision)
+        self.aiThread.start()
+        # the games of the watch mode are played with their own instance, so they do not touch the game shown
+        self.watch_game_options = dict(TURNS_PER_GAME=self.TURNS_PER_GAME, RNG_SEED=RNG_SEED, PLAYER_AI=PLAYER_AI,
+                                       DEALER_AI=DEALER_AI, SCORER=SCORER, UNSHUFFLED_DECK=unshuffled_deck)
+        self.watchWindow = None
 
         main_window.setObjectName("Main Window")
         main_window.resize(1091, 631)
@@ -117,30 +342,20 @@ class GUIWindow(QMainWindow):
         self.playerActionButton = None
         self.playerNoActionButton = None
         self.dealerCardLabels = []
+        # the card (or 'unknown' or 'empty') every label shows, the art of a label is only set if it changes
+        self.playerCardArt = ["empty"] * self.TURNS_PER_GAME
+        self.dealerCardArt = ["empty"] * self.TURNS_PER_GAME
 
         # Create Content
-        self.cardArtDictionary = {
-            "unknown": (QtGui.QPixmap(path_to_main + "res/unknown.png")
-                        .scaled(QtCore.QSize(80, 140),
-                                aspectRatioMode=QtCore.Qt.AspectRatioMode.KeepAspectRatio)),
-            "empty": (QtGui.QPixmap(path_to_main + "res/empty.png")
-                      .scaled(QtCore.QSize(80, 140),
-                              aspectRatioMode=QtCore.Qt.AspectRatioMode.KeepAspectRatio))
-        }
-        for card in self.CARDS:
-            self.cardArtDictionary[card] = (QtGui.QPixmap(path_to_main + "res/" + card + ".png")
-                                            .scaled(QtCore.QSize(80, 140),
-                                                    aspectRatioMode=QtCore.Qt.AspectRatioMode.KeepAspectRatio))
-
         for i in range(0, self.TURNS_PER_GAME):
             self.playerCardLabels.append(QtWidgets.QLabel())
             self.playerCardLabels[i].setText("")
-            self.playerCardLabels[i].setPixmap(self.cardArtDictionary["empty"])
+            self.playerCardLabels[i].setPixmap(card_art(self.res_folder, "empty"))
             self.playerCardLabels[i].setObjectName("PlayerCard" + str(i))
             self.PlayerCardLabelContainer.addWidget(self.playerCardLabels[i])
             self.dealerCardLabels.append(QtWidgets.QLabel())
             self.dealerCardLabels[i].setText("")
-            self.dealerCardLabels[i].setPixmap(self.cardArtDictionary["empty"])
+            self.dealerCardLabels[i].setPixmap(card_art(self.res_folder, "empty"))
             self.dealerCardLabels[i].setObjectName("PlayerCard" + str(i))
             self.DealerCardLabelContainer.addWidget(self.dealerCardLabels[i])
 
@@ -173,6 +388,12 @@ class GUIWindow(QMainWindow):
         self.PlayerNoAction.setObjectName("PlayerNoAction")
         self.NoActionContainer.addWidget(self.PlayerNoAction)
         self.InteractionContainer.addLayout(self.NoActionContainer)
+        self.WatchButton = QtWidgets.QPushButton()
+        self.WatchButton.setSizePolicy(button_size_policy)
+        self.WatchButton.setObjectName("WatchButton")
+        self.WatchButton.setText(self.dict["watch"])
+        self.WatchButton.clicked.connect(lambda: self.watch(True))
+        self.InteractionContainer.addWidget(self.WatchButton)
         self.change_buttons_to_game_selection()
 
         self.LayoutContainer.addLayout(self.DealerCardLabelContainer)
@@ -222,11 +443,48 @@ class GUIWindow(QMainWindow):
         if self.is_player:
             self.enable_player()
         else:
-            if self.game.ask_ai(True, self.current_turn):
+            self.ai_decision_requested.emit(True, self.current_turn)
+
+    def apply_ai_decision(self, asks_player_ai, action):
+        """
+        Takes the action an AI decided on (see AIWorker).
+
+        :param asks_player_ai: whether the player AI decided
+        :param action: whether the AI takes their action
+        """
+        if asks_player_ai:
+            if action:
                 self.player_action()
             else:
                 self.player_no_action()
-            self.enable_dealer()
+        else:
+            if action:
+                self.dealer_action()
+            else:
+                self.dealer_no_action()
+
+    def watch(self, remove_drawn_cards_from_deck, **worker_options):
+        """
+        Opens a window that plays games of the player AI against the dealer AI in the background (see WatchWindow).
+        A window opened before is closed.
+
+        :param remove_drawn_cards_from_deck: whether cards drawn should be removed from the deck
+        :param worker_options: passed on to WatchWorker
+        """
+        if self.watchWindow is not None:
+            self.watchWindow.close()
+        self.watchWindow = WatchWindow(LeHer(**self.watch_game_options), remove_drawn_cards_from_deck, self.dict,
+                                       **worker_options)
+        self.watchWindow.show()
+
+    def stop_threads(self):
+        """
+        Stops the AI thread and the watch mode, called before the application quits.
+        """
+        if self.watchWindow is not None:
+            self.watchWindow.stop()
+        self.aiThread.quit()
+        self.aiThread.wait()
 
     def enable_dealer(self):
         """
@@ -295,15 +553,20 @@ class GUIWindow(QMainWindow):
     def change_card_art(self, change_for_player, card, index):
         """
         Changes the art for the specified card.
+        Nothing is done if the label already shows the card, so unchanged labels are not repainted.
 
         :param change_for_player: whether the card is changed for the player
         :param index: the index of the card to be changed
         :param card: the card the art should be changed to
         """
         if change_for_player:
-            self.playerCardLabels[index].setPixmap(self.cardArtDictionary[card])
+            labels, shown = self.playerCardLabels, self.playerCardArt
         else:
-            self.dealerCardLabels[index].setPixmap(self.cardArtDictionary[card])
+            labels, shown = self.dealerCardLabels, self.dealerCardArt
+        if shown[index] == card:
+            return
+        shown[index] = card
+        labels[index].setPixmap(card_art(self.res_folder, card))
 
     def reset_gui(self):
         """
@@ -358,6 +621,7 @@ class GUIWindow(QMainWindow):
         Updates the log and asks the player for their action.
         """
         self.disable_all()
+        self.game.dealer_no_action()
         self.ActionLog.setText(self.dict["dealer_no_action"])
         self.ask_player()
 
@@ -366,27 +630,25 @@ class GUIWindow(QMainWindow):
         Updates the log and asks the dealer for their action.
         """
         self.disable_all()
+        self.game.player_no_action()
         self.ActionLog.setText(self.dict["player_no_action"])
         self.ask_dealer()
 
     def ask_dealer(self):
         """
-        Waits for the user to click a button if they play as the dealer and lets the dealer AI decide if
-        the user plays as player.
+        Waits for the user to click a button if they play as the dealer and lets the dealer AI decide on the AI thread
+        (see apply_ai_decision) if the user plays as player.
         """
         if self.is_player:
-            if self.game.ask_ai(False, self.current_turn):
-                self.dealer_action()
-            else:
-                self.dealer_no_action()
+            self.ai_decision_requested.emit(False, self.current_turn)
         else:
             self.enable_dealer()
 
     def ask_player(self):
         """
         Increments turn count and checks if the game is over.
-        Waits for the user to click a button if they play as the player and lets the player AI decide if
-        the user plays as dealer.
+        Waits for the user to click a button if they play as the player and lets the player AI decide on the AI thread
+        (see apply_ai_decision) if the user plays as dealer.
         """
         self.current_turn += 1
         if self.current_turn >= self.TURNS_PER_GAME:
@@ -396,10 +658,7 @@ class GUIWindow(QMainWindow):
             self.update_card(True, self.current_turn)
             self.update_card(False, self.current_turn)
             if not self.is_player:
-                if self.game.ask_ai(True, self.current_turn):
-                    self.player_action()
-                else:
-                    self.player_no_action()
+                self.ai_decision_requested.emit(True, self.current_turn)
             else:
                 self.enable_player()
 
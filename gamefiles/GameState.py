@@ -0,0 +1,69 @@
+from Outcome import Outcome, OUTCOMES
+from CardEncoding import CodeView
+
+
+class GameState:
+    """
+    The state of a single game of LeHer, reused for every game.
+
+    All lists have a fixed size of one entry per turn and are overwritten in place by reset,
+    so playing a game does not allocate any lists.
+    Cards are card ids and histories are Outcomes,
+    the views show them to strategies as card strings and Outcomes (only the entries of turns played so far).
+    Entries of turns that have not been played yet are left over from the previous game.
+    """
+
+    __slots__ = ("turns", "turn_count", "player_cards", "dealer_cards", "player_history", "dealer_history",
+                 "revealed_player_cards_to_dealer", "revealed_dealer_cards_to_player", "player_score",
+                 "dealer_score", "next_player_card", "shuffled_deck", "current_deck", "draws", "drawn_cards",
+                 "record_drawn_cards", "player_card_view", "dealer_card_view", "player_history_view",
+                 "dealer_history_view", "all_false")
+
+    def __init__(self, turns, cards):
+        """
+        :param turns: the amount of turns per game
+        :param cards: the card string of every card id
+        """
+        self.turns = turns
+        self.turn_count = -1
+        self.player_cards = [0] * turns
+        self.dealer_cards = [0] * turns
+        self.player_history = [Outcome.NOT_ATTEMPTED] * turns
+        self.dealer_history = [Outcome.NOT_ATTEMPTED] * turns
+        self.revealed_player_cards_to_dealer = [False] * turns
+        self.revealed_dealer_cards_to_player = [False] * turns
+        self.all_false = [False] * turns
+        self.player_score = 0
+        self.dealer_score = 0
+        self.next_player_card = None
+        # the deck at the start of the game, it is not modified
+        self.shuffled_deck = []
+        # the deck while playing, cards are drawn from its end
+        self.current_deck = []
+        # the draws of a game where drawn cards are not removed from the deck, see DeckSource
+        self.draws = None
+        # the cards drawn with replacement in order, only recorded if record_drawn_cards is True (for logging)
+        self.drawn_cards = []
+        self.record_drawn_cards = False
+        self.player_card_view = CodeView(self.player_cards, cards, 0)
+        self.dealer_card_view = CodeView(self.dealer_cards, cards, 0)
+        self.player_history_view = CodeView(self.player_history, OUTCOMES, 0)
+        self.dealer_history_view = CodeView(self.dealer_history, OUTCOMES, 0)
+
+    def reset(self):
+        """
+        Resets everything but the decks, see reset_state in LeHer.
+        """
+        self.turn_count = -1
+        self.player_score = 0
+        self.dealer_score = 0
+        self.next_player_card = None
+        self.draws = None
+        self.revealed_player_cards_to_dealer[:] = self.all_false
+        self.revealed_dealer_cards_to_player[:] = self.all_false
+        self.player_card_view.length = 0
+        self.dealer_card_view.length = 0
+        self.player_history_view.length = 0
+        self.dealer_history_view.length = 0
+        if self.record_drawn_cards:
+            self.drawn_cards.clear()
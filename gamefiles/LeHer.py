@@ -1,11 +1,20 @@
-import random
-import time
-import math
+import numpy as np
 
 from Decks import STANDARD_DECK
 from Scorer import standard_scorer
 from Strategies import KeepNAndAbove
 import DataProcessing
+import BatchSimulation
+from Statistics import GameStatistics
+from CardEncoding import get_card_encoding
+from DeckSource import DeckSource
+from GameState import GameState
+from Outcome import Outcome, history_names
+from Progress import ProgressReporter, ConsoleOutput
+
+# the keys of the results of auto_play, see get_results in DataProcessing
+RESULT_KEYS = ("player_scores", "dealer_scores", "player_cards", "dealer_cards", "player_histories", "dealer_histories",
+               "decks")
 
 
 class LeHer:
@@ -23,155 +32,602 @@ class LeHer:
         :param SCORER: the scorer
         :param PLAYER_AI: the player AI
         :param DEALER_AI: the dealer AI
-        :param RNG_SEED: the rng seed
+        :param RNG_SEED: the rng seed, an int or a numpy SeedSequence (see spawn_rng_seeds), None for a random seed
         :param PRE_SHUFFLED_DECK: the deck to be used instead of using a shuffled version of the unshuffled deck
         :param TURNS_PER_GAME: the amount of turns per game, 13 by default
         """
-        if RNG_SEED is not None:
-            random.seed(RNG_SEED)
+        self.RNG_SEED = RNG_SEED
+        # every instance owns its random stream, so instances do not disturb each other (see spawn_rng_seeds)
+        if isinstance(RNG_SEED, np.random.SeedSequence):
+            self.seed_sequence = RNG_SEED
+        else:
+            self.seed_sequence = np.random.SeedSequence(RNG_SEED)
+        self.rng = np.random.default_rng(self.seed_sequence)
+        # one DeckSource per value of REMOVE_DRAWN_CARDS_FROM_DECK, see get_deck_source
+        self.deck_sources = {}
+        # the engine works with card ids, card strings are only used by strategies, logging and the gui
+        self.card_encoding = get_card_encoding(UNSHUFFLED_DECK, SCORER, PRE_SHUFFLED_DECK or ())
+        self.unshuffled_deck_ids = self.card_encoding.deck
+        self.unshuffled_deck_array = self.card_encoding.deck_array
+        self.pre_shuffled_deck_ids = None
+        if PRE_SHUFFLED_DECK is not None:
+            self.pre_shuffled_deck_ids = self.card_encoding.encode(PRE_SHUFFLED_DECK)
+        self.player_decision_table = None
+        self.dealer_decision_table = None
         self.UNSHUFFLED_DECK = UNSHUFFLED_DECK
         self.SCORER = SCORER
         self.PLAYER_AI = PLAYER_AI
         self.DEALER_AI = DEALER_AI
         self.PRE_SHUFFLED_DECK = PRE_SHUFFLED_DECK
         self.TURNS_PER_GAME = TURNS_PER_GAME
+        self.update_decision_tables()
 
         self.is_player = None
         self.remove_drawn_cards_from_deck = None
-        self.turn_count = None
-        self.player_cards = None
-        self.player_score = None
-        self.player_history = None
-        self.dealer_cards = None
-        self.dealer_score = None
-        self.dealer_history = None
-        self.revealed_player_cards_to_dealer = None
-        self.revealed_dealer_cards_to_player = None
-        self.shuffled_deck = None
-        self.current_deck = None
-        self.next_player_card = None
+        self.state = GameState(TURNS_PER_GAME, self.card_encoding.cards)
 
     def auto_play(self, GAMES_TO_AUTOPLAY, AUTO_PLAY_LOG_DIR, auto_play_log_filename, REMOVE_DRAWN_CARDS_FROM_DECK,
-                  SILENT_MODE=False, LOG_ALL=False):
+                  SILENT_MODE=False, LOG_ALL=False, LOG_FORMAT="json", PROGRESS=None, CHECKPOINT=None,
+                  RETURN_RESULTS=True):
         """
         Plays a specified amount of games with the player AI against the dealer AI with no user input.
-        Gives a progress update every percent of games played which includes current percent done, time since start and
-        time since last percent.
+        Reports the progress (see play_games) to the console every second unless in silent mode.
+
+        With a checkpoint the log is written up to the current game and the position of its end is saved
+        with every checkpoint (json logs are rewritten as a whole every time, prefer jsonl or binary).
+        A resumed run removes the games logged after the last checkpoint before it continues.
 
         :param GAMES_TO_AUTOPLAY: the amount of games to play
         :param AUTO_PLAY_LOG_DIR: the directory of the log file (relative or absolute)
-        :param auto_play_log_filename: the name of the log file (with .json extension)
+        :param auto_play_log_filename: the name of the log file (the extension of the log format is added if missing)
         :param REMOVE_DRAWN_CARDS_FROM_DECK: whether cards drawn should be removed from the deck
         :param SILENT_MODE: turns off progress updates in console
         :param LOG_ALL: whether everything should be logged or only the scores
+        :param LOG_FORMAT: "json" keeps all games in memory and writes them as one json document at the end
+                           (the default, so existing callers keep getting and appending to .json logs;
+                           tournament and the command line default to "jsonl"),
+                           "jsonl" streams the games to a json lines file in bounded batches,
+                           "jsonl.gz" streams them to a gzip compressed json lines file written by a background
+                           thread while the games are played (see BackgroundLogger in DataProcessing),
+                           "binary" streams the games to a binary file with one fixed size record per game
+                           (see BinaryLogger in DataProcessing)
+        :param PROGRESS: a ProgressReporter (see Progress) the progress is reported to instead of the console,
+                         also used in silent mode
+        :param CHECKPOINT: a Checkpoint (see Checkpoint) the run is saved to and resumed from, None to not save it
+        :param RETURN_RESULTS: whether the results are returned, they are collected while playing
+                               (games logged to the file before are read from it),
+                               so long runs can turn it off to not keep every game in memory
         :return: returns a dictionary with the results of the games (as well as any previous games from the same file)
-                 see get_results in DataProcessing for more info
-        """
-        # add .json at the end if not already present
-        if len(auto_play_log_filename) <= 5:
-            auto_play_log_filename = auto_play_log_filename + ".json"
-        elif auto_play_log_filename[-5:] != ".json":
-            auto_play_log_filename = auto_play_log_filename + ".json"
-        current_game = 0
-        logger = DataProcessing.StaggeredLogger(AUTO_PLAY_LOG_DIR, auto_play_log_filename)
-        start_time = time.time()
-        time_since_last_interval_completion = time.time()
+                 in the format of get_results in DataProcessing (scores and everything else if LOG_ALL),
+                 None if RETURN_RESULTS is False
+        """
+        # add the extension of the log format at the end if not already present
+        auto_play_log_filename = DataProcessing.with_log_extension(auto_play_log_filename, LOG_FORMAT)
+        self.update_decision_tables()
+        run = {"method": "auto_play", "games": GAMES_TO_AUTOPLAY, "log_file": auto_play_log_filename,
+               "log_format": LOG_FORMAT, "log_all": LOG_ALL,
+               "configuration": self.describe(REMOVE_DRAWN_CARDS_FROM_DECK)}
+        saved = self.load_checkpoint(CHECKPOINT, run)
+        if saved is not None:
+            DataProcessing.truncate_log(AUTO_PLAY_LOG_DIR, auto_play_log_filename, saved["log_position"])
+        if LOG_FORMAT == "jsonl":
+            logger = DataProcessing.StreamingLogger(AUTO_PLAY_LOG_DIR, auto_play_log_filename)
+        elif LOG_FORMAT == "jsonl.gz":
+            logger = DataProcessing.BackgroundLogger(AUTO_PLAY_LOG_DIR, auto_play_log_filename)
+        elif LOG_FORMAT == "binary":
+            cards = self.card_encoding.cards
+            # without removing drawn cards the logged deck are the (up to 3 per turn) cards drawn during the game
+            deck_size = max(len(self.UNSHUFFLED_DECK), len(self.PRE_SHUFFLED_DECK or []), 3 * self.TURNS_PER_GAME)
+            # runs with other seeds can be appended, so the seed is stored per segment instead of in the header
+            configuration = self.describe(REMOVE_DRAWN_CARDS_FROM_DECK)
+            segment = {"rng_seed": configuration.pop("rng_seed")}
+            logger = DataProcessing.BinaryLogger(AUTO_PLAY_LOG_DIR, auto_play_log_filename, cards=cards,
+                                                 turns=self.TURNS_PER_GAME, deck_size=deck_size, log_all=LOG_ALL,
+                                                 max_score=self.TURNS_PER_GAME * max(self.card_encoding.scores),
+                                                 run_configuration=configuration, segment=segment,
+                                                 resume=saved is not None)
+        else:
+            logger = DataProcessing.StaggeredLogger(AUTO_PLAY_LOG_DIR, auto_play_log_filename)
+        # the games logged before are read back at the end, the games played now are collected while logging
+        logged_before = logger.offset
+        results = None
+        if RETURN_RESULTS:
+            results = {key: [] if LOG_ALL or key.endswith("scores") else None for key in RESULT_KEYS}
+        # the drawn cards are only recorded if the deck gets logged
+        self.state.record_drawn_cards = LOG_ALL
+        self.play_games(GAMES_TO_AUTOPLAY, REMOVE_DRAWN_CARDS_FROM_DECK,
+                        lambda: self.log_game(logger, LOG_ALL, LOG_FORMAT, results), SILENT_MODE, PROGRESS,
+                        CHECKPOINT, run, lambda: {"log_position": logger.log_position()}, saved)
+        # the last checkpoint already logged every game
+        if CHECKPOINT is None:
+            logger.log_staggered_games()
+        if not RETURN_RESULTS:
+            return None
+        if logged_before:
+            previous_results = DataProcessing.get_results(AUTO_PLAY_LOG_DIR, auto_play_log_filename,
+                                                          include_scores=True, include_deck=LOG_ALL,
+                                                          include_cards=LOG_ALL, include_history=LOG_ALL,
+                                                          id_range=(0, logged_before))
+            for key in RESULT_KEYS:
+                if results[key] is not None:
+                    results[key][:0] = previous_results[key]
+        if LOG_FORMAT == "binary":
+            results["header"] = DataProcessing.read_binary_header(AUTO_PLAY_LOG_DIR + auto_play_log_filename)[0]
+        return results
+
+    def auto_play_statistics(self, GAMES_TO_AUTOPLAY, REMOVE_DRAWN_CARDS_FROM_DECK, SILENT_MODE=False, PROGRESS=None,
+                             CHECKPOINT=None):
+        """
+        Plays a specified amount of games with the player AI against the dealer AI with no user input like auto_play,
+        but only keeps running aggregates instead of logging every game.
+        No log file is written.
+
+        :param GAMES_TO_AUTOPLAY: the amount of games to play
+        :param REMOVE_DRAWN_CARDS_FROM_DECK: whether cards drawn should be removed from the deck
+        :param SILENT_MODE: turns off progress updates in console
+        :param PROGRESS: a ProgressReporter the progress is reported to, see auto_play
+        :param CHECKPOINT: a Checkpoint the run (including the aggregates) is saved to and resumed from, see auto_play
+        :return: returns a GameStatistics (see Statistics) of the games played
+        """
+        self.update_decision_tables()
+        run = {"method": "auto_play_statistics", "games": GAMES_TO_AUTOPLAY,
+               "configuration": self.describe(REMOVE_DRAWN_CARDS_FROM_DECK)}
+        saved = self.load_checkpoint(CHECKPOINT, run)
+        if saved is None:
+            statistics = GameStatistics(self.TURNS_PER_GAME)
+        else:
+            statistics = GameStatistics.from_dict(saved["statistics"])
+        state = self.state
+        state.record_drawn_cards = False
+        self.play_games(GAMES_TO_AUTOPLAY, REMOVE_DRAWN_CARDS_FROM_DECK,
+                        lambda: statistics.add_game(state.player_score, state.dealer_score, state.player_history,
+                                                    state.dealer_history), SILENT_MODE, PROGRESS,
+                        CHECKPOINT, run, lambda: {"statistics": statistics.to_dict()}, saved)
+        return statistics
+
+    def play_games(self, GAMES_TO_AUTOPLAY, REMOVE_DRAWN_CARDS_FROM_DECK, record_game, SILENT_MODE=False,
+                   PROGRESS=None, CHECKPOINT=None, run=None, checkpoint_state=None, saved=None):
+        """
+        Plays a specified amount of games and calls record_game after every game (e.g. to log it).
+        The progress reporter is only called once the amount of games it asked for has been played
+        (see ProgressReporter), sampled games are played with play_game_timed
+        and the time of record_game counts as the log phase.
+        The checkpoint is saved every every_games games and after the last game, see Checkpoint.
+
+        :param GAMES_TO_AUTOPLAY: the amount of games to play
+        :param REMOVE_DRAWN_CARDS_FROM_DECK: whether cards drawn should be removed from the deck
+        :param record_game: called without arguments after every game, while the state still holds the game
+        :param SILENT_MODE: turns off progress updates in console
+        :param PROGRESS: a ProgressReporter the progress is reported to, see auto_play
+        :param CHECKPOINT: the Checkpoint the run is saved to, None to not save it
+        :param run: the description of the run, see Checkpoint
+        :param checkpoint_state: returns the state of the run (besides the amount of games and the random state)
+                                 as dictionary, called at every checkpoint
+        :param saved: the saved state the run is resumed from (see load_checkpoint), None to start a new run
+        """
+        if PROGRESS is None and not SILENT_MODE:
+            PROGRESS = ProgressReporter([ConsoleOutput()])
+        current_game = 0 if saved is None else saved["games"]
+        # -1 is never reached, so nothing is reported, sampled or saved without a reporter or checkpoint
+        next_check = next_sample = next_checkpoint = -1
+        if PROGRESS is not None:
+            next_check = PROGRESS.start(GAMES_TO_AUTOPLAY, current_game)
+            next_sample = PROGRESS.next_sample(current_game)
+        if CHECKPOINT is not None:
+            next_checkpoint = CHECKPOINT.next_save(current_game, GAMES_TO_AUTOPLAY)
         while GAMES_TO_AUTOPLAY > current_game:
-            self.reset_state(None, REMOVE_DRAWN_CARDS_FROM_DECK)
-            # turn_count starts at -1 and increases in draw_cards
-            # turn_count during condition check is one less than during the loop
-            # condition is offset by 1 to accommodate for that
-            while self.TURNS_PER_GAME > self.turn_count + 1:
-                self.draw_cards()
-                if self.PLAYER_AI.action(self.player_cards, self.revealed_player_cards_to_dealer,
-                                         self.revealed_dealer_cards_to_player, self.player_history,
-                                         self.dealer_history, self.turn_count):
-                    self.player_action()
-                else:
-                    self.player_history.append("NOT_ATTEMPTED")
-                if self.DEALER_AI.action(self.dealer_cards, self.revealed_player_cards_to_dealer,
-                                         self.revealed_dealer_cards_to_player, self.player_history,
-                                         self.dealer_history, self.turn_count):
-                    self.dealer_action()
-                else:
-                    self.dealer_history.append("NOT_ATTEMPTED")
-            self.score()
-            if LOG_ALL:
-                logger.add_game(player_score=self.player_score, dealer_score=self.dealer_score,
-                                player_cards=self.player_cards, dealer_cards=self.dealer_cards,
-                                player_history=self.player_history, dealer_history=self.dealer_history,
-                                deck_to_start_of_game=self.shuffled_deck)
+            if current_game == next_sample:
+                phase_times = self.play_game_timed(REMOVE_DRAWN_CARDS_FROM_DECK, PROGRESS.clock)
+                log_start = PROGRESS.clock()
+                record_game()
+                phase_times["log"] = PROGRESS.clock() - log_start
+                PROGRESS.add_phase_times(phase_times)
+                next_sample = PROGRESS.next_sample(current_game + 1)
             else:
-                logger.add_game(player_score=self.player_score, dealer_score=self.dealer_score)
+                self.play_game(REMOVE_DRAWN_CARDS_FROM_DECK)
+                record_game()
             current_game += 1
-            if not SILENT_MODE:
-                for i in range(0, 100):
-                    if current_game == math.floor(i * 0.01 * GAMES_TO_AUTOPLAY):
-                        end_time = time.time()
-                        print(str(i) + "% Done (" + str(end_time - start_time) + ") (" + str(
-                            end_time - time_since_last_interval_completion) + ")")
-                        time_since_last_interval_completion = time.time()
-        logger.log_staggered_games()
+            if current_game == next_check:
+                next_check = PROGRESS.update(current_game)
+            if current_game == next_checkpoint:
+                CHECKPOINT.save(run, current_game, current_game == GAMES_TO_AUTOPLAY,
+                                random_state=self.get_random_state(), **checkpoint_state())
+                next_checkpoint = CHECKPOINT.next_save(current_game, GAMES_TO_AUTOPLAY)
+        if PROGRESS is not None:
+            PROGRESS.finish(current_game)
+
+    def load_checkpoint(self, CHECKPOINT, run):
+        """
+        Loads the saved state of a run and restores the random state of this instance to it.
+
+        :param CHECKPOINT: the Checkpoint of the run, None if the run is not saved
+        :param run: the description of the run, see Checkpoint
+        :return: returns the saved state or None if there is none
+        """
+        if CHECKPOINT is None:
+            return None
+        saved = CHECKPOINT.load(run)
+        if saved is not None:
+            self.set_random_state(saved["random_state"])
+        return saved
+
+    def get_random_state(self):
+        """
+        :return: returns the json serializable state of the random stream of this instance,
+                 including the current block of every DeckSource and the random numbers of the AIs
+                 (see get_random_state in Strategy)
+        """
+        return {
+            "rng": self.rng.bit_generator.state,
+            "player_ai": self.PLAYER_AI.get_random_state(),
+            "dealer_ai": self.DEALER_AI.get_random_state(),
+            "deck_sources": [{"remove_drawn_cards_from_deck": remove, "block_state": deck_source.block_state,
+                              "position": deck_source.position}
+                             for remove, deck_source in self.deck_sources.items()]
+        }
+
+    def set_random_state(self, random_state):
+        """
+        Continues the random stream from a state returned by get_random_state,
+        so the following games are the same as after the state was taken.
+
+        :param random_state: the state
+        """
+        for deck_source_state in random_state["deck_sources"]:
+            self.get_deck_source(deck_source_state["remove_drawn_cards_from_deck"]).restore(
+                deck_source_state["block_state"], deck_source_state["position"])
+        self.rng.bit_generator.state = random_state["rng"]
+        # states saved before the AIs were part of them do not have their random numbers
+        for ai, key in [(self.PLAYER_AI, "player_ai"), (self.DEALER_AI, "dealer_ai")]:
+            if random_state.get(key) is not None:
+                ai.set_random_state(random_state[key])
+
+    def log_game(self, logger, LOG_ALL, LOG_FORMAT, results=None):
+        """
+        Adds the game in the state to the logger and to the results, see auto_play.
+
+        :param results: dictionary of lists the game is appended to in the format of get_results in DataProcessing,
+                        None to not collect the game
+        """
+        state = self.state
+        decode = self.card_encoding.decode
+        # the lists of the state are reused by the next game, so the loggers copy, encode or decode them
+        if LOG_ALL and LOG_FORMAT == "binary":
+            # the binary log uses the card ids of the card encoding as codes
+            logger.add_encoded_game(player_score=state.player_score, dealer_score=state.dealer_score,
+                                    player_cards=state.player_cards, dealer_cards=state.dealer_cards,
+                                    player_history=state.player_history, dealer_history=state.dealer_history,
+                                    deck_to_start_of_game=state.shuffled_deck)
+            if results is not None:
+                player_cards, dealer_cards = decode(state.player_cards), decode(state.dealer_cards)
+                deck = decode(state.shuffled_deck)
+        elif LOG_ALL:
+            player_cards, dealer_cards = decode(state.player_cards), decode(state.dealer_cards)
+            deck = decode(state.shuffled_deck)
+            logger.add_game(player_score=state.player_score, dealer_score=state.dealer_score,
+                            player_cards=player_cards, dealer_cards=dealer_cards,
+                            player_history=state.player_history, dealer_history=state.dealer_history,
+                            deck_to_start_of_game=deck)
+        else:
+            logger.add_game(player_score=state.player_score, dealer_score=state.dealer_score)
+        if results is None:
+            return
+        results["player_scores"].append(state.player_score)
+        results["dealer_scores"].append(state.dealer_score)
         if LOG_ALL:
-            return DataProcessing.get_results(output_folder=AUTO_PLAY_LOG_DIR, file_name=auto_play_log_filename,
-                                              include_scores=True, include_deck=True, include_cards=True,
-                                              include_history=True)
+            results["player_cards"].append(player_cards)
+            results["dealer_cards"].append(dealer_cards)
+            results["player_histories"].append(history_names(state.player_history))
+            results["dealer_histories"].append(history_names(state.dealer_history))
+            results["decks"].append(deck)
+
+    def update_decision_tables(self):
+        """
+        Builds the decision tables (decision by turn and card id) of the AIs that are stateless by turn and card.
+        The table of an AI that is not stateless by turn and card is None.
+        Called at the start of every auto play, call it manually if an AI was changed in between.
+        """
+        cards = self.card_encoding.cards
+        self.player_decision_table = None
+        self.dealer_decision_table = None
+        if self.PLAYER_AI.STATELESS_BY_TURN_AND_CARD:
+            self.player_decision_table = self.PLAYER_AI.turn_decision_table(cards, self.TURNS_PER_GAME)
+        if self.DEALER_AI.STATELESS_BY_TURN_AND_CARD:
+            self.dealer_decision_table = self.DEALER_AI.turn_decision_table(cards, self.TURNS_PER_GAME)
+
+    def play_game(self, REMOVE_DRAWN_CARDS_FROM_DECK, REPLAYED_NUMBERS=None):
+        """
+        Plays a single game with the player AI against the dealer AI, including the scoring at the end.
+
+        :param REMOVE_DRAWN_CARDS_FROM_DECK: whether cards drawn should be removed from the deck
+        :param REPLAYED_NUMBERS: the random numbers of the game (see DeckSource)
+                                 instead of new ones, the game is then the same as in the batch engine.
+                                 Can not be combined with PRE_SHUFFLED_DECK.
+        """
+        self.reset_state(None, REMOVE_DRAWN_CARDS_FROM_DECK, REPLAYED_NUMBERS)
+        self.play_turns()
+
+    def play_game_timed(self, REMOVE_DRAWN_CARDS_FROM_DECK, clock):
+        """
+        Plays a single game exactly like play_game, but measures the time spent in every phase:
+        drawing (including shuffling), asking the strategies, taking the actions and scoring.
+        Only used for sampled games (see play_games), so play_game does not pay for reading the clock.
+
+        :param REMOVE_DRAWN_CARDS_FROM_DECK: whether cards drawn should be removed from the deck
+        :param clock: the clock (in seconds)
+        :return: returns a dictionary phase -> seconds (see PHASES in Progress, without the log phase)
+        """
+        start = clock()
+        self.reset_state(None, REMOVE_DRAWN_CARDS_FROM_DECK)
+        return self.play_turns(clock, start)
+
+    def play_turns(self, clock=None, start=0.0):
+        """
+        Plays every turn of the game in the state (see reset_state) and scores it,
+        the turns of play_game and play_game_timed.
+        The clock is only read if one is given.
+
+        :param clock: the clock (in seconds), None to not measure the phases
+        :param start: the time the game started at, the time since then counts as drawing
+        :return: returns a dictionary phase -> seconds (see play_game_timed), None without a clock
+        """
+        draw_time = strategy_time = action_time = 0.0
+        drawn = asked = acted = 0.0
+        state = self.state
+        # turn_count starts at -1 and increases in draw_cards
+        # turn_count during condition check is one less than during the loop
+        # condition is offset by 1 to accommodate for that
+        # strategies that are stateless by turn and card are looked up in their decision table instead of being asked
+        player_decisions = self.player_decision_table
+        dealer_decisions = self.dealer_decision_table
+        while self.TURNS_PER_GAME > state.turn_count + 1:
+            self.draw_cards()
+            turn = state.turn_count
+            if clock is not None:
+                drawn = clock()
+                draw_time += drawn - start
+            if player_decisions is not None:
+                trades = player_decisions[turn][state.player_cards[turn]]
+            else:
+                trades = self.ask_ai(True, turn)
+            if clock is not None:
+                asked = clock()
+                strategy_time += asked - drawn
+            if trades:
+                self.player_action()
+            else:
+                self.player_no_action()
+            if clock is not None:
+                acted = clock()
+                action_time += acted - asked
+            if dealer_decisions is not None:
+                redraws = dealer_decisions[turn][state.dealer_cards[turn]]
+            else:
+                redraws = self.ask_ai(False, turn)
+            if clock is not None:
+                asked = clock()
+                strategy_time += asked - acted
+            if redraws:
+                self.dealer_action()
+            else:
+                self.dealer_no_action()
+            if clock is not None:
+                start = clock()
+                action_time += start - asked
+        self.score()
+        if clock is None:
+            return None
+        return {"draw": draw_time, "strategy": strategy_time, "action": action_time, "score": clock() - start}
+
+    def batch_play_statistics(self, GAMES_TO_AUTOPLAY, REMOVE_DRAWN_CARDS_FROM_DECK, BATCH_SIZE=100000,
+                              CHECKPOINT=None):
+        """
+        Like batch_play, but only returns running aggregates, so no per game data is kept past a batch.
+
+        :param GAMES_TO_AUTOPLAY: the amount of games to play
+        :param REMOVE_DRAWN_CARDS_FROM_DECK: whether cards drawn should be removed from the deck
+        :param BATCH_SIZE: the amount of games simulated at once
+        :param CHECKPOINT: a Checkpoint (see Checkpoint) the run is saved to and resumed from, None to not save it,
+                           it is saved after the first batch that reaches every_games games since the last save
+        :return: returns a GameStatistics (see Statistics) of the games played
+        """
+        run = {"method": "batch_play_statistics", "games": GAMES_TO_AUTOPLAY, "batch_size": BATCH_SIZE,
+               "configuration": self.describe(REMOVE_DRAWN_CARDS_FROM_DECK)}
+        saved = self.load_checkpoint(CHECKPOINT, run)
+        if saved is None:
+            statistics = GameStatistics(self.TURNS_PER_GAME)
+            played = 0
         else:
-            return DataProcessing.get_results(output_folder=AUTO_PLAY_LOG_DIR, file_name=auto_play_log_filename,
-                                              include_scores=True)
+            statistics = GameStatistics.from_dict(saved["statistics"])
+            played = saved["games"]
+        next_checkpoint = -1
+        if CHECKPOINT is not None:
+            next_checkpoint = CHECKPOINT.next_save(played, GAMES_TO_AUTOPLAY)
+        while played < GAMES_TO_AUTOPLAY:
+            current_batch = min(BATCH_SIZE, GAMES_TO_AUTOPLAY - played)
+            results = self.batch_play(current_batch, REMOVE_DRAWN_CARDS_FROM_DECK, BATCH_SIZE=BATCH_SIZE,
+                                      INCLUDE_HISTORY=True)
+            statistics.add_batch(results["player_scores"], results["dealer_scores"], results["player_histories"],
+                                 results["dealer_histories"])
+            played += current_batch
+            if CHECKPOINT is not None and played >= next_checkpoint:
+                CHECKPOINT.save(run, played, played == GAMES_TO_AUTOPLAY, random_state=self.get_random_state(),
+                                statistics=statistics.to_dict())
+                next_checkpoint = CHECKPOINT.next_save(played, GAMES_TO_AUTOPLAY)
+        return statistics
+
+    def batch_play(self, GAMES_TO_AUTOPLAY, REMOVE_DRAWN_CARDS_FROM_DECK, BATCH_SIZE=100000, INCLUDE_CARDS=False,
+                   INCLUDE_HISTORY=False):
+        """
+        Plays a specified amount of games with the player AI against the dealer AI like auto_play,
+        but simulates BATCH_SIZE games at once with numpy arrays.
+        Nothing is logged.
+        Plays the same games as auto_play would (see get_deck_source),
+        but only supports strategies that are stateless by turn and card (like KeepNAndAbove).
+        See play_batch in BatchSimulation for more info.
+
+        :param GAMES_TO_AUTOPLAY: the amount of games to play
+        :param REMOVE_DRAWN_CARDS_FROM_DECK: whether cards drawn should be removed from the deck
+        :param BATCH_SIZE: the amount of games simulated at once
+        :param INCLUDE_CARDS: whether the cards in hand at the end of the game are part of the return dictionary
+        :param INCLUDE_HISTORY: whether the attempted actions are part of the return dictionary
+        :return: returns a dictionary with the results of the games as numpy arrays
+        """
+        deck_source = None
+        if self.PRE_SHUFFLED_DECK is None:
+            deck_source = self.get_deck_source(REMOVE_DRAWN_CARDS_FROM_DECK)
+        return BatchSimulation.play_batch(GAMES_TO_AUTOPLAY, self.rng, unshuffled_deck=self.UNSHUFFLED_DECK,
+                                          scorer=self.SCORER, player_ai=self.PLAYER_AI, dealer_ai=self.DEALER_AI,
+                                          remove_drawn_cards_from_deck=REMOVE_DRAWN_CARDS_FROM_DECK,
+                                          pre_shuffled_deck=self.PRE_SHUFFLED_DECK, turns=self.TURNS_PER_GAME,
+                                          batch_size=BATCH_SIZE, include_cards=INCLUDE_CARDS,
+                                          include_history=INCLUDE_HISTORY, deck_source=deck_source)
+
+    def get_deck_source(self, REMOVE_DRAWN_CARDS_FROM_DECK):
+        """
+        The scalar engine and the batch engine of an instance take their games from the same DeckSource,
+        so both play the same games with the same RNG_SEED.
+
+        :param REMOVE_DRAWN_CARDS_FROM_DECK: whether cards drawn are removed from the deck
+        :return: returns the DeckSource of this instance for shuffled decks or draws with replacement
+        """
+        deck_source = self.deck_sources.get(REMOVE_DRAWN_CARDS_FROM_DECK)
+        if deck_source is None:
+            deck_source = DeckSource(self.unshuffled_deck_array, self.TURNS_PER_GAME, REMOVE_DRAWN_CARDS_FROM_DECK,
+                                     self.rng)
+            self.deck_sources[REMOVE_DRAWN_CARDS_FROM_DECK] = deck_source
+        return deck_source
+
+    def spawn_rng_seeds(self, amount):
+        """
+        Derives independent random streams from the random stream of this instance,
+        e.g. for games played in parallel. Pass one as RNG_SEED to another LeHer.
+        The same RNG_SEED always spawns the same seeds.
 
-    def reset_state(self, is_player, remove_drawn_cards_from_deck):
+        :param amount: the amount of seeds
+        :return: returns a list of numpy SeedSequences
         """
-        Resets the state of all logic elements.
+        return self.seed_sequence.spawn(amount)
+
+    def describe(self, REMOVE_DRAWN_CARDS_FROM_DECK):
+        """
+        :param REMOVE_DRAWN_CARDS_FROM_DECK: whether cards drawn are removed from the deck
+        :return: returns a json serializable dictionary describing the configuration of this game
+        """
+        def describe_strategy(strategy):
+            description = {"class": type(strategy).__name__}
+            for name, value in vars(strategy).items():
+                if isinstance(value, (bool, int, float, str)):
+                    description[name] = value
+                elif isinstance(value, (list, tuple)) and all(isinstance(item, (bool, int, float, str))
+                                                              for item in value):
+                    description[name] = list(value)
+            return description
+
+        return {
+            "unshuffled_deck": self.UNSHUFFLED_DECK,
+            "pre_shuffled_deck": self.PRE_SHUFFLED_DECK,
+            "scorer": getattr(self.SCORER, "__name__", repr(self.SCORER)),
+            "player_ai": describe_strategy(self.PLAYER_AI),
+            "dealer_ai": describe_strategy(self.DEALER_AI),
+            "rng_seed": self.RNG_SEED if isinstance(self.RNG_SEED, (int, str)) else repr(self.RNG_SEED),
+            "turns_per_game": self.TURNS_PER_GAME,
+            "remove_drawn_cards_from_deck": REMOVE_DRAWN_CARDS_FROM_DECK
+        }
+
+    def reset_state(self, is_player, remove_drawn_cards_from_deck, replayed_numbers=None):
+        """
+        Resets the state of all logic elements in place (see GameState).
         Does not reset the gui.
 
         :param is_player: whether the user is the player
         :param remove_drawn_cards_from_deck:  whether cards drawn from the deck should be removed
+        :param replayed_numbers: the shuffled deck (card ids) if cards drawn are removed from the deck,
+                                 the draws (see simulate_duplicates in BatchSimulation) of a single game otherwise,
+                                 None to shuffle or draw randomly
         """
-        self.next_player_card = None
+        state = self.state
+        state.reset()
         self.is_player = is_player
         self.remove_drawn_cards_from_deck = remove_drawn_cards_from_deck
-        self.turn_count = -1
-        self.player_cards = []
-        self.player_score = 0
-        self.player_history = []
-        self.dealer_cards = []
-        self.dealer_score = 0
-        self.dealer_history = []
-        self.revealed_player_cards_to_dealer = []
-        self.revealed_dealer_cards_to_player = []
-        for i in range(0, self.TURNS_PER_GAME):
-            self.revealed_player_cards_to_dealer.append(False)
-            self.revealed_dealer_cards_to_player.append(False)
-        # Copy of deck is used to reset / reshuffle if the user plays more than one game.
-        if self.PRE_SHUFFLED_DECK is not None:
-            self.shuffled_deck = self.PRE_SHUFFLED_DECK[:]
+        if not remove_drawn_cards_from_deck and self.PRE_SHUFFLED_DECK is None:
+            # every card the game could draw with replacement is drawn in advance, see draw_with_replacement
+            if replayed_numbers is not None:
+                state.draws = replayed_numbers
+            else:
+                state.draws = self.get_deck_source(False).next_game()
+            # the drawn cards are recorded instead of a deck
+            state.shuffled_deck = state.drawn_cards
+            return
+        # The shuffled deck is not modified, it is logged as the state of the deck at the start of the game.
+        if replayed_numbers is not None:
+            state.shuffled_deck = replayed_numbers
+        elif self.PRE_SHUFFLED_DECK is not None:
+            state.shuffled_deck = self.pre_shuffled_deck_ids
         else:
-            self.shuffled_deck = self.UNSHUFFLED_DECK[:]
-            random.shuffle(self.shuffled_deck)
-        # Copy of shuffled deck is used in case the state of the deck at the start of the game gets logged.
-        self.current_deck = self.shuffled_deck[:]
-        # Created Cards are appended to shuffled deck if drawn cards are not removed from the deck instead
-        if not self.remove_drawn_cards_from_deck and self.PRE_SHUFFLED_DECK is None:
-            self.shuffled_deck = []
+            state.shuffled_deck = self.get_deck_source(True).next_game()
+        state.current_deck[:] = state.shuffled_deck
 
     def draw_cards(self):
         """
         Add a card to both the player and dealer
         """
-        self.turn_count += 1
+        state = self.state
+        state.turn_count += 1
+        turn = state.turn_count
         if not self.remove_drawn_cards_from_deck and self.PRE_SHUFFLED_DECK is None:
-            if self.next_player_card is None:
-                self.player_cards.append(random.choice(self.current_deck))
-                self.shuffled_deck.append(self.player_cards[-1])
+            if state.next_player_card is None:
+                state.player_cards[turn] = self.draw_with_replacement(0)
             else:
-                self.player_cards.append(self.next_player_card)
-                self.next_player_card = None
-            self.dealer_cards.append(random.choice(self.current_deck))
-            self.shuffled_deck.append(self.dealer_cards[-1])
+                state.player_cards[turn] = state.next_player_card
+                state.next_player_card = None
+            state.dealer_cards[turn] = self.draw_with_replacement(1)
         else:
-            self.player_cards.append(self.current_deck.pop())
-            self.dealer_cards.append(self.current_deck.pop())
+            state.player_cards[turn] = state.current_deck.pop()
+            state.dealer_cards[turn] = state.current_deck.pop()
+        state.player_card_view.length = turn + 1
+        state.dealer_card_view.length = turn + 1
+
+    def draw_with_replacement(self, draw_index):
+        """
+        Draws a card without removing it from the deck.
+
+        :param draw_index: 0 for the card of the player, 1 for the card of the dealer, 2 for a redraw of the dealer
+        :return: returns the card id of the drawn card
+        """
+        state = self.state
+        card = state.draws[draw_index][state.turn_count]
+        if state.record_drawn_cards:
+            state.drawn_cards.append(card)
+        return card
+
+    def record_player_outcome(self, outcome):
+        """
+        :param outcome: the Outcome of the action of the player this turn
+        """
+        state = self.state
+        state.player_history[state.turn_count] = outcome
+        state.player_history_view.length = state.turn_count + 1
+
+    def record_dealer_outcome(self, outcome):
+        """
+        :param outcome: the Outcome of the action of the dealer this turn
+        """
+        state = self.state
+        state.dealer_history[state.turn_count] = outcome
+        state.dealer_history_view.length = state.turn_count + 1
+
+    def player_no_action(self):
+        """
+        Records that the player did not try to trade this turn.
+        """
+        self.record_player_outcome(Outcome.NOT_ATTEMPTED)
+
+    def dealer_no_action(self):
+        """
+        Records that the dealer did not try to redraw this turn.
+        """
+        self.record_dealer_outcome(Outcome.NOT_ATTEMPTED)
 
     def player_action(self):
         """
@@ -179,15 +635,15 @@ class LeHer:
         Fails if the dealers current card is a king.
         Changes player history and revealed status.
         """
-        self.revealed_dealer_cards_to_player[self.turn_count] = True
-        self.revealed_player_cards_to_dealer[self.turn_count] = True
-        if self.dealer_cards[-1][0] == "K":
-            self.player_history.append("ATTEMPTED_BUT_FAILED")
+        state = self.state
+        turn = state.turn_count
+        state.revealed_dealer_cards_to_player[turn] = True
+        state.revealed_player_cards_to_dealer[turn] = True
+        if self.card_encoding.is_king[state.dealer_cards[turn]]:
+            self.record_player_outcome(Outcome.ATTEMPTED_BUT_FAILED)
             return False
-        self.player_history.append("SUCCEEDED")
-        temp = self.player_cards[-1]
-        self.player_cards[-1] = self.dealer_cards[-1]
-        self.dealer_cards[-1] = temp
+        self.record_player_outcome(Outcome.SUCCEEDED)
+        state.player_cards[turn], state.dealer_cards[turn] = state.dealer_cards[turn], state.player_cards[turn]
         return True
 
     def dealer_action(self):
@@ -196,28 +652,28 @@ class LeHer:
         Fails if the next card in the deck is a king.
         Changes dealer history and revealed status.
         """
-        if self.turn_count + 1 < self.TURNS_PER_GAME:
-            self.revealed_player_cards_to_dealer[self.turn_count + 1] = True
+        state = self.state
+        turn = state.turn_count
+        if turn + 1 < self.TURNS_PER_GAME:
+            state.revealed_player_cards_to_dealer[turn + 1] = True
         if not self.remove_drawn_cards_from_deck and self.PRE_SHUFFLED_DECK is None:
-            new_card = random.choice(self.current_deck)
-            self.shuffled_deck.append(new_card)
-            if new_card[0] == "K":
-                self.dealer_history.append("ATTEMPTED_BUT_FAILED")
-                self.next_player_card = new_card
+            new_card = self.draw_with_replacement(2)
+            if self.card_encoding.is_king[new_card]:
+                self.record_dealer_outcome(Outcome.ATTEMPTED_BUT_FAILED)
+                state.next_player_card = new_card
                 return False
-            self.next_player_card = self.dealer_cards[-1]
-            self.dealer_cards[-1] = new_card
-            self.revealed_dealer_cards_to_player[self.turn_count] = False
-            self.dealer_history.append("SUCCEEDED")
+            state.next_player_card = state.dealer_cards[turn]
+            state.dealer_cards[turn] = new_card
+            state.revealed_dealer_cards_to_player[turn] = False
+            self.record_dealer_outcome(Outcome.SUCCEEDED)
             return True
-        if self.current_deck[-1][0] == "K":
-            self.dealer_history.append("ATTEMPTED_BUT_FAILED")
+        current_deck = state.current_deck
+        if self.card_encoding.is_king[current_deck[-1]]:
+            self.record_dealer_outcome(Outcome.ATTEMPTED_BUT_FAILED)
             return False
-        self.dealer_history.append("SUCCEEDED")
-        temp = self.current_deck.pop()
-        self.current_deck.append(self.dealer_cards[-1])
-        self.dealer_cards[-1] = temp
-        self.revealed_dealer_cards_to_player[self.turn_count] = False
+        self.record_dealer_outcome(Outcome.SUCCEEDED)
+        current_deck[-1], state.dealer_cards[turn] = state.dealer_cards[turn], current_deck[-1]
+        state.revealed_dealer_cards_to_player[turn] = False
         return True
 
     def score(self):
@@ -225,10 +681,12 @@ class LeHer:
         Updates player and dealer scores for every card.
         Only call once at the end.
         """
-        for card in self.player_cards:
-            self.player_score += self.SCORER(card)
-        for card in self.dealer_cards:
-            self.dealer_score += self.SCORER(card)
+        state = self.state
+        scores = self.card_encoding.scores
+        for card in state.player_cards:
+            state.player_score += scores[card]
+        for card in state.dealer_cards:
+            state.dealer_score += scores[card]
 
     def get_card(self, from_player, index):
         """
@@ -238,9 +696,9 @@ class LeHer:
         :return: returns the card with specified index from the hand of the specified participant
         """
         if from_player:
-            return self.player_cards[index]
+            return self.state.player_card_view[index]
         else:
-            return self.dealer_cards[index]
+            return self.state.dealer_card_view[index]
 
     def is_revealed(self, from_player, index):
         """
@@ -251,16 +709,16 @@ class LeHer:
                  specified participant has been revealed to the opponent
         """
         if from_player:
-            return self.revealed_player_cards_to_dealer[index]
+            return self.state.revealed_player_cards_to_dealer[index]
         else:
-            return self.revealed_dealer_cards_to_player[index]
+            return self.state.revealed_dealer_cards_to_player[index]
 
     def get_scores(self):
         """
 
         :return: returns the scores of the player and dealer as a tuple (player_score, dealer_score)
         """
-        return self.player_score, self.dealer_score
+        return self.state.player_score, self.state.dealer_score
 
     def ask_ai(self, asks_player_ai, current_turn):
         """
@@ -268,11 +726,8 @@ class LeHer:
         :param current_turn: the current turn
         :return: returns True if the specified AI would take their action this turn
         """
-        if asks_player_ai:
-            return self.PLAYER_AI.action(self.player_cards, self.revealed_player_cards_to_dealer,
-                                         self.revealed_dealer_cards_to_player, self.player_history,
-                                         self.dealer_history, current_turn)
-        else:
-            return self.DEALER_AI.action(self.dealer_cards, self.revealed_player_cards_to_dealer,
-                                         self.revealed_dealer_cards_to_player, self.player_history,
-                                         self.dealer_history, current_turn)
+        state = self.state
+        ai = self.PLAYER_AI if asks_player_ai else self.DEALER_AI
+        return ai.action(state.player_card_view if asks_player_ai else state.dealer_card_view,
+                         state.revealed_player_cards_to_dealer, state.revealed_dealer_cards_to_player,
+                         state.player_history_view, state.dealer_history_view, current_turn)
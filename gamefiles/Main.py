@@ -1,18 +1,60 @@
 import argparse
+import csv
+import os
 
-import Strategies
-from GUI import GUI
+from Checkpoint import Checkpoint
 from LeHer import LeHer
+from Statistics import GameStatistics, confidence_half_width
 from pathlib import Path
 import numpy as np
 
 
+def play_tournament_chunk(player_ai, dealer_ai, games, rng_seed, REMOVE_DRAWN_CARDS_FROM_DECK, USE_BATCH_ENGINE,
+                          log_folder, log_file, SILENT_MODE, LOG_FORMAT="json", LOG_GAMES=True, checkpoint=None):
+    """
+    Plays one chunk of the games of a tournament cell.
+    Runs in a worker process if the tournament is played in parallel.
+
+    :param player_ai: the player AI
+    :param dealer_ai: the dealer AI
+    :param games: the amount of games to play
+    :param rng_seed: the rng seed of this chunk
+    :param REMOVE_DRAWN_CARDS_FROM_DECK: whether drawn card should be removed from the deck
+    :param USE_BATCH_ENGINE: whether the games are simulated with batch_play instead of auto_play
+    :param log_folder: the folder of the log file
+    :param log_file: the name of the log file
+    :param SILENT_MODE: turns off progress updates in console
+    :param LOG_FORMAT: the format of the log file, see auto_play
+    :param LOG_GAMES: whether auto_play logs every game, if not only running aggregates are kept
+                      (auto_play_statistics) and no log file is written
+    :param checkpoint: the Checkpoint (see Checkpoint) of the chunk, None to not save the chunk
+    :return: returns a GameStatistics of the chunk (for logged games only the scores are aggregated,
+             including any previous games from the same log file)
+    """
+    current_game = LeHer(PLAYER_AI=player_ai, DEALER_AI=dealer_ai, RNG_SEED=rng_seed)
+    if USE_BATCH_ENGINE:
+        return current_game.batch_play_statistics(games, REMOVE_DRAWN_CARDS_FROM_DECK, CHECKPOINT=checkpoint)
+    if not LOG_GAMES:
+        return current_game.auto_play_statistics(games, REMOVE_DRAWN_CARDS_FROM_DECK, SILENT_MODE=SILENT_MODE,
+                                                 CHECKPOINT=checkpoint)
+    current_game_results = current_game.auto_play(games, log_folder, log_file, REMOVE_DRAWN_CARDS_FROM_DECK,
+                                                  SILENT_MODE=SILENT_MODE, LOG_FORMAT=LOG_FORMAT,
+                                                  CHECKPOINT=checkpoint)
+    statistics = GameStatistics(current_game.TURNS_PER_GAME)
+    statistics.add_batch(current_game_results["player_scores"], current_game_results["dealer_scores"])
+    return statistics
+
+
 def tournament(player_strategies, dealer_strategies, path_to_main, REMOVE_DRAWN_CARDS_FROM_DECK=False,
-               GAMES_TO_AUTOPLAY=1000000, OUTPUT_FOLDER="output/"):
+               GAMES_TO_AUTOPLAY=1000000, OUTPUT_FOLDER="output/", USE_BATCH_ENGINE=False,
+               WORKERS=1, GAMES_PER_CHUNK=None, RNG_SEED=None, LOG_FORMAT="jsonl", LOG_GAMES=True,
+               CHECKPOINT_FOLDER=None, CHECKPOINT_EVERY=1000000):
     """
     Simulates specified (1.000.000 by default) amount of games for every possible player-dealer strategy combination.
     Outputs the results of the games as well as a results summary in the specified output folder.
-    The result summary has the form of 3 matrices separated by a row of -1's.
+    The summary (see tournament_summary) is computed from the aggregates of the played games and saved as
+    results.npz, results.csv and score_differences.csv, see save_tournament_summary.
+    results.txt has the form of 3 matrices separated by a row of -1's.
     The top matrix is win rate (as decimal) for the player.
     The middle matrix is draw rate.
     The bottom matrix is win rate (as decimal) for the dealer.
@@ -20,86 +62,200 @@ def tournament(player_strategies, dealer_strategies, path_to_main, REMOVE_DRAWN_
     A column uses the same dealer strategy but differing player strategies.
     Order of strategies is the same as order of the list given in the parameters.
 
+    The games of every combination (cell) are split into chunks of GAMES_PER_CHUNK games.
+    Every chunk gets its own rng seed derived from RNG_SEED, so the results only depend on RNG_SEED and
+    GAMES_PER_CHUNK, not on the amount of workers.
+    If a cell is split into more than one chunk every chunk is logged to its own file ("... (part k)").
+
+    With a checkpoint folder every chunk saves its state (games played, random state and aggregates or
+    the position in its log file) to its own checkpoint file every CHECKPOINT_EVERY games and when it is finished,
+    see Checkpoint. Running the same tournament again with the same RNG_SEED and checkpoint folder
+    skips the finished chunks, finishes the partial ones and gives the same results as an uninterrupted run
+    (RNG_SEED must not be None, a checkpoint of another seed is not resumed).
+
     :param player_strategies: list of tuples (strategy, name)
     :param dealer_strategies: list of tuples (strategy, name)
     :param path_to_main: the path to the main file
     :param REMOVE_DRAWN_CARDS_FROM_DECK: whether drawn card should be removed from the deck
     :param GAMES_TO_AUTOPLAY: the amount of games to play for every possible player-dealer strategy combination
     :param OUTPUT_FOLDER: the folder where game data and results should be saved as
+    :param USE_BATCH_ENGINE: whether the games are simulated with batch_play instead of auto_play,
+                             only the results summary is saved in that case
+    :param WORKERS: the amount of worker processes, None uses one per cpu core, 1 plays everything in this process
+    :param GAMES_PER_CHUNK: the maximum amount of games per chunk, None to play every cell as a single chunk
+    :param RNG_SEED: the master rng seed all chunk seeds are derived from
+    :param LOG_FORMAT: the format of the log files, see auto_play, "jsonl" by default as it streams the games
+                       instead of keeping every game of a chunk in memory
+    :param LOG_GAMES: whether every game is logged, if not only the results summary is saved
+    :param CHECKPOINT_FOLDER: the folder of the checkpoint files (relative to path_to_main),
+                              None to not save checkpoints
+    :param CHECKPOINT_EVERY: the amount of games played by a chunk between two checkpoints
+    :return: returns the summary of the tournament, see tournament_summary
     """
-    winrates = []
-    drawrates = []
-    dealer_winrates = []
+    # without games every rate of the summary would be 0 / 0
+    if GAMES_TO_AUTOPLAY <= 0:
+        raise ValueError("a tournament needs a positive amount of games per combination, not "
+                         + str(GAMES_TO_AUTOPLAY))
+    if WORKERS is None:
+        WORKERS = os.cpu_count()
+    if GAMES_PER_CHUNK is None:
+        GAMES_PER_CHUNK = GAMES_TO_AUTOPLAY
+    chunk_sizes = [min(GAMES_PER_CHUNK, GAMES_TO_AUTOPLAY - start)
+                   for start in range(0, GAMES_TO_AUTOPLAY, GAMES_PER_CHUNK)]
+    cell_seeds = np.random.SeedSequence(RNG_SEED).spawn(len(player_strategies) * len(dealer_strategies))
+
+    chunks = []
     for i, ps in enumerate(player_strategies):
-        winrates_for_current_player_strategy = []
-        drawrates_for_current_player_strategy = []
-        dealer_winrates_for_current_player_strategy = []
         for j, ds in enumerate(dealer_strategies):
-            current_log_file = ps[1] + " (player) vs " + ds[1] + " (dealer).json"
-            current_game = LeHer(PLAYER_AI=ps[0], DEALER_AI=ds[0])
-            current_game_results = current_game.auto_play(GAMES_TO_AUTOPLAY, path_to_main + OUTPUT_FOLDER,
-                                                          current_log_file,
-                                                          REMOVE_DRAWN_CARDS_FROM_DECK)
-            player_scores = current_game_results["player_scores"]
-            dealer_scores = current_game_results["dealer_scores"]
-            games = len(player_scores)
-            wins = 0
-            draws = 0
-            for p_score, d_score in zip(player_scores, dealer_scores):
-                if p_score > d_score:
-                    wins += 1
-                elif p_score == d_score:
-                    draws += 1
-            winrate = wins / games
-            winrates_for_current_player_strategy.append(winrate)
-            drawrate = draws / games
-            drawrates_for_current_player_strategy.append(drawrate)
-            dealer_winrates_for_current_player_strategy.append(1 - winrate - drawrate)
-        winrates.append(winrates_for_current_player_strategy)
-        drawrates.append(drawrates_for_current_player_strategy)
-        dealer_winrates.append(dealer_winrates_for_current_player_strategy)
-
-    results = []
-    for rate in winrates:
-        results.append(rate)
-    results.append([-1] * len(winrates[0]))
-    for rate in drawrates:
-        results.append(rate)
-    results.append([-1] * len(winrates[0]))
-    for rate in dealer_winrates:
-        results.append(rate)
-    np_results = np.array(results)
+            current_log_file = ps[1] + " (player) vs " + ds[1] + " (dealer)"
+            chunk_seeds = cell_seeds[i * len(dealer_strategies) + j].spawn(len(chunk_sizes))
+            for k, (games, chunk_seed) in enumerate(zip(chunk_sizes, chunk_seeds)):
+                if len(chunk_sizes) == 1:
+                    log_file = current_log_file
+                else:
+                    log_file = current_log_file + " (part " + str(k) + ")"
+                checkpoint = None
+                if CHECKPOINT_FOLDER is not None:
+                    checkpoint = Checkpoint(path_to_main + CHECKPOINT_FOLDER + log_file + ".checkpoint.json",
+                                            CHECKPOINT_EVERY)
+                chunks.append(((i, j), (ps[0], ds[0], games, int(chunk_seed.generate_state(1, np.uint64)[0]),
+                                        REMOVE_DRAWN_CARDS_FROM_DECK, USE_BATCH_ENGINE,
+                                        path_to_main + OUTPUT_FOLDER, log_file, WORKERS != 1, LOG_FORMAT,
+                                        LOG_GAMES, checkpoint)))
+
+    # chunk statistics are merged in chunk order, so the result does not depend on which worker finishes first
+    cell_statistics = [[GameStatistics() for _ in dealer_strategies] for _ in player_strategies]
+    if WORKERS == 1:
+        chunk_statistics = [play_tournament_chunk(*chunk) for _, chunk in chunks]
+    else:
+        # multiprocessing is only imported if needed, it takes longer to import than short runs take to play
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=WORKERS) as executor:
+            futures = [executor.submit(play_tournament_chunk, *chunk) for _, chunk in chunks]
+            chunk_statistics = [future.result() for future in futures]
+    for ((i, j), _), statistics in zip(chunks, chunk_statistics):
+        cell_statistics[i][j].merge(statistics)
+
+    summary = tournament_summary([ps[1] for ps in player_strategies], [ds[1] for ds in dealer_strategies],
+                                 cell_statistics)
+    save_tournament_summary(summary, path_to_main + OUTPUT_FOLDER)
+    separator = np.full((1, len(dealer_strategies)), -1.0)
+    np_results = np.concatenate([summary["win_rate"], separator, summary["draw_rate"], separator,
+                                 summary["dealer_win_rate"]])
     np.set_printoptions(suppress=True)
     np.savetxt(path_to_main + OUTPUT_FOLDER + "results.txt", np_results, fmt="%f")
     print(np_results)
+    return summary
+
+
+def tournament_summary(player_names, dealer_names, cell_statistics, confidence=0.95):
+    """
+    Summarizes the GameStatistics of every cell of a tournament as numpy arrays.
+    Per cell values are arrays of shape (player strategies, dealer strategies), rows are player strategies and
+    columns dealer strategies like in results.txt.
+
+    The keys are 'player_strategies' and 'dealer_strategies' (the names), 'confidence', the counts 'games',
+    'player_wins', 'draws' and 'dealer_wins', the rates 'win_rate', 'draw_rate', 'dealer_win_rate' and
+    'net_win_rate' (see GameStatistics), the mean score margin of the player 'mean_margin' (player score - dealer
+    score) and its standard deviation 'margin_std'. Every rate and the mean margin have the half width of its
+    confidence interval as key with the suffix '_ci' (see confidence_half_width in Statistics).
+    'score_differences' are the score differences from the lowest to the highest of all cells and
+    'score_difference_histograms' (shape (player strategies, dealer strategies, score differences))
+    the amount of games of every cell with that difference.
+
+    :param player_names: the names of the player strategies
+    :param dealer_names: the names of the dealer strategies
+    :param cell_statistics: list (player strategies) of lists (dealer strategies) of GameStatistics
+    :param confidence: the confidence level of the intervals
+    :return: returns the summary dictionary
+    """
+    def cell_values(value_of):
+        return np.array([[value_of(statistics) for statistics in row] for row in cell_statistics], dtype=np.float64)
+
+    games = cell_values(lambda statistics: statistics.games).astype(np.int64)
+    half_width = np.vectorize(lambda variance, cell_games: confidence_half_width(variance, cell_games, confidence))
+    summary = {
+        "player_strategies": np.array(player_names, dtype=str),
+        "dealer_strategies": np.array(dealer_names, dtype=str),
+        "confidence": np.float64(confidence),
+        "games": games
+    }
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for rate, count in [("win_rate", "player_wins"), ("draw_rate", "draws"), ("dealer_win_rate", "dealer_wins")]:
+            counts = cell_values(lambda statistics: getattr(statistics, count)).astype(np.int64)
+            rates = counts / games
+            summary[count] = counts
+            summary[rate] = rates
+            # the sample variance of a game counting as 1 if it has the outcome and 0 if not
+            summary[rate + "_ci"] = half_width(np.where(games > 1, rates * (1 - rates) * games / (games - 1), 0.0),
+                                               games)
+        summary["net_win_rate"] = (summary["player_wins"] - summary["dealer_wins"]) / games
+    summary["net_win_rate_ci"] = half_width(cell_values(lambda statistics: statistics.net_win_rate_variance
+                                                        if statistics.games else 0.0), games)
+    margin_variances = cell_values(lambda statistics: statistics.score_difference_variance)
+    summary["mean_margin"] = np.where(games > 0, cell_values(lambda statistics: statistics.score_difference_mean),
+                                      np.nan)
+    summary["mean_margin_ci"] = half_width(margin_variances, games)
+    summary["margin_std"] = np.sqrt(margin_variances)
+    differences = [difference for row in cell_statistics for statistics in row
+                   for difference in statistics.score_difference_histogram]
+    summary["score_differences"] = np.arange(min(differences, default=0), max(differences, default=-1) + 1)
+    summary["score_difference_histograms"] = np.array(
+        [[statistics.score_difference_counts(summary["score_differences"].tolist()) for statistics in row]
+         for row in cell_statistics], dtype=np.int64).reshape(games.shape + summary["score_differences"].shape)
+    return summary
+
+
+def save_tournament_summary(summary, output_folder):
+    """
+    Saves a tournament summary (see tournament_summary) in the output folder as
+    results.npz (all arrays of the summary, see numpy.load),
+    results.csv (a row per cell with the strategy names and every per cell value of the summary) and
+    score_differences.csv (a row per cell and score difference with the amount of games).
+
+    :param summary: the summary
+    :param output_folder: the folder, created if missing
+    """
+    Path(output_folder).mkdir(parents=True, exist_ok=True)
+    np.savez(output_folder + "results.npz", **summary)
+    columns = [key for key, values in summary.items() if np.shape(values) == summary["games"].shape]
+    with open(output_folder + "results.csv", "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["player_strategy", "dealer_strategy"] + columns)
+        for i, player_name in enumerate(summary["player_strategies"].tolist()):
+            for j, dealer_name in enumerate(summary["dealer_strategies"].tolist()):
+                writer.writerow([player_name, dealer_name] + [summary[column][i, j].item() for column in columns])
+    with open(output_folder + "score_differences.csv", "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["player_strategy", "dealer_strategy", "score_difference", "games"])
+        for i, player_name in enumerate(summary["player_strategies"].tolist()):
+            for j, dealer_name in enumerate(summary["dealer_strategies"].tolist()):
+                for difference, games in zip(summary["score_differences"].tolist(),
+                                             summary["score_difference_histograms"][i, j].tolist()):
+                    if games:
+                        writer.writerow([player_name, dealer_name, difference, games])
+
+
+def load_tournament_summary(output_folder):
+    """
+    :param output_folder: the folder a summary was saved in, see save_tournament_summary
+    :return: returns the summary, see tournament_summary
+    """
+    with np.load(output_folder + "results.npz") as data:
+        return {key: data[key] for key in data.files}
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser("main")
+    parser = argparse.ArgumentParser("main", description="Starts the GUI, see CommandLine.py to play and analyze "
+                                                         "games without it.")
     parser.add_argument("language", nargs="?", help="The language of the GUI, valid options are EN and GER",
                         default="GER")
     args = parser.parse_args()
+    # Qt is only imported to start the GUI, the functions of this module are used without it
+    from GUI import GUI
+
     # If Main.py is not called from the LeHer directory than the res and output folder use the wrong paths
     # to fix this the absolute path of Main.py must be used
     path_to_main = str(Path(__file__).parent) + "/"
     game_window = GUI(path_to_main, gui_language=args.language)
-    exit(0)
-
-    game = LeHer()
-
-    player_strategies_to_test = [
-        (Strategies.KeepNAndAbove(n=7, is_player=True), "keep 7 and above"),
-        (Strategies.KeepNAndAbove(n=8, is_player=True), "keep 8 and above"),
-        (Strategies.KeepNAndAbove(n=9, is_player=True), "keep 9 and above")
-    ]
-
-    dealer_strategies_to_test = [
-        (Strategies.KeepNAndAbove(n=7, is_player=False), "keep 7 and above"),
-        (Strategies.KeepNAndAbove(n=8, is_player=False), "keep 8 and above"),
-        (Strategies.KeepNAndAbove(n=9, is_player=False), "keep 9 and above")
-    ]
-
-    tournament(player_strategies_to_test, dealer_strategies_to_test, path_to_main, REMOVE_DRAWN_CARDS_FROM_DECK=True,
-               OUTPUT_FOLDER="output/remove/", GAMES_TO_AUTOPLAY=10 ** 7)
-    tournament(player_strategies_to_test, dealer_strategies_to_test, path_to_main, REMOVE_DRAWN_CARDS_FROM_DECK=False,
-               OUTPUT_FOLDER="output/dupe/", GAMES_TO_AUTOPLAY=10 ** 7)
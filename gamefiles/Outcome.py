@@ -0,0 +1,57 @@
+from enum import IntEnum
+
+
+class Outcome(IntEnum):
+    """
+    The outcome of the action (trade of the player, redraw of the dealer) of a participant in a single turn.
+    Histories are lists with the Outcome of every turn, the name of an Outcome is the string older logs use.
+    """
+
+    NOT_ATTEMPTED = 0
+    SUCCEEDED = 1
+    ATTEMPTED_BUT_FAILED = 2
+
+
+# the Outcome and the name of every code (index is the code)
+OUTCOMES = tuple(Outcome)
+HISTORY_NAMES = tuple(outcome.name for outcome in Outcome)
+# the Outcome of every name and of every code, so histories of names and histories of codes can be handled alike
+OUTCOME_OF = {**{outcome.name: outcome for outcome in Outcome}, **{int(outcome): outcome for outcome in Outcome}}
+
+
+def pack_history(history):
+    """
+    Packs a history into a single int with 2 bits per turn, the code of turn t is stored at bit 2 * t.
+    A 1 is set above the last turn, so the amount of turns can be read back from the int.
+
+    :param history: the history as list of Outcomes, codes or names
+    :return: returns the packed history
+    """
+    packed = 1
+    for outcome in reversed(history):
+        packed = (packed << 2) | OUTCOME_OF[outcome]
+    return packed
+
+
+def unpack_history(packed):
+    """
+    :param packed: a history packed with pack_history
+    :return: returns the history as list of Outcomes
+    """
+    history = []
+    while packed > 1:
+        history.append(OUTCOMES[packed & 3])
+        packed >>= 2
+    return history
+
+
+def history_names(history):
+    """
+    The string view of a history.
+
+    :param history: the history as list of Outcomes, codes or names or packed with pack_history
+    :return: returns the history as list of the names of the Outcomes
+    """
+    if isinstance(history, int):
+        history = unpack_history(history)
+    return [HISTORY_NAMES[OUTCOME_OF[outcome]] for outcome in history]
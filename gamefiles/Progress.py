@@ -0,0 +1,238 @@
+import json
+import os
+import sys
+import time
+
+# the phases of playing and recording a game, see play_game_timed in LeHer
+PHASES = ("draw", "strategy", "action", "score", "log")
+
+
+class ProgressReporter:
+    """
+    Reports the progress of a run of games (e.g. auto_play) to its outputs.
+
+    The run calls update only once the amount of games returned by the previous call (or start) has been played,
+    so the reporter costs nothing per game. A report is made every every_games games or every every_seconds seconds,
+    whichever comes first, and once at the end. In between the clock is only read a few times per report interval.
+
+    Every phase_sample_every-th game is played with the time of every phase measured (see PHASES),
+    the reports contain the mean time per game of every phase over these sampled games
+    (including the time of reading the clock, so their sum is a bit higher than the time per game).
+
+    A report is a dictionary with the amount of games played ('games') and to play ('total_games'),
+    'percent', 'elapsed_seconds', 'games_per_second' (since the start), 'interval_games_per_second'
+    (since the last report), 'eta_seconds', 'phase_seconds' (phase -> mean seconds per game, empty before the first
+    sampled game), 'phase_samples' (the amount of sampled games) and 'finished'.
+    """
+
+    def __init__(self, outputs, every_games=None, every_seconds=1.0, phase_sample_every=1000, clock=time.perf_counter):
+        """
+        :param outputs: list of outputs, every callable taking a report is an output (see ConsoleOutput,
+                        JsonLineOutput and PrometheusTextfileOutput)
+        :param every_games: report at least every this many games, None to only report by time
+        :param every_seconds: report at least every this many seconds, None to only report by games
+        :param phase_sample_every: time the phases of every this many-th game, None to not time phases
+        :param clock: the clock (in seconds)
+        """
+        if every_games is None and every_seconds is None:
+            raise ValueError("every_games and every_seconds can not both be None")
+        self.outputs = list(outputs)
+        self.every_games = every_games
+        self.every_seconds = every_seconds
+        self.phase_sample_every = phase_sample_every
+        self.clock = clock
+        # summed seconds of every phase over all sampled games
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+        self.phase_samples = 0
+        self.total_games = 0
+        self.start_games = 0
+        self.start_time = 0.0
+        self.last_report_games = 0
+        self.last_report_time = 0.0
+        self.check_games = 1
+
+    def start(self, total_games, games=0):
+        """
+        :param total_games: the amount of games of the run
+        :param games: the amount of games already played (e.g. of a resumed run)
+        :return: returns the amount of games after which update has to be called
+        """
+        self.total_games = total_games
+        self.start_games = games
+        self.start_time = self.last_report_time = self.clock()
+        self.last_report_games = games
+        self.check_games = 1
+        return self.next_check(games)
+
+    def next_check(self, games):
+        """
+        :param games: the amount of games played
+        :return: returns the amount of games after which update has to be called
+        """
+        next_games = games + self.check_games
+        if self.every_games is not None:
+            next_games = min(next_games, self.last_report_games + self.every_games)
+        return min(next_games, self.total_games)
+
+    def next_sample(self, games):
+        """
+        :param games: the amount of games played
+        :return: returns the index of the next game whose phases are timed, -1 if phases are not timed
+        """
+        if self.phase_sample_every is None:
+            return -1
+        return games + self.phase_sample_every - 1 - (games - self.start_games) % self.phase_sample_every
+
+    def add_phase_times(self, phase_times):
+        """
+        :param phase_times: dictionary phase -> seconds of a single sampled game
+        """
+        for phase, seconds in phase_times.items():
+            self.phase_times[phase] += seconds
+        self.phase_samples += 1
+
+    def update(self, games):
+        """
+        Reports if a report is due.
+
+        :param games: the amount of games played
+        :return: returns the amount of games after which update has to be called
+        """
+        now = self.clock()
+        if self.every_seconds is not None:
+            # the clock is read about 4 times per report interval
+            played = games - self.start_games
+            elapsed = now - self.start_time
+            if played > 0 and elapsed > 0:
+                self.check_games = max(1, int(played / elapsed * self.every_seconds / 4))
+            else:
+                self.check_games = min(2 * self.check_games, 1024)
+        else:
+            self.check_games = self.every_games
+        due = (self.every_games is not None and games - self.last_report_games >= self.every_games) or \
+              (self.every_seconds is not None and now - self.last_report_time >= self.every_seconds)
+        if due and games < self.total_games:
+            self.report(games, now, False)
+        return self.next_check(games)
+
+    def finish(self, games):
+        """
+        Makes the last report of the run.
+
+        :param games: the amount of games played
+        """
+        self.report(games, self.clock(), True)
+
+    def report(self, games, now, finished):
+        """
+        Builds a report (see ProgressReporter) and passes it to every output.
+        """
+        elapsed = now - self.start_time
+        interval = now - self.last_report_time
+        games_per_second = (games - self.start_games) / elapsed if elapsed > 0 else 0.0
+        report = {
+            "games": games,
+            "total_games": self.total_games,
+            "percent": 100.0 * games / self.total_games if self.total_games else 100.0,
+            "elapsed_seconds": elapsed,
+            "games_per_second": games_per_second,
+            "interval_games_per_second": (games - self.last_report_games) / interval if interval > 0 else 0.0,
+            "eta_seconds": (self.total_games - games) / games_per_second if games_per_second > 0 else None,
+            "phase_seconds": {phase: seconds / self.phase_samples for phase, seconds in self.phase_times.items()}
+            if self.phase_samples else {},
+            "phase_samples": self.phase_samples,
+            "finished": finished
+        }
+        self.last_report_games = games
+        self.last_report_time = now
+        for output in self.outputs:
+            output(report)
+
+
+class ConsoleOutput:
+    """
+    Prints a human readable line per report.
+    """
+
+    def __init__(self, stream=None):
+        """
+        :param stream: the stream the lines are written to, sys.stdout by default
+        """
+        self.stream = stream
+
+    def __call__(self, report):
+        eta = report["eta_seconds"]
+        line = "{:.1f}% Done ({:d}/{:d} games, {:.1f} s, {:.0f} games/s, ETA {})".format(
+            report["percent"], report["games"], report["total_games"], report["elapsed_seconds"],
+            report["games_per_second"], "-" if eta is None else "{:.1f} s".format(eta))
+        if report["phase_seconds"]:
+            line += " " + " ".join("{} {:.1f} us".format(phase, seconds * 10 ** 6)
+                                   for phase, seconds in report["phase_seconds"].items())
+        print(line, file=self.stream or sys.stdout, flush=True)
+
+
+class JsonLineOutput:
+    """
+    Writes every report as a single json line (structured log line), optionally with extra fields
+    (e.g. the name of the run).
+    """
+
+    def __init__(self, stream=None, **fields):
+        """
+        :param stream: the stream the lines are written to, sys.stdout by default
+        :param fields: fields added to every line
+        """
+        self.stream = stream
+        self.fields = fields
+
+    def __call__(self, report):
+        print(json.dumps({**self.fields, **report}), file=self.stream or sys.stdout, flush=True)
+
+
+class PrometheusTextfileOutput:
+    """
+    Writes the latest report as a Prometheus text file (e.g. for the textfile collector of the node exporter).
+    The file is replaced atomically, so a scrape never reads a partially written file.
+    """
+
+    def __init__(self, file_path, prefix="leher", **labels):
+        """
+        :param file_path: the path of the text file, should end with .prom
+        :param prefix: the prefix of every metric name
+        :param labels: labels added to every metric (e.g. run="remove keep 8")
+        """
+        self.file_path = file_path
+        self.prefix = prefix
+        self.labels = labels
+
+    def format_labels(self, **extra_labels):
+        labels = {**self.labels, **extra_labels}
+        if not labels:
+            return ""
+        return "{" + ",".join('{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                              for name, value in labels.items()) + "}"
+
+    def __call__(self, report):
+        metrics = [
+            ("games_played", "The amount of games played", report["games"], {}),
+            ("games_total", "The amount of games of the run", report["total_games"], {}),
+            ("elapsed_seconds", "The seconds since the start of the run", report["elapsed_seconds"], {}),
+            ("games_per_second", "The games played per second since the start", report["games_per_second"], {}),
+            ("eta_seconds", "The estimated seconds until the run is finished", report["eta_seconds"], {}),
+            ("finished", "Whether the run is finished", int(report["finished"]), {})
+        ]
+        metrics += [("phase_seconds_per_game", "The mean seconds per game spent in a phase", seconds,
+                     {"phase": phase}) for phase, seconds in report["phase_seconds"].items()]
+        lines = []
+        for name, description, value, labels in metrics:
+            if value is None:
+                continue
+            metric = self.prefix + "_" + name
+            if not labels or labels["phase"] == PHASES[0]:
+                lines.append("# HELP " + metric + " " + description)
+                lines.append("# TYPE " + metric + " gauge")
+            lines.append(metric + self.format_labels(**labels) + " " + repr(float(value)))
+        temporary_path = self.file_path + ".tmp"
+        with open(temporary_path, "w") as metrics_file:
+            metrics_file.write("\n".join(lines) + "\n")
+        os.replace(temporary_path, self.file_path)
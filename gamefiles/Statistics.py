@@ -0,0 +1,306 @@
+import math
+import statistics
+
+import numpy as np
+
+from Outcome import Outcome, OUTCOME_OF
+
+
+class GameStatistics:
+    """
+    Running aggregates over played games, so no per game data has to be kept or logged.
+
+    Keeps the win, draw and loss counts, a histogram of the scores of both participants,
+    mean, variance and a histogram of the score difference (player score - dealer score) and per turn
+    how often the player tried to trade and the dealer tried to redraw and how often it succeeded.
+    Games can be added one at a time (add_game) or as numpy arrays (add_batch),
+    statistics of separately played games can be combined with merge.
+    """
+
+    def __init__(self, turns=13):
+        """
+        :param turns: the amount of turns per game
+        """
+        self.turns = turns
+        self.games = 0
+        self.player_wins = 0
+        self.draws = 0
+        self.dealer_wins = 0
+        # index is the score, value the amount of games with that score
+        self.player_score_histogram = []
+        self.dealer_score_histogram = []
+        # mean and sum of squared deviations of the score difference (Welford's algorithm)
+        self.score_difference_mean = 0.0
+        self.score_difference_m2 = 0.0
+        # key is the score difference, value the amount of games with that difference
+        self.score_difference_histogram = {}
+        self.trade_attempts = [0] * turns
+        self.trade_successes = [0] * turns
+        self.redraw_attempts = [0] * turns
+        self.redraw_successes = [0] * turns
+
+    def add_game(self, player_score, dealer_score, player_history=None, dealer_history=None):
+        """
+        Adds a single game.
+
+        :param player_score: the score of the player
+        :param dealer_score: the score of the dealer
+        :param player_history: the action history of the player (Outcomes, codes or names),
+                               per turn statistics are only kept if given
+        :param dealer_history: the action history of the dealer (Outcomes, codes or names),
+                               per turn statistics are only kept if given
+        """
+        self.games += 1
+        if player_score > dealer_score:
+            self.player_wins += 1
+        elif player_score == dealer_score:
+            self.draws += 1
+        else:
+            self.dealer_wins += 1
+        add_to_histogram(self.player_score_histogram, player_score, 1)
+        add_to_histogram(self.dealer_score_histogram, dealer_score, 1)
+        difference = player_score - dealer_score
+        delta = difference - self.score_difference_mean
+        self.score_difference_mean += delta / self.games
+        self.score_difference_m2 += delta * (difference - self.score_difference_mean)
+        self.score_difference_histogram[difference] = self.score_difference_histogram.get(difference, 0) + 1
+        if player_history is not None:
+            for turn, outcome in enumerate(player_history):
+                outcome = OUTCOME_OF[outcome]
+                if outcome != Outcome.NOT_ATTEMPTED:
+                    self.trade_attempts[turn] += 1
+                    if outcome == Outcome.SUCCEEDED:
+                        self.trade_successes[turn] += 1
+        if dealer_history is not None:
+            for turn, outcome in enumerate(dealer_history):
+                outcome = OUTCOME_OF[outcome]
+                if outcome != Outcome.NOT_ATTEMPTED:
+                    self.redraw_attempts[turn] += 1
+                    if outcome == Outcome.SUCCEEDED:
+                        self.redraw_successes[turn] += 1
+
+    def add_batch(self, player_scores, dealer_scores, player_histories=None, dealer_histories=None):
+        """
+        Adds many games at once.
+
+        :param player_scores: array of shape (games,) with the scores of the player
+        :param dealer_scores: array of shape (games,) with the scores of the dealer
+        :param player_histories: array of shape (games, turns) with the history codes (see Outcome),
+                                 per turn statistics are only kept if given
+        :param dealer_histories: array of shape (games, turns) with the history codes (see Outcome),
+                                 per turn statistics are only kept if given
+        """
+        player_scores = np.asarray(player_scores, dtype=np.int64)
+        dealer_scores = np.asarray(dealer_scores, dtype=np.int64)
+        games = len(player_scores)
+        if games == 0:
+            return
+        wins = int(np.count_nonzero(player_scores > dealer_scores))
+        draws = int(np.count_nonzero(player_scores == dealer_scores))
+        self.player_wins += wins
+        self.draws += draws
+        self.dealer_wins += games - wins - draws
+        for histogram, scores in [(self.player_score_histogram, player_scores),
+                                  (self.dealer_score_histogram, dealer_scores)]:
+            for score, count in enumerate(np.bincount(scores).tolist()):
+                if count:
+                    add_to_histogram(histogram, score, count)
+        differences = player_scores - dealer_scores
+        self.combine_score_differences(games, float(differences.mean()),
+                                       float(((differences - differences.mean()) ** 2).sum()))
+        minimum = int(differences.min())
+        counts = np.bincount(differences - minimum)
+        values = np.flatnonzero(counts)
+        add_to_dict_histogram(self.score_difference_histogram, (values + minimum).tolist(), counts[values].tolist())
+        if player_histories is not None:
+            player_histories = np.asarray(player_histories)
+            add_lists(self.trade_attempts,
+                      np.count_nonzero(player_histories != Outcome.NOT_ATTEMPTED, axis=0).tolist())
+            add_lists(self.trade_successes, np.count_nonzero(player_histories == Outcome.SUCCEEDED, axis=0).tolist())
+        if dealer_histories is not None:
+            dealer_histories = np.asarray(dealer_histories)
+            add_lists(self.redraw_attempts,
+                      np.count_nonzero(dealer_histories != Outcome.NOT_ATTEMPTED, axis=0).tolist())
+            add_lists(self.redraw_successes, np.count_nonzero(dealer_histories == Outcome.SUCCEEDED, axis=0).tolist())
+
+    def merge(self, other):
+        """
+        Adds all games of another instance to this one.
+
+        :param other: the other instance, has to use the same amount of turns
+        :return: returns this instance
+        """
+        self.player_wins += other.player_wins
+        self.draws += other.draws
+        self.dealer_wins += other.dealer_wins
+        for score, count in enumerate(other.player_score_histogram):
+            add_to_histogram(self.player_score_histogram, score, count)
+        for score, count in enumerate(other.dealer_score_histogram):
+            add_to_histogram(self.dealer_score_histogram, score, count)
+        if other.games:
+            self.combine_score_differences(other.games, other.score_difference_mean, other.score_difference_m2)
+        add_to_dict_histogram(self.score_difference_histogram, other.score_difference_histogram.keys(),
+                              other.score_difference_histogram.values())
+        add_lists(self.trade_attempts, other.trade_attempts)
+        add_lists(self.trade_successes, other.trade_successes)
+        add_lists(self.redraw_attempts, other.redraw_attempts)
+        add_lists(self.redraw_successes, other.redraw_successes)
+        return self
+
+    def combine_score_differences(self, games, mean, m2):
+        """
+        Adds the score difference aggregates of other games (Chan's parallel algorithm) and counts the games.
+
+        :param games: the amount of other games
+        :param mean: the mean score difference of the other games
+        :param m2: the sum of squared deviations from the mean of the other games
+        """
+        total = self.games + games
+        delta = mean - self.score_difference_mean
+        self.score_difference_m2 += m2 + delta * delta * self.games * games / total
+        self.score_difference_mean += delta * games / total
+        self.games = total
+
+    @property
+    def win_rate(self):
+        return self.player_wins / self.games
+
+    @property
+    def draw_rate(self):
+        return self.draws / self.games
+
+    @property
+    def dealer_win_rate(self):
+        return self.dealer_wins / self.games
+
+    @property
+    def net_win_rate(self):
+        """
+        The mean outcome of a game for the player, counting a win as 1, a draw as 0 and a loss as -1.
+        """
+        return (self.player_wins - self.dealer_wins) / self.games
+
+    @property
+    def net_win_rate_variance(self):
+        """
+        The sample variance of the outcome of a game for the player (see net_win_rate).
+        """
+        if self.games < 2:
+            return 0.0
+        decided = (self.player_wins + self.dealer_wins) / self.games
+        return (decided - self.net_win_rate ** 2) * self.games / (self.games - 1)
+
+    @property
+    def score_difference_variance(self):
+        """
+        The sample variance of the score difference.
+        """
+        if self.games < 2:
+            return 0.0
+        return self.score_difference_m2 / (self.games - 1)
+
+    @property
+    def trade_success_rates(self):
+        """
+        Per turn the fraction of attempted trades that succeeded (None for turns without attempts).
+        """
+        return [successes / attempts if attempts else None
+                for successes, attempts in zip(self.trade_successes, self.trade_attempts)]
+
+    @property
+    def redraw_success_rates(self):
+        """
+        Per turn the fraction of attempted redraws that succeeded (None for turns without attempts).
+        """
+        return [successes / attempts if attempts else None
+                for successes, attempts in zip(self.redraw_successes, self.redraw_attempts)]
+
+    def to_dict(self):
+        """
+        :return: returns a json serializable dictionary with all aggregates and the rates derived from them
+        """
+        return {
+            "games": self.games,
+            "player_wins": self.player_wins,
+            "draws": self.draws,
+            "dealer_wins": self.dealer_wins,
+            "win_rate": self.win_rate if self.games else None,
+            "draw_rate": self.draw_rate if self.games else None,
+            "dealer_win_rate": self.dealer_win_rate if self.games else None,
+            "player_score_histogram": list(self.player_score_histogram),
+            "dealer_score_histogram": list(self.dealer_score_histogram),
+            "score_difference_mean": self.score_difference_mean,
+            "score_difference_variance": self.score_difference_variance,
+            "score_difference_m2": self.score_difference_m2,
+            # json objects only have string keys, so the histogram is a sorted list of [difference, games]
+            "score_difference_histogram": sorted(self.score_difference_histogram.items()),
+            "trade_attempts": list(self.trade_attempts),
+            "trade_successes": list(self.trade_successes),
+            "trade_success_rates": self.trade_success_rates,
+            "redraw_attempts": list(self.redraw_attempts),
+            "redraw_successes": list(self.redraw_successes),
+            "redraw_success_rates": self.redraw_success_rates
+        }
+
+    @classmethod
+    def from_dict(cls, dictionary):
+        """
+        :param dictionary: a dictionary returned by to_dict
+        :return: returns an instance with the same aggregates
+        """
+        statistics = cls(len(dictionary["trade_attempts"]))
+        for name in ["games", "player_wins", "draws", "dealer_wins", "score_difference_mean", "score_difference_m2"]:
+            setattr(statistics, name, dictionary[name])
+        for name in ["player_score_histogram", "dealer_score_histogram", "trade_attempts", "trade_successes",
+                     "redraw_attempts", "redraw_successes"]:
+            setattr(statistics, name, list(dictionary[name]))
+        statistics.score_difference_histogram = {difference: games
+                                                 for difference, games in dictionary["score_difference_histogram"]}
+        return statistics
+
+    def score_difference_counts(self, differences):
+        """
+        :param differences: the score differences
+        :return: returns a list with the amount of games of every score difference
+        """
+        return [self.score_difference_histogram.get(difference, 0) for difference in differences]
+
+
+def add_to_histogram(histogram, value, count):
+    """
+    Adds count to the bin of value, extending the histogram (a list) if needed.
+    """
+    if value >= len(histogram):
+        histogram.extend([0] * (value + 1 - len(histogram)))
+    histogram[value] += count
+
+
+def add_to_dict_histogram(histogram, values, counts):
+    """
+    Adds every count to the bin (key) of its value in the histogram (a dictionary).
+    """
+    for value, count in zip(values, counts):
+        value = int(value)
+        histogram[value] = histogram.get(value, 0) + int(count)
+
+
+def add_lists(target, values):
+    """
+    Adds values element wise to the list target.
+    """
+    for i, value in enumerate(values):
+        target[i] += value
+
+
+def confidence_half_width(variance, games, confidence=0.95):
+    """
+    The half width of the normal approximation confidence interval of a mean.
+
+    :param variance: the sample variance of a single observation
+    :param games: the amount of observations
+    :param confidence: the confidence level of the interval
+    :return: returns the half width (infinity if there are no observations)
+    """
+    if games == 0:
+        return math.inf
+    return statistics.NormalDist().inv_cdf(0.5 + confidence / 2) * math.sqrt(variance / games)
@@ -1,12 +1,26 @@
+from Decks import STANDARD_DECK
 from Scorer import standard_scorer
+from Outcome import Outcome, OUTCOME_OF
 
 
 class Strategy:
     """
     Do not create instances of this.
     This class is supposed to be used as superclass for other strategies.
+
+    The histories given to action are lists of Outcomes (see Outcome) of the turns played so far,
+    the cards are lists of card strings.
+
+    Strategies whose decision depends on nothing but their current card can set STATELESS_BY_CARD to True and
+    implement decision_table. The engines then look the decision up in that table instead of calling action.
+    Strategies whose decision depends on nothing but their current card and the current turn can set
+    STATELESS_BY_TURN_AND_CARD to True and implement turn_decision_table instead
+    (strategies that are stateless by card are stateless by turn and card as well).
     """
 
+    STATELESS_BY_CARD = False
+    STATELESS_BY_TURN_AND_CARD = False
+
     def __init__(self, is_player: bool, scorer=standard_scorer):
         """
         Makes the parameters class variables with the same name and value.
@@ -21,8 +35,47 @@ class Strategy:
                dealer_redraw_history, current_turn):
         return False
 
+    def get_random_state(self):
+        """
+        Only has to be implemented by strategies that use random numbers, see get_random_state in LeHer.
+
+        :return: returns the json serializable state of the random numbers of the strategy, None if it uses none
+        """
+        return None
+
+    def set_random_state(self, random_state):
+        """
+        Continues the random numbers of the strategy from a state returned by get_random_state.
+
+        :param random_state: the state
+        """
+
+    def decision_table(self, cards):
+        """
+        Only has to be implemented if STATELESS_BY_CARD is True.
+
+        :param cards: the card string of every card id (see CardEncoding)
+        :return: returns a list with the return value of action for every card id
+        """
+        raise NotImplementedError(type(self).__name__ + " is not stateless by card")
+
+    def turn_decision_table(self, cards, turns):
+        """
+        Only has to be implemented if STATELESS_BY_TURN_AND_CARD is True and STATELESS_BY_CARD is False.
+
+        :param cards: the card string of every card id (see CardEncoding)
+        :param turns: the amount of turns per game
+        :return: returns a list with a list with the return value of action for every card id for every turn
+        """
+        if self.STATELESS_BY_CARD:
+            return [self.decision_table(cards)] * turns
+        raise NotImplementedError(type(self).__name__ + " is not stateless by turn and card")
+
 
 class KeepNAndAbove(Strategy):
+    STATELESS_BY_CARD = True
+    STATELESS_BY_TURN_AND_CARD = True
+
     def __init__(self, n: int, is_player: bool, scorer=standard_scorer):
         """
         Makes the parameters class variables with the same name and value.
@@ -40,7 +93,7 @@ class KeepNAndAbove(Strategy):
         Returns False if the value of the current card is at least the threshold n,
         which was set during instance creation.
         Returns True otherwise.
-
+        The engines look the decisions up in decision_table instead, so action is only asked by the gui.
 
         :param my_cards: the list of cards
         :param current_turn: the current turn
@@ -50,3 +103,123 @@ class KeepNAndAbove(Strategy):
         :param dealer_redraw_history: not used.
         """
         return self.scorer(my_cards[current_turn]) < self.threshold
+
+    def decision_table(self, cards):
+        """
+        :param cards: the card string of every card id (see CardEncoding)
+        :return: returns a list with the return value of action for every card id
+        """
+        return [self.scorer(card) < self.threshold for card in cards]
+
+
+class KeepNAndAbovePerTurn(Strategy):
+    STATELESS_BY_TURN_AND_CARD = True
+
+    def __init__(self, thresholds, is_player: bool, scorer=standard_scorer):
+        """
+        Like KeepNAndAbove, but with a threshold for every turn.
+
+        :param thresholds: the threshold n of every turn
+        :param is_player: whether this instance of the strategy is used by the player
+        :param scorer: the scorer that is used
+        """
+        super().__init__(is_player=is_player, scorer=scorer)
+        self.thresholds = list(thresholds)
+
+    def action(self, my_cards, revealed_player_cards, revealed_dealer_cards, player_trade_history,
+               dealer_redraw_history, current_turn: int):
+        """
+        Returns False if the value of the current card is at least the threshold of the current turn.
+        Returns True otherwise.
+
+        :param my_cards: the list of cards
+        :param current_turn: the current turn
+        :param revealed_player_cards: not used.
+        :param revealed_dealer_cards: not used.
+        :param player_trade_history: not used.
+        :param dealer_redraw_history: not used.
+        """
+        return self.scorer(my_cards[current_turn]) < self.thresholds[current_turn]
+
+    def turn_decision_table(self, cards, turns):
+        """
+        :param cards: the card string of every card id (see CardEncoding)
+        :param turns: the amount of turns per game, at most the amount of thresholds
+        :return: returns a list with a list with the return value of action for every card id for every turn
+        """
+        if turns > len(self.thresholds):
+            raise ValueError("only " + str(len(self.thresholds)) + " thresholds for " + str(turns) + " turns")
+        scores = [self.scorer(card) for card in cards]
+        return [[score < threshold for score in scores] for threshold in self.thresholds[:turns]]
+
+
+class TableStrategy(Strategy):
+    def __init__(self, table, card_classes, is_player: bool, scorer=standard_scorer, unshuffled_deck=STANDARD_DECK,
+                 rng_seed=None):
+        """
+        A mixed strategy that looks the probability of taking its action up in a table (see EquilibriumSolver).
+
+        The probability depends on the current turn, the class of the current card and the Outcome of the last action
+        of the opponent: for the player the redraw of the dealer in the previous turn (after a redraw attempt the
+        player got the old card of the dealer or the king that made the redraw fail),
+        for the dealer the trade of the player in the current turn.
+        The revealed flags follow from these Outcomes, so they are not looked at.
+        The random numbers of mixed decisions are part of the random state of LeHer, so checkpointed runs resume
+        with the same decisions.
+
+        :param table: the probability of taking the action for every turn, card class and Outcome of the opponent
+        :param card_classes: the score and whether it is a king of every card class
+        :param is_player: whether this instance of the strategy is used by the player
+        :param scorer: the scorer that is used
+        :param unshuffled_deck: the deck the cards are from
+        :param rng_seed: the seed of the random numbers of mixed decisions, None for a random seed
+        """
+        # imported here, so parsing strategies on the command line does not import numpy (see CommandLine)
+        import numpy as np
+        from CardEncoding import get_card_encoding
+
+        super().__init__(is_player=is_player, scorer=scorer)
+        self.table = [[list(probabilities) for probabilities in turn_table] for turn_table in table]
+        self.card_classes = [(int(score), bool(is_king)) for score, is_king in card_classes]
+        class_of_key = {key: card_class for card_class, key in enumerate(self.card_classes)}
+        card_encoding = get_card_encoding(unshuffled_deck, scorer)
+        # the class of every card of the deck
+        self.classes = {}
+        for card, score, is_king in zip(card_encoding.cards, card_encoding.scores, card_encoding.is_king):
+            if (score, is_king) in class_of_key:
+                self.classes[card] = class_of_key[(score, is_king)]
+        self.rng = np.random.default_rng(rng_seed)
+
+    def action(self, my_cards, revealed_player_cards, revealed_dealer_cards, player_trade_history,
+               dealer_redraw_history, current_turn: int):
+        """
+        Takes the action with the probability of the current turn, card class and Outcome of the opponent.
+
+        :param my_cards: the list of cards
+        :param current_turn: the current turn
+        :param revealed_player_cards: not used.
+        :param revealed_dealer_cards: not used.
+        :param player_trade_history: the history of the player, only used by the dealer
+        :param dealer_redraw_history: the history of the dealer, only used by the player
+        """
+        card_class = self.classes[my_cards[current_turn]]
+        if not self.is_player:
+            outcome = player_trade_history[current_turn]
+        elif current_turn > 0:
+            outcome = dealer_redraw_history[current_turn - 1]
+        else:
+            outcome = Outcome.NOT_ATTEMPTED
+        probability = self.table[current_turn][card_class][OUTCOME_OF[outcome]]
+        return probability >= 1 or (probability > 0 and self.rng.random() < probability)
+
+    def get_random_state(self):
+        """
+        :return: returns the json serializable state of the random numbers of mixed decisions
+        """
+        return self.rng.bit_generator.state
+
+    def set_random_state(self, random_state):
+        """
+        :param random_state: a state returned by get_random_state
+        """
+        self.rng.bit_generator.state = random_state
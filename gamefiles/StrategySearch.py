@@ -0,0 +1,300 @@
+import numpy as np
+
+from Decks import STANDARD_DECK
+from Scorer import standard_scorer
+from Strategies import KeepNAndAbove, KeepNAndAbovePerTurn
+from LeHer import LeHer
+from Statistics import GameStatistics, confidence_half_width
+
+# every threshold that makes a difference with the standard scorer, 1 never acts and 14 always acts
+THRESHOLDS = range(1, 15)
+
+
+def play_matchup(player_ai, dealer_ai, games, rng_seed, *, remove_drawn_cards_from_deck=False,
+                 unshuffled_deck=STANDARD_DECK, scorer=standard_scorer, turns=13, batch_size=100000):
+    """
+    Plays games of player_ai against dealer_ai with the batch engine.
+
+    :param player_ai: the player AI
+    :param dealer_ai: the dealer AI
+    :param games: the amount of games to play
+    :param rng_seed: the rng seed
+    :param remove_drawn_cards_from_deck: whether cards drawn should be removed from the deck
+    :param unshuffled_deck: the deck to be used
+    :param scorer: the scorer
+    :param turns: the amount of turns per game
+    :param batch_size: the amount of games simulated at once
+    :return: returns a GameStatistics (see Statistics) of the games played
+    """
+    game = LeHer(UNSHUFFLED_DECK=unshuffled_deck, SCORER=scorer, PLAYER_AI=player_ai, DEALER_AI=dealer_ai,
+                 RNG_SEED=rng_seed, TURNS_PER_GAME=turns)
+    return game.batch_play_statistics(games, remove_drawn_cards_from_deck, BATCH_SIZE=batch_size)
+
+
+def estimate(statistics, confidence):
+    """
+    :param statistics: the GameStatistics of a matchup
+    :param confidence: the confidence level of the interval
+    :return: returns a dictionary with the net win rate of the player ('value', see GameStatistics),
+             the half width of its confidence interval ('half_width') and the amount of games played ('games')
+    """
+    return {
+        "value": statistics.net_win_rate if statistics.games else 0.0,
+        "half_width": confidence_half_width(statistics.net_win_rate_variance, statistics.games, confidence),
+        "games": statistics.games
+    }
+
+
+def next_seed(seed_sequence):
+    """
+    :param seed_sequence: a numpy SeedSequence
+    :return: returns an integer seed from the next child of the seed sequence
+    """
+    return int(seed_sequence.spawn(1)[0].generate_state(1, np.uint64)[0])
+
+
+def race(player_ais, dealer_ais, maximize, *, rng_seed=None, batch_games=20000, max_games=2000000,
+         confidence=0.95, tolerance=0.002, **game_settings):
+    """
+    Finds the best of several matchups with adaptive sampling (successive elimination).
+
+    Every remaining matchup is played batch_games more games per round.
+    A matchup is dropped as soon as its confidence interval lies completely on the wrong side of the confidence
+    interval of the current best one, so clearly worse matchups only cost a few rounds.
+    The race ends when one matchup remains, all remaining ones are known to within tolerance
+    (they are equally good for all practical purposes) or all remaining ones have been played max_games games.
+
+    :param player_ais: the player AI of every matchup
+    :param dealer_ais: the dealer AI of every matchup
+    :param maximize: whether the best matchup has the highest (True) or the lowest (False) net win rate of the player
+    :param rng_seed: the rng seed
+    :param batch_games: the amount of games played per matchup and round
+    :param max_games: the maximum amount of games played per matchup
+    :param confidence: the confidence level of the intervals
+    :param tolerance: the half width below which matchups are not distinguished any further
+    :param game_settings: passed on to play_matchup
+    :return: returns a dictionary with the index of the best matchup ('best'), the estimate (see estimate)
+             of every matchup ('estimates'), the indices of the matchups that were not dropped ('remaining')
+             and the total amount of games played ('games')
+    """
+    seed_sequence = np.random.SeedSequence(rng_seed)
+    sign = 1 if maximize else -1
+    statistics = [GameStatistics(game_settings.get("turns", 13)) for _ in player_ais]
+    remaining = list(range(0, len(player_ais)))
+    while True:
+        for index in remaining:
+            if statistics[index].games < max_games:
+                games = min(batch_games, max_games - statistics[index].games)
+                statistics[index].merge(play_matchup(player_ais[index], dealer_ais[index], games,
+                                                     next_seed(seed_sequence), **game_settings))
+        estimates = [estimate(matchup_statistics, confidence) for matchup_statistics in statistics]
+        best = max(remaining, key=lambda i: sign * estimates[i]["value"])
+        lower_bound = sign * estimates[best]["value"] - estimates[best]["half_width"]
+        remaining = [i for i in remaining if sign * estimates[i]["value"] + estimates[i]["half_width"] >= lower_bound]
+        if (len(remaining) == 1 or all(estimates[i]["half_width"] <= tolerance for i in remaining)
+                or all(statistics[i].games >= max_games for i in remaining)):
+            return {
+                "best": best,
+                "estimates": estimates,
+                "remaining": remaining,
+                "games": sum(matchup_statistics.games for matchup_statistics in statistics)
+            }
+
+
+def threshold_strategies(is_player, scorer=standard_scorer):
+    """
+    :param is_player: whether the strategies are used by the player
+    :param scorer: the scorer
+    :return: returns a KeepNAndAbove for every threshold in THRESHOLDS
+    """
+    return [KeepNAndAbove(n=n, is_player=is_player, scorer=scorer) for n in THRESHOLDS]
+
+
+def best_response(opponent, is_player, candidates=None, **race_settings):
+    """
+    Finds the candidate that does best against a fixed opponent (see race).
+
+    :param opponent: the AI of the other side
+    :param is_player: whether the candidates are player AIs (and the opponent is the dealer AI)
+    :param candidates: the candidate AIs, a KeepNAndAbove for every threshold by default
+    :param race_settings: passed on to race
+    :return: returns the result of race with the best candidate added ('strategy')
+    """
+    if candidates is None:
+        candidates = threshold_strategies(is_player, race_settings.get("scorer", standard_scorer))
+    if is_player:
+        result = race(candidates, [opponent] * len(candidates), True, **race_settings)
+    else:
+        result = race([opponent] * len(candidates), candidates, False, **race_settings)
+    result["strategy"] = candidates[result["best"]]
+    return result
+
+
+def best_per_turn_response(opponent, is_player, thresholds=None, max_sweeps=5, rng_seed=None, **race_settings):
+    """
+    Finds a KeepNAndAbovePerTurn (a threshold for every turn) that does well against a fixed opponent.
+
+    Searching all 14^13 threshold vectors is not feasible, so the thresholds are optimized one turn at a time
+    (coordinate descent): per turn every threshold is raced while the thresholds of the other turns stay fixed.
+    The turns are swept until a sweep changes nothing or max_sweeps sweeps are done.
+
+    :param opponent: the AI of the other side
+    :param is_player: whether the strategy is used by the player (and the opponent is the dealer AI)
+    :param thresholds: the thresholds to start from, the best single threshold (see best_response) by default
+    :param max_sweeps: the maximum amount of sweeps over all turns
+    :param rng_seed: the rng seed
+    :param race_settings: passed on to race
+    :return: returns a dictionary with the strategy ('strategy'), its estimate against the opponent
+             ('estimate', see estimate), the amount of sweeps done ('sweeps'), whether the last sweep changed nothing
+             ('converged') and the total amount of games played ('games')
+    """
+    seed_sequence = np.random.SeedSequence(rng_seed)
+    turns = race_settings.get("turns", 13)
+    scorer = race_settings.get("scorer", standard_scorer)
+    games = 0
+    if thresholds is None:
+        result = best_response(opponent, is_player, rng_seed=next_seed(seed_sequence), **race_settings)
+        thresholds = [result["strategy"].threshold] * turns
+        games += result["games"]
+    thresholds = list(thresholds)
+    result = None
+    sweeps = 0
+    changed = True
+    while changed and sweeps < max_sweeps:
+        changed = False
+        sweeps += 1
+        for turn in range(0, turns):
+            candidates = [KeepNAndAbovePerTurn(thresholds[:turn] + [n] + thresholds[turn + 1:], is_player, scorer)
+                          for n in THRESHOLDS]
+            result = best_response(opponent, is_player, candidates, rng_seed=next_seed(seed_sequence),
+                                   **race_settings)
+            games += result["games"]
+            # only move away from the current threshold if it was dropped from the race
+            current = thresholds[turn] - THRESHOLDS[0]
+            if current not in result["remaining"]:
+                thresholds[turn] = THRESHOLDS[result["best"]]
+                changed = True
+    strategy = KeepNAndAbovePerTurn(thresholds, is_player, scorer)
+    estimates = result["estimates"] if result is not None else None
+    return {
+        "strategy": strategy,
+        "estimate": estimates[thresholds[turns - 1] - THRESHOLDS[0]] if estimates is not None else None,
+        "sweeps": sweeps,
+        "converged": not changed,
+        "games": games
+    }
+
+
+def approximate_equilibrium(player_ai=None, dealer_ai=None, max_iterations=20, rng_seed=None, **race_settings):
+    """
+    Looks for a pair of threshold strategies where neither side has a better threshold against the other
+    (a pure equilibrium among the candidates of best_response) by alternating best responses.
+    Only KeepNAndAbove strategies are supported, as the candidates are compared by their threshold.
+
+    :param player_ai: the player AI to start from (a KeepNAndAbove), KeepNAndAbove with n=8 by default
+    :param dealer_ai: the dealer AI to start from (a KeepNAndAbove), KeepNAndAbove with n=8 by default
+    :param max_iterations: the maximum amount of rounds of best responses
+    :param rng_seed: the rng seed
+    :param race_settings: passed on to race (through best_response) and to estimate_matchup
+    :return: returns a dictionary with the player AI ('player_ai'), the dealer AI ('dealer_ai'),
+             the estimate of their matchup ('estimate', see estimate_matchup), whether neither side changed in the last
+             round ('converged'), the amount of rounds ('iterations') and the total amount of games played ('games')
+    """
+    seed_sequence = np.random.SeedSequence(rng_seed)
+    scorer = race_settings.get("scorer", standard_scorer)
+    player_ai = player_ai or KeepNAndAbove(n=8, is_player=True, scorer=scorer)
+    dealer_ai = dealer_ai or KeepNAndAbove(n=8, is_player=False, scorer=scorer)
+    for ai in (player_ai, dealer_ai):
+        # checked by attribute, the tests load the modules under a second name
+        if not isinstance(getattr(ai, "threshold", None), int):
+            raise ValueError("approximate_equilibrium only supports KeepNAndAbove, not " + type(ai).__name__)
+    games = 0
+    converged = False
+    iterations = 0
+    while not converged and iterations < max_iterations:
+        iterations += 1
+        # a strategy is only replaced by a strategy that is clearly better,
+        # the dealer responds to the player AI that is kept
+        player_result = best_response(dealer_ai, True, rng_seed=next_seed(seed_sequence), **race_settings)
+        player_kept = player_ai.threshold - THRESHOLDS[0] in player_result["remaining"]
+        if not player_kept:
+            player_ai = player_result["strategy"]
+        dealer_result = best_response(player_ai, False, rng_seed=next_seed(seed_sequence), **race_settings)
+        dealer_kept = dealer_ai.threshold - THRESHOLDS[0] in dealer_result["remaining"]
+        if not dealer_kept:
+            dealer_ai = dealer_result["strategy"]
+        converged = player_kept and dealer_kept
+        games += player_result["games"] + dealer_result["games"]
+    matchup_estimate = estimate_matchup(player_ai, dealer_ai, rng_seed=next_seed(seed_sequence), **race_settings)
+    return {
+        "player_ai": player_ai,
+        "dealer_ai": dealer_ai,
+        "estimate": matchup_estimate,
+        "converged": converged,
+        "iterations": iterations,
+        "games": games + matchup_estimate["games"]
+    }
+
+
+def estimate_matchup(player_ai, dealer_ai, rng_seed=None, batch_games=20000, max_games=2000000, confidence=0.95,
+                     tolerance=0.002, **game_settings):
+    """
+    Plays player_ai against dealer_ai in batches of batch_games games until the half width of the confidence interval
+    of the net win rate of the player is at most tolerance or max_games games were played.
+
+    :param player_ai: the player AI
+    :param dealer_ai: the dealer AI
+    :param rng_seed: the rng seed, an int or a numpy SeedSequence
+    :param batch_games: the amount of games played per round
+    :param max_games: the maximum amount of games played
+    :param confidence: the confidence level of the interval
+    :param tolerance: the half width at which the estimate is done
+    :param game_settings: passed on to play_matchup
+    :return: returns the estimate (see estimate) of the matchup
+    """
+    if isinstance(rng_seed, np.random.SeedSequence):
+        seed_sequence = rng_seed
+    else:
+        seed_sequence = np.random.SeedSequence(rng_seed)
+    statistics = GameStatistics(game_settings.get("turns", 13))
+    while True:
+        statistics.merge(play_matchup(player_ai, dealer_ai, min(batch_games, max_games - statistics.games),
+                                      next_seed(seed_sequence), **game_settings))
+        matchup_estimate = estimate(statistics, confidence)
+        if matchup_estimate["half_width"] <= tolerance or statistics.games >= max_games:
+            return matchup_estimate
+
+
+def threshold_sweep(player_ais=None, dealer_ais=None, rng_seed=None, batch_games=20000, max_games=2000000,
+                    confidence=0.95, tolerance=0.002, **game_settings):
+    """
+    Estimates the net win rate of the player (see GameStatistics) for every pair of player and dealer AI.
+    Every pair is played in batches of batch_games games until the half width of its confidence interval is at most
+    tolerance or max_games games were played, so pairs with little variance (e.g. mostly draws) finish early.
+
+    :param player_ais: the player AIs, a KeepNAndAbove for every threshold by default
+    :param dealer_ais: the dealer AIs, a KeepNAndAbove for every threshold by default
+    :param rng_seed: the rng seed
+    :param batch_games: the amount of games played per pair and round
+    :param max_games: the maximum amount of games played per pair
+    :param confidence: the confidence level of the intervals
+    :param tolerance: the half width at which a pair is done
+    :param game_settings: passed on to play_matchup
+    :return: returns a dictionary with numpy arrays of shape (player AIs, dealer AIs) of the net win rates ('values'),
+             the half widths of their confidence intervals ('half_widths') and the amount of games played ('games')
+    """
+    scorer = game_settings.get("scorer", standard_scorer)
+    player_ais = player_ais if player_ais is not None else threshold_strategies(True, scorer)
+    dealer_ais = dealer_ais if dealer_ais is not None else threshold_strategies(False, scorer)
+    seed_sequence = np.random.SeedSequence(rng_seed)
+    values = np.zeros((len(player_ais), len(dealer_ais)))
+    half_widths = np.zeros((len(player_ais), len(dealer_ais)))
+    games = np.zeros((len(player_ais), len(dealer_ais)), dtype=np.int64)
+    for i, player_ai in enumerate(player_ais):
+        for j, dealer_ai in enumerate(dealer_ais):
+            pair_estimate = estimate_matchup(player_ai, dealer_ai, seed_sequence.spawn(1)[0], batch_games, max_games,
+                                             confidence, tolerance, **game_settings)
+            values[i, j] = pair_estimate["value"]
+            half_widths[i, j] = pair_estimate["half_width"]
+            games[i, j] = pair_estimate["games"]
+    return {"values": values, "half_widths": half_widths, "games": games}
@@ -16,7 +16,16 @@ GER = {
     "draw": "Unentschieden.\n",
     "player_win": "Der Spieler hat gewonnen.\n",
     "player_score": "Spieler Punktzahl: ",
-    "dealer_score": "Dealer Punktzahl: "
+    "dealer_score": "Dealer Punktzahl: ",
+    "watch": "Schaue der KI gegen die KI zu.\n(Normale Version)",
+    "watch_title": "KI gegen KI",
+    "watch_waiting": "Die ersten Spiele werden gespielt...",
+    "watch_stop": "Anhalten",
+    "watch_games": "Spiele: ",
+    "watch_player_wins": "Siege des Spielers: ",
+    "watch_draws": "Unentschieden: ",
+    "watch_dealer_wins": "Siege des Dealers: ",
+    "watch_margin": "Mittlere Punktdifferenz (Spieler - Dealer): "
 }
 
 EN = {
@@ -37,5 +46,14 @@ EN = {
     "draw": "The game end in a draw.\n",
     "player_win": "The player won.\n",
     "player_score": "Player score: ",
-    "dealer_score": "Dealer score: "
+    "dealer_score": "Dealer score: ",
+    "watch": "Watch the AI play against the AI.\n(Regular version)",
+    "watch_title": "AI vs AI",
+    "watch_waiting": "Playing the first games...",
+    "watch_stop": "Stop",
+    "watch_games": "Games: ",
+    "watch_player_wins": "Player wins: ",
+    "watch_draws": "Draws: ",
+    "watch_dealer_wins": "Dealer wins: ",
+    "watch_margin": "Mean score difference (player - dealer): "
 }
@@ -3,6 +3,7 @@ import unittest
 
 from code.LeHer import LeHer
 from code.Decks import STANDARD_DECK
+from code.Strategies import Strategy
 
 
 class TestAutoPlay(unittest.TestCase):
@@ -93,3 +94,45 @@ class TestAutoPlay(unittest.TestCase):
         self.assertEqual(results["dealer_cards"],
                          [['KS', 'JS', '9S', '6S', '4S', '2S', '7S', 'QH', '10H', '8H', '5H', '3H', 'AD']])
         self.assertEqual(results["decks"], [STANDARD_DECK])
+
+
+class TestRandomStreams(unittest.TestCase):
+    def test_instances_do_not_disturb_each_other(self):
+        for remove_drawn_cards_from_deck in [True, False]:
+            alone = LeHer(RNG_SEED=8).auto_play_statistics(200, remove_drawn_cards_from_deck, SILENT_MODE=True)
+            game = LeHer(RNG_SEED=8)
+            other_game = LeHer(RNG_SEED=9)
+            interleaved = []
+            for _ in range(0, 2):
+                interleaved.append(game.auto_play_statistics(100, remove_drawn_cards_from_deck, SILENT_MODE=True))
+                other_game.auto_play_statistics(100, remove_drawn_cards_from_deck, SILENT_MODE=True)
+            interleaved[0].merge(interleaved[1])
+            self.assertEqual(alone.player_score_histogram, interleaved[0].player_score_histogram)
+            self.assertEqual(alone.dealer_score_histogram, interleaved[0].dealer_score_histogram)
+
+    def test_spawned_seeds_are_reproducible_and_independent(self):
+        results = []
+        for _ in range(0, 2):
+            seeds = LeHer(RNG_SEED=10).spawn_rng_seeds(2)
+            results.append([LeHer(RNG_SEED=seed).batch_play(100, True)["player_scores"].tolist() for seed in seeds])
+        self.assertEqual(results[0], results[1])
+        self.assertNotEqual(results[0][0], results[0][1])
+
+
+class TestGameState(unittest.TestCase):
+    def test_strategies_only_see_the_current_game(self):
+        test_case = self
+
+        class CheckingStrategy(Strategy):
+            def action(self, my_cards, revealed_player_cards, revealed_dealer_cards, player_trade_history,
+                       dealer_redraw_history, current_turn):
+                test_case.assertEqual(len(my_cards), current_turn + 1)
+                test_case.assertEqual(len(player_trade_history), current_turn + (0 if self.is_player else 1))
+                test_case.assertEqual(len(dealer_redraw_history), current_turn)
+                return current_turn % 2 == 0
+
+        for remove_drawn_cards_from_deck in [True, False]:
+            game = LeHer(PLAYER_AI=CheckingStrategy(is_player=True), DEALER_AI=CheckingStrategy(is_player=False),
+                         RNG_SEED=12)
+            statistics = game.auto_play_statistics(20, remove_drawn_cards_from_deck, SILENT_MODE=True)
+            self.assertEqual(statistics.trade_attempts, [20 if turn % 2 == 0 else 0 for turn in range(0, 13)])
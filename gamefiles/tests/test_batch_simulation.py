@@ -0,0 +1,77 @@
+import os
+import unittest
+
+import numpy as np
+
+from code.LeHer import LeHer
+from code.Decks import STANDARD_DECK
+from code.Scorer import standard_scorer
+from code.Strategies import KeepNAndAbove
+from code import BatchSimulation
+from code.CardEncoding import get_card_encoding
+from code.DeckSource import DeckSource
+from code.Outcome import HISTORY_NAMES
+
+
+class TestBatchSimulation(unittest.TestCase):
+    TEST_OUTPUT_DIRECTORY = "test_outputs/"
+
+    def delete_old_test_file(self, file_name):
+        if os.path.isfile(self.TEST_OUTPUT_DIRECTORY + file_name):
+            os.remove(self.TEST_OUTPUT_DIRECTORY + file_name)
+
+    def test_deck_in_order(self):
+        for remove_drawn_cards_from_deck in [True, False]:
+            game = LeHer(PRE_SHUFFLED_DECK=STANDARD_DECK)
+            results = game.batch_play(3, remove_drawn_cards_from_deck, INCLUDE_CARDS=True, INCLUDE_HISTORY=True)
+            self.assertEqual(results["player_scores"].tolist(), [85] * 3)
+            self.assertEqual(results["dealer_scores"].tolist(), [91] * 3)
+            player_history = [HISTORY_NAMES[code] for code in results["player_histories"][0]]
+            self.assertEqual(player_history, [
+                "ATTEMPTED_BUT_FAILED", "NOT_ATTEMPTED", "NOT_ATTEMPTED", "NOT_ATTEMPTED", "SUCCEEDED", "SUCCEEDED",
+                "SUCCEEDED", "NOT_ATTEMPTED", "NOT_ATTEMPTED", "NOT_ATTEMPTED", "SUCCEEDED", "SUCCEEDED", "SUCCEEDED"
+            ])
+            dealer_cards = [results["card_names"][card] for card in results["dealer_cards"][0]]
+            self.assertEqual(dealer_cards,
+                             ['KS', 'JS', '9S', '6S', '4S', '2S', '7S', 'QH', '10H', '8H', '5H', '3H', 'AD'])
+
+    def test_only_seven_of_spades_redraw(self):
+        game = LeHer(UNSHUFFLED_DECK=["7S"])
+        results = game.batch_play(5, False, INCLUDE_HISTORY=True)
+        self.assertEqual(results["player_scores"].tolist(), [91] * 5)
+        self.assertEqual(results["dealer_scores"].tolist(), [91] * 5)
+        self.assertTrue((results["dealer_histories"] == BatchSimulation.SUCCEEDED).all())
+
+    def test_same_games_as_auto_play_without_redraw(self):
+        file_name = "batch comparison.json"
+        card_encoding = get_card_encoding(STANDARD_DECK, standard_scorer)
+        cards = card_encoding.cards
+        deck_ids = card_encoding.deck_array
+        scores = card_encoding.score_array
+        is_king = card_encoding.is_king_array
+        player_ai = KeepNAndAbove(n=7, is_player=True)
+        dealer_ai = KeepNAndAbove(n=9, is_player=False)
+        decks = DeckSource(deck_ids, 13, True, np.random.default_rng(1)).take(50)
+        player_cards, dealer_cards, _, _ = BatchSimulation.simulate_removed(
+            decks.copy(), BatchSimulation.decision_table(player_ai, cards, 13),
+            BatchSimulation.decision_table(dealer_ai, cards, 13), is_king, 13)
+        for i, deck in enumerate(decks):
+            self.delete_old_test_file(file_name)
+            game = LeHer(PRE_SHUFFLED_DECK=[cards[card] for card in deck], PLAYER_AI=player_ai, DEALER_AI=dealer_ai)
+            results = game.auto_play(1, self.TEST_OUTPUT_DIRECTORY, file_name, True, SILENT_MODE=True)
+            self.assertEqual(results["player_scores"], [scores[player_cards[i]].sum()])
+            self.assertEqual(results["dealer_scores"], [scores[dealer_cards[i]].sum()])
+
+    def test_same_mean_scores_as_auto_play_with_redraw(self):
+        file_name = "batch comparison redraw.json"
+        self.delete_old_test_file(file_name)
+        games = 20000
+        scalar_results = LeHer(RNG_SEED=2).auto_play(games, self.TEST_OUTPUT_DIRECTORY, file_name, False,
+                                                     SILENT_MODE=True)
+        batch_results = LeHer(RNG_SEED=2).batch_play(games, False)
+        for key in ["player_scores", "dealer_scores"]:
+            scalar_scores = np.array(scalar_results[key])
+            batch_scores = batch_results[key]
+            # standard error of the difference of both means, the check fails by chance with p < 0.0001
+            standard_error = np.sqrt((scalar_scores.var() + batch_scores.var()) / games)
+            self.assertLess(abs(scalar_scores.mean() - batch_scores.mean()), 4 * standard_error)
@@ -0,0 +1,24 @@
+import unittest
+
+from code.Benchmark import run_benchmarks, compare
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_run_and_compare(self):
+        settings = {"results_games": [100], "results_games_log_all": [10]}
+        results = run_benchmarks(benchmarks=["get_results"], repeat=1, settings=settings)
+        self.assertEqual(len(results["results"]), 8)
+        self.assertIn("all_seconds", results["results"]["get_results binary 10 LOG_ALL"])
+        self.assertTrue(all(not comparison[-1] for comparison in compare(results, results)))
+
+    def test_regressions(self):
+        baseline = {"scale": "quick", "results": {"a": {"games_per_second": 100.0, "seconds": 1.0}}}
+        results = {"scale": "quick", "results": {"a": {"games_per_second": 70.0, "seconds": 0.5}, "b": {"seconds": 1}}}
+        comparisons = compare(results, baseline, tolerance=0.25)
+        self.assertEqual([(name, metric, regressed) for name, metric, _, _, _, regressed in comparisons],
+                         [("a", "games_per_second", True), ("a", "seconds", False)])
+        self.assertAlmostEqual(comparisons[1][4], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
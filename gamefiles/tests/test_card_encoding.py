@@ -0,0 +1,41 @@
+import unittest
+
+from code.CardEncoding import CodeView, get_card_encoding
+from code.Decks import STANDARD_DECK
+from code.Scorer import standard_scorer
+
+
+class TestCardEncoding(unittest.TestCase):
+    def test_lookup_tables_match_scorer(self):
+        card_encoding = get_card_encoding(STANDARD_DECK, standard_scorer)
+        self.assertEqual(card_encoding.decode(card_encoding.deck), STANDARD_DECK)
+        for card in STANDARD_DECK:
+            card_id = card_encoding.ids[card]
+            self.assertEqual(card_encoding.scores[card_id], standard_scorer(card))
+            self.assertEqual(card_encoding.score_array[card_id], standard_scorer(card))
+            self.assertEqual(card_encoding.is_king[card_id], card[0] == "K")
+        self.assertIs(card_encoding, get_card_encoding(list(STANDARD_DECK), standard_scorer))
+
+    def test_duplicate_and_extra_cards(self):
+        card_encoding = get_card_encoding(["7S"] * 27, standard_scorer, extra_cards=["KS", "7S"])
+        self.assertEqual(card_encoding.cards, ["7S", "KS"])
+        self.assertEqual(card_encoding.deck, [0] * 27)
+        self.assertEqual(card_encoding.is_king, [False, True])
+
+    def test_code_view(self):
+        card_ids = [0, 1]
+        view = CodeView(card_ids, ["7S", "KS"])
+        card_ids.append(0)
+        self.assertEqual(list(view), ["7S", "KS", "7S"])
+        self.assertEqual(view[-1], "7S")
+        self.assertEqual(view[1:], ["KS", "7S"])
+        self.assertEqual(len(view), 3)
+
+    def test_code_view_with_length(self):
+        view = CodeView([1, 0, 1, 1], ["7S", "KS"], length=2)
+        self.assertEqual(list(view), ["KS", "7S"])
+        self.assertEqual(view[-1], "7S")
+        self.assertEqual(view[:], ["KS", "7S"])
+        self.assertRaises(IndexError, view.__getitem__, 2)
+        view.length = 3
+        self.assertEqual(len(view), 3)
@@ -0,0 +1,134 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from code.Checkpoint import Checkpoint
+from code.DataProcessing import get_results
+from code.LeHer import LeHer
+from code import Main
+from code.Strategies import KeepNAndAbove
+
+
+class Interrupted(Exception):
+    pass
+
+
+class InterruptedCheckpoint(Checkpoint):
+    """
+    A checkpoint that interrupts the run right after its first save.
+    """
+
+    def save(self, run, games, finished, **state):
+        super().save(run, games, finished, **state)
+        raise Interrupted()
+
+
+class TestCheckpoint(unittest.TestCase):
+    TEST_OUTPUT_DIRECTORY = "test_outputs/checkpoint/"
+
+    def setUp(self):
+        shutil.rmtree(self.TEST_OUTPUT_DIRECTORY, ignore_errors=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.TEST_OUTPUT_DIRECTORY, ignore_errors=True)
+
+    def test_resumed_statistics_are_identical(self):
+        for remove_drawn_cards_from_deck in [True, False]:
+            file_path = self.TEST_OUTPUT_DIRECTORY + str(remove_drawn_cards_from_deck) + ".json"
+            uninterrupted = LeHer(RNG_SEED=4).auto_play_statistics(9000, remove_drawn_cards_from_deck,
+                                                                   SILENT_MODE=True)
+            with self.assertRaises(Interrupted):
+                LeHer(RNG_SEED=4).auto_play_statistics(9000, remove_drawn_cards_from_deck, SILENT_MODE=True,
+                                                       CHECKPOINT=InterruptedCheckpoint(file_path, 8500))
+            # the resumed run has to continue in the middle of a block of its DeckSource
+            resumed = LeHer(RNG_SEED=4).auto_play_statistics(9000, remove_drawn_cards_from_deck, SILENT_MODE=True,
+                                                             CHECKPOINT=Checkpoint(file_path, 8500))
+            self.assertEqual(resumed.to_dict(), uninterrupted.to_dict())
+            batch_file_path = file_path + ".batch.json"
+            uninterrupted = LeHer(RNG_SEED=4).batch_play_statistics(500, remove_drawn_cards_from_deck, BATCH_SIZE=70)
+            with self.assertRaises(Interrupted):
+                LeHer(RNG_SEED=4).batch_play_statistics(500, remove_drawn_cards_from_deck, BATCH_SIZE=70,
+                                                        CHECKPOINT=InterruptedCheckpoint(batch_file_path, 200))
+            resumed = LeHer(RNG_SEED=4).batch_play_statistics(500, remove_drawn_cards_from_deck, BATCH_SIZE=70,
+                                                              CHECKPOINT=Checkpoint(batch_file_path, 200))
+            self.assertEqual(resumed.to_dict(), uninterrupted.to_dict())
+
+    def test_resumed_logs_are_identical(self):
+        for log_format, extension in [("json", ".json"), ("jsonl", ".jsonl"), ("jsonl.gz", ".jsonl.gz"),
+                                      ("binary", ".bin")]:
+            LeHer(RNG_SEED=9).auto_play(300, self.TEST_OUTPUT_DIRECTORY, "uninterrupted", False, SILENT_MODE=True,
+                                        LOG_ALL=True, LOG_FORMAT=log_format)
+            checkpoint_path = self.TEST_OUTPUT_DIRECTORY + log_format + ".checkpoint.json"
+            with self.assertRaises(Interrupted):
+                LeHer(RNG_SEED=9).auto_play(300, self.TEST_OUTPUT_DIRECTORY, "resumed", False, SILENT_MODE=True,
+                                            LOG_ALL=True, LOG_FORMAT=log_format,
+                                            CHECKPOINT=InterruptedCheckpoint(checkpoint_path, 120))
+            if log_format != "json":
+                # games logged after the checkpoint (here only a part of one) are removed when resuming
+                with open(self.TEST_OUTPUT_DIRECTORY + "resumed" + extension, "ab") as log_file:
+                    log_file.write(b'{"id": 120, "player_sc')
+            LeHer(RNG_SEED=9).auto_play(300, self.TEST_OUTPUT_DIRECTORY, "resumed", False, SILENT_MODE=True,
+                                        LOG_ALL=True, LOG_FORMAT=log_format,
+                                        CHECKPOINT=Checkpoint(checkpoint_path, 120))
+            self.assertEqual(get_results(self.TEST_OUTPUT_DIRECTORY, "resumed" + extension, include_cards=True,
+                                         include_deck=True, include_history=True),
+                             get_results(self.TEST_OUTPUT_DIRECTORY, "uninterrupted" + extension, include_cards=True,
+                                         include_deck=True, include_history=True))
+
+    def test_other_runs_are_not_resumed(self):
+        file_path = self.TEST_OUTPUT_DIRECTORY + "other.json"
+        LeHer(RNG_SEED=1).auto_play_statistics(10, True, SILENT_MODE=True, CHECKPOINT=Checkpoint(file_path))
+        with self.assertRaises(ValueError):
+            LeHer(RNG_SEED=2).auto_play_statistics(10, True, SILENT_MODE=True, CHECKPOINT=Checkpoint(file_path))
+
+    def test_checkpoints_of_older_versions_are_not_resumed(self):
+        file_path = self.TEST_OUTPUT_DIRECTORY + "old.json"
+        LeHer(RNG_SEED=1).auto_play_statistics(10, True, SILENT_MODE=True, CHECKPOINT=Checkpoint(file_path))
+        with open(file_path) as checkpoint_file:
+            data = json.load(checkpoint_file)
+        # a version 1 checkpoint did not save the score difference histogram
+        data["version"] = 1
+        del data["statistics"]["score_difference_histogram"]
+        with open(file_path, "w") as checkpoint_file:
+            json.dump(data, checkpoint_file)
+        with self.assertRaises(ValueError):
+            LeHer(RNG_SEED=1).auto_play_statistics(10, True, SILENT_MODE=True, CHECKPOINT=Checkpoint(file_path))
+
+    def test_resumed_tournament_is_identical(self):
+        player_strategies = [(KeepNAndAbove(n=n, is_player=True), "keep " + str(n)) for n in [7, 9]]
+        dealer_strategies = [(KeepNAndAbove(n=n, is_player=False), "keep " + str(n)) for n in [7, 9]]
+        settings = {"REMOVE_DRAWN_CARDS_FROM_DECK": True, "GAMES_TO_AUTOPLAY": 400, "GAMES_PER_CHUNK": 150,
+                    "RNG_SEED": 3, "LOG_GAMES": False, "CHECKPOINT_EVERY": 60}
+        with contextlib.redirect_stdout(io.StringIO()):
+            Main.tournament(player_strategies, dealer_strategies, self.TEST_OUTPUT_DIRECTORY, OUTPUT_FOLDER="a/",
+                            **settings)
+            # interrupt the tournament in the middle of the second chunk of a cell
+            calls = []
+
+            class InterruptedTournamentCheckpoint(Checkpoint):
+                def save(self, run, games, finished, **state):
+                    super().save(run, games, finished, **state)
+                    calls.append(games)
+                    if len(calls) == 5:
+                        raise Interrupted()
+
+            with mock.patch.object(Main, "Checkpoint", InterruptedTournamentCheckpoint):
+                with self.assertRaises(Interrupted):
+                    Main.tournament(player_strategies, dealer_strategies, self.TEST_OUTPUT_DIRECTORY,
+                                    OUTPUT_FOLDER="b/", CHECKPOINT_FOLDER="checkpoints/", **settings)
+            Main.tournament(player_strategies, dealer_strategies, self.TEST_OUTPUT_DIRECTORY, OUTPUT_FOLDER="b/",
+                            CHECKPOINT_FOLDER="checkpoints/", **settings)
+        self.assertEqual(calls, [60, 120, 150, 60, 120])
+        results = [np.loadtxt(self.TEST_OUTPUT_DIRECTORY + folder + "results.txt") for folder in ["a/", "b/"]]
+        self.assertTrue((results[0] == results[1]).all())
+        self.assertEqual(len(os.listdir(self.TEST_OUTPUT_DIRECTORY + "checkpoints/")), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import sys
+import unittest
+
+from code import CommandLine
+
+
+class TestCommandLine(unittest.TestCase):
+    TEST_OUTPUT_DIRECTORY = "test_outputs/command line/"
+
+    def setUp(self):
+        shutil.rmtree(self.TEST_OUTPUT_DIRECTORY, ignore_errors=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.TEST_OUTPUT_DIRECTORY, ignore_errors=True)
+
+    def run_command(self, *argv):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            CommandLine.main(list(argv))
+        return output.getvalue().splitlines()
+
+    def test_parse_strategy(self):
+        strategy, name = CommandLine.dealer_strategy("keep:9")
+        # the strategies are created from the modules imported by CommandLine
+        self.assertEqual(type(strategy).__name__, "KeepNAndAbove")
+        self.assertEqual((strategy.threshold, strategy.is_player, name), (9, False, "keep 9 and above"))
+        strategy, _ = CommandLine.player_strategy("turns:" + ",".join(["8"] * 13))
+        self.assertEqual(type(strategy).__name__, "KeepNAndAbovePerTurn")
+        self.assertTrue(strategy.is_player)
+        for specification in ["keep", "keep:x", "always:8", "turns:", "turns:" + ",".join(["8"] * 14)]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                CommandLine.player_strategy(specification)
+
+    def test_errors_of_commands_are_usage_errors(self):
+        errors = io.StringIO()
+        with contextlib.redirect_stderr(errors), self.assertRaises(SystemExit) as context:
+            self.run_command("simulate", "--games", "10", "--player", "turns:7,8", "--format", "none")
+        self.assertEqual(context.exception.code, 2)
+        self.assertIn("only 2 thresholds for 13 turns", errors.getvalue())
+        arguments = ["simulate", "--games", "10", "--format", "binary", "--output", self.TEST_OUTPUT_DIRECTORY]
+        self.run_command(*arguments)
+        with contextlib.redirect_stderr(errors), self.assertRaises(SystemExit):
+            self.run_command(*arguments, "--remove")
+        self.assertIn("different run configuration", errors.getvalue())
+
+    def test_parser_does_not_import_numpy_or_qt(self):
+        code = ("import sys, CommandLine; CommandLine.build_parser().parse_args(['simulate', '--player', 'keep:9']); "
+                "print(any(module.split('.')[0] in ['numpy', 'PyQt5'] for module in sys.modules))")
+        output = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(CommandLine.__file__),
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
+    def test_simulate_tournament_and_analyze(self):
+        lines = self.run_command("simulate", "--games", "200", "--seed", "3", "--format", "jsonl", "--output",
+                                 self.TEST_OUTPUT_DIRECTORY, "--name", "simulation")
+        self.assertEqual(lines[0].split("\t")[:3], ["player_strategy", "dealer_strategy", "games"])
+        self.assertEqual(lines[1].split("\t")[:3], ["keep 8 and above", "keep 8 and above", "200"])
+        # the summary of the log equals the summary of the run
+        log_file = self.TEST_OUTPUT_DIRECTORY + "simulation.jsonl"
+        self.assertEqual(self.run_command("analyze", log_file)[1].split("\t")[2:], lines[1].split("\t")[2:])
+        lines = self.run_command("analyze", log_file, "--range", "0", "50", "--where", "won")
+        self.assertLess(int(lines[1].split("\t")[2]), 50)
+        self.assertEqual(lines[1].split("\t")[3], "1.000000")
+
+        tournament_folder = self.TEST_OUTPUT_DIRECTORY + "tournament"
+        self.run_command("tournament", "--player", "keep:7", "keep:9", "--dealer", "keep:8", "--games", "100",
+                         "--seed", "1", "--engine", "batch", "--output", tournament_folder)
+        lines = self.run_command("analyze", tournament_folder)
+        self.assertEqual([line.split("\t")[:3] for line in lines[1:]],
+                         [["keep 7 and above", "keep 8 and above", "100"],
+                          ["keep 9 and above", "keep 8 and above", "100"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
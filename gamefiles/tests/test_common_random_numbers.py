@@ -0,0 +1,35 @@
+import unittest
+
+from code.Strategies import KeepNAndAbove
+from code.CommonRandomNumbers import compare_matchups, matchup_grid
+
+
+class StatefulKeepNAndAbove(KeepNAndAbove):
+    # same decisions, but played by the scalar engine
+    STATELESS_BY_CARD = False
+    STATELESS_BY_TURN_AND_CARD = False
+
+
+class TestCompareMatchups(unittest.TestCase):
+    def test_scalar_replay_plays_same_games_as_batch_engine(self):
+        dealer_ai = KeepNAndAbove(n=8, is_player=False)
+        matchups = [(KeepNAndAbove(n=7, is_player=True), dealer_ai),
+                    (StatefulKeepNAndAbove(n=7, is_player=True), dealer_ai)]
+        for remove_drawn_cards_from_deck in [True, False]:
+            results = compare_matchups(matchups, 500, remove_drawn_cards_from_deck, rng_seed=1, batch_size=200)
+            batch_statistics, scalar_statistics = results["statistics"]
+            self.assertEqual(batch_statistics.player_score_histogram, scalar_statistics.player_score_histogram)
+            self.assertEqual(batch_statistics.dealer_score_histogram, scalar_statistics.dealer_score_histogram)
+            self.assertEqual(results["differences"][0, 1], 0)
+            self.assertEqual(results["half_widths"][0, 1], 0)
+
+    def test_paired_differences(self):
+        matchups = matchup_grid([KeepNAndAbove(n=n, is_player=True) for n in [7, 8]],
+                                [KeepNAndAbove(n=8, is_player=False)])
+        results = compare_matchups(matchups, 20000, False, rng_seed=2)
+        first, second = results["statistics"]
+        self.assertAlmostEqual(results["differences"][1, 0], second.net_win_rate - first.net_win_rate)
+        self.assertAlmostEqual(results["differences"][0, 1], -results["differences"][1, 0])
+        # the paired interval is narrower than the interval of independently played matchups would be
+        independent_half_width = 1.96 * ((first.net_win_rate_variance + second.net_win_rate_variance) / 20000) ** 0.5
+        self.assertLess(results["half_widths"][1, 0], independent_half_width / 2)
@@ -0,0 +1,252 @@
+import gzip
+import os
+import shutil
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from code.LeHer import LeHer
+from code import DataProcessing
+from code.Outcome import Outcome
+
+
+class TestStreamingLogger(unittest.TestCase):
+    TEST_OUTPUT_DIRECTORY = "test_outputs/"
+
+    def delete_old_test_file(self, file_name):
+        if os.path.isfile(self.TEST_OUTPUT_DIRECTORY + file_name):
+            os.remove(self.TEST_OUTPUT_DIRECTORY + file_name)
+
+    def test_append_continues_ids(self):
+        file_name = "streaming append.jsonl"
+        self.delete_old_test_file(file_name)
+        for run in range(0, 3):
+            logger = DataProcessing.StreamingLogger(self.TEST_OUTPUT_DIRECTORY, file_name, batch_size=4)
+            for score in range(0, 10):
+                logger.add_game(player_score=score, dealer_score=run)
+                # never more than batch_size games are kept in memory
+                self.assertLess(len(logger.lines), 4)
+            logger.log_staggered_games()
+        games = list(DataProcessing.iter_games(self.TEST_OUTPUT_DIRECTORY, file_name))
+        self.assertEqual([game["id"] for game in games], list(range(0, 30)))
+        results = DataProcessing.get_results(self.TEST_OUTPUT_DIRECTORY, file_name)
+        self.assertEqual(results["player_scores"], list(range(0, 10)) * 3)
+        self.assertEqual(results["dealer_scores"], [0] * 10 + [1] * 10 + [2] * 10)
+
+    def test_same_results_as_json(self):
+        results = {}
+        for log_format in ["json", "jsonl", "jsonl.gz"]:
+            file_name = "streaming comparison"
+            self.delete_old_test_file(DataProcessing.with_log_extension(file_name, log_format))
+            game = LeHer(RNG_SEED=3)
+            results[log_format] = game.auto_play(100, self.TEST_OUTPUT_DIRECTORY, file_name, True, SILENT_MODE=True,
+                                                 LOG_ALL=True, LOG_FORMAT=log_format)
+        self.assertEqual(results["json"], results["jsonl"])
+        self.assertEqual(results["json"], results["jsonl.gz"])
+        self.assertEqual(DataProcessing.get_results(self.TEST_OUTPUT_DIRECTORY, file_name + ".jsonl.gz",
+                                                    include_cards=True, include_deck=True, include_history=True),
+                         results["json"])
+
+    def test_histories_are_packed(self):
+        file_name = "packed histories.jsonl"
+        self.delete_old_test_file(file_name)
+        logger = DataProcessing.StreamingLogger(self.TEST_OUTPUT_DIRECTORY, file_name)
+        history = ["SUCCEEDED", "NOT_ATTEMPTED", "ATTEMPTED_BUT_FAILED"]
+        logger.add_game(player_score=1, dealer_score=2, player_history=history, dealer_history=[Outcome.SUCCEEDED])
+        logger.log_staggered_games()
+        game = next(DataProcessing.iter_games(self.TEST_OUTPUT_DIRECTORY, file_name))
+        self.assertIsInstance(game["player_history"], int)
+        results = DataProcessing.get_results(self.TEST_OUTPUT_DIRECTORY, file_name, include_history=True)
+        self.assertEqual(results["player_histories"], [history])
+        self.assertEqual(results["dealer_histories"], [["SUCCEEDED"]])
+        results = DataProcessing.get_results(self.TEST_OUTPUT_DIRECTORY, file_name, include_history=True,
+                                             history_format="outcomes")
+        self.assertEqual(results["player_histories"],
+                         [[Outcome.SUCCEEDED, Outcome.NOT_ATTEMPTED, Outcome.ATTEMPTED_BUT_FAILED]])
+
+
+class TestBinaryLogger(unittest.TestCase):
+    TEST_OUTPUT_DIRECTORY = "test_outputs/"
+
+    def delete_old_test_file(self, file_name):
+        if os.path.isfile(self.TEST_OUTPUT_DIRECTORY + file_name):
+            os.remove(self.TEST_OUTPUT_DIRECTORY + file_name)
+
+    def test_pack_histories(self):
+        codes = np.random.default_rng(0).integers(0, 3, size=(20, 13))
+        packed = DataProcessing.pack_histories(codes)
+        self.assertEqual(packed.shape, (20, 4))
+        self.assertEqual(DataProcessing.unpack_histories(packed, 13).tolist(), codes.tolist())
+
+    def test_same_results_as_json(self):
+        for log_all in [True, False]:
+            for remove_drawn_cards_from_deck in [True, False]:
+                results = {}
+                for log_format in ["json", "binary"]:
+                    file_name = "binary comparison"
+                    self.delete_old_test_file(DataProcessing.with_log_extension(file_name, log_format))
+                    # the second run is appended to the games of the first
+                    for _ in range(0, 2):
+                        game = LeHer(RNG_SEED=4)
+                        results[log_format] = game.auto_play(100, self.TEST_OUTPUT_DIRECTORY, file_name,
+                                                             remove_drawn_cards_from_deck, SILENT_MODE=True,
+                                                             LOG_ALL=log_all, LOG_FORMAT=log_format)
+                del results["binary"]["header"]
+                self.assertEqual(len(results["binary"]["player_scores"]), 200)
+                self.assertEqual(results["json"], results["binary"])
+
+    def test_other_run_configurations_are_not_appended(self):
+        file_name = "binary other configuration.bin"
+        self.delete_old_test_file(file_name)
+        LeHer(RNG_SEED=4).auto_play(10, self.TEST_OUTPUT_DIRECTORY, file_name, True, SILENT_MODE=True,
+                                    LOG_FORMAT="binary")
+        with self.assertRaises(ValueError):
+            LeHer(RNG_SEED=4).auto_play(10, self.TEST_OUTPUT_DIRECTORY, file_name, False, SILENT_MODE=True,
+                                        LOG_FORMAT="binary")
+
+    def test_runs_with_other_seeds_are_appended(self):
+        file_name = "binary other seed.bin"
+        self.delete_old_test_file(file_name)
+        for seed in [1, 2]:
+            LeHer(RNG_SEED=seed).auto_play(10, self.TEST_OUTPUT_DIRECTORY, file_name, True, SILENT_MODE=True,
+                                           LOG_FORMAT="binary")
+        results = DataProcessing.get_binary_results(self.TEST_OUTPUT_DIRECTORY, file_name)
+        self.assertEqual(results["header"]["segments"], [{"first_game": 0, "rng_seed": 1},
+                                                         {"first_game": 10, "rng_seed": 2}])
+        self.delete_old_test_file("binary second seed.bin")
+        second_seed = LeHer(RNG_SEED=2).auto_play(10, self.TEST_OUTPUT_DIRECTORY, "binary second seed.bin", True,
+                                                  SILENT_MODE=True, LOG_FORMAT="binary")
+        self.assertEqual(results["player_scores"][10:].tolist(), list(second_seed["player_scores"]))
+
+    def test_results_are_memory_mapped(self):
+        file_name = "binary memory map.bin"
+        self.delete_old_test_file(file_name)
+        LeHer(RNG_SEED=5).auto_play(10, self.TEST_OUTPUT_DIRECTORY, file_name, True, SILENT_MODE=True,
+                                    LOG_ALL=True, LOG_FORMAT="binary")
+        results = DataProcessing.get_binary_results(self.TEST_OUTPUT_DIRECTORY, file_name, include_cards=True,
+                                                    include_deck=True)
+        self.assertIsInstance(results["player_scores"].base, np.memmap)
+        self.assertEqual(results["player_cards"].shape, (10, 13))
+        self.assertEqual(results["decks"].shape, (10, 52))
+        self.assertEqual(results["header"]["segments"], [{"first_game": 0, "rng_seed": 5}])
+        self.assertTrue(results["header"]["run_configuration"]["remove_drawn_cards_from_deck"])
+
+
+class TestBackgroundLogger(unittest.TestCase):
+    TEST_OUTPUT_DIRECTORY = "test_outputs/"
+
+    def test_append_continues_ids(self):
+        file_name = "background append.jsonl.gz"
+        if os.path.isfile(self.TEST_OUTPUT_DIRECTORY + file_name):
+            os.remove(self.TEST_OUTPUT_DIRECTORY + file_name)
+        for run in range(0, 3):
+            logger = DataProcessing.BackgroundLogger(self.TEST_OUTPUT_DIRECTORY, file_name, batch_size=4,
+                                                     queue_size=1)
+            for score in range(0, 10):
+                logger.add_game(player_score=score, dealer_score=run)
+                # the added games wait in the queue or are handed to the writer every batch_size games
+                self.assertLess(len(logger.games), 4)
+                self.assertLessEqual(logger.queue.qsize(), 1)
+            logger.log_staggered_games()
+            self.assertIsNone(logger.writer)
+        with gzip.open(self.TEST_OUTPUT_DIRECTORY + file_name, "rt") as log_file:
+            self.assertEqual(len(log_file.readlines()), 30)
+        games = list(DataProcessing.iter_games(self.TEST_OUTPUT_DIRECTORY, file_name))
+        self.assertEqual([game["id"] for game in games], list(range(0, 30)))
+        results = DataProcessing.get_results(self.TEST_OUTPUT_DIRECTORY, file_name, id_range=(8, 12))
+        self.assertEqual(results["player_scores"], [8, 9, 0, 1])
+        self.assertEqual(results["dealer_scores"], [0, 0, 1, 1])
+
+    def test_writer_error_is_raised(self):
+        file_name = "background error.jsonl"
+        shutil.rmtree(self.TEST_OUTPUT_DIRECTORY + file_name, ignore_errors=True)
+        if os.path.isfile(self.TEST_OUTPUT_DIRECTORY + file_name):
+            os.remove(self.TEST_OUTPUT_DIRECTORY + file_name)
+        logger = DataProcessing.BackgroundLogger(self.TEST_OUTPUT_DIRECTORY, file_name, batch_size=2, queue_size=1)
+        # the writer can not open a folder
+        os.remove(self.TEST_OUTPUT_DIRECTORY + file_name)
+        os.mkdir(self.TEST_OUTPUT_DIRECTORY + file_name)
+        with self.assertRaises(IsADirectoryError):
+            for score in range(0, 20):
+                logger.add_game(player_score=score, dealer_score=score)
+            logger.log_staggered_games()
+        self.assertIsNone(logger.writer)
+        os.rmdir(self.TEST_OUTPUT_DIRECTORY + file_name)
+
+
+class TestStreamingReader(unittest.TestCase):
+    TEST_OUTPUT_DIRECTORY = "test_outputs/"
+
+    def log(self, log_format):
+        file_name = DataProcessing.with_log_extension("streaming reader", log_format)
+        if os.path.isfile(self.TEST_OUTPUT_DIRECTORY + file_name):
+            os.remove(self.TEST_OUTPUT_DIRECTORY + file_name)
+        LeHer(RNG_SEED=6).auto_play(250, self.TEST_OUTPUT_DIRECTORY, file_name, False, SILENT_MODE=True,
+                                    LOG_ALL=True, LOG_FORMAT=log_format, RETURN_RESULTS=False)
+        return file_name
+
+    def test_fields_ranges_and_filters(self):
+        for log_format in ["json", "jsonl", "binary"]:
+            file_name = self.log(log_format)
+            everything = DataProcessing.get_results(self.TEST_OUTPUT_DIRECTORY, file_name, include_cards=True,
+                                                    include_deck=True, include_history=True,
+                                                    history_format="packed")
+            games = list(DataProcessing.iter_games(self.TEST_OUTPUT_DIRECTORY, file_name,
+                                                   ["id", "player_score", "dealer_score", "player_history"],
+                                                   id_range=(40, 200), where=DataProcessing.player_lost))
+            expected = [i for i in range(40, 200) if everything["player_scores"][i] < everything["dealer_scores"][i]]
+            self.assertEqual([game["id"] for game in games], expected)
+            self.assertEqual([game["player_history"] for game in games],
+                             [everything["player_histories"][i] for i in expected])
+            self.assertEqual(set(games[0]), {"id", "player_score", "dealer_score", "player_history"})
+            chunks = list(DataProcessing.iter_game_chunks(self.TEST_OUTPUT_DIRECTORY, file_name,
+                                                          ["id", "dealer_cards", "deck_to_start_of_game"],
+                                                          chunk_size=64, id_range=(10, None)))
+            self.assertEqual([len(chunk["id"]) for chunk in chunks], [64, 64, 64, 48])
+            self.assertEqual(np.concatenate([chunk["id"] for chunk in chunks]).tolist(), list(range(10, 250)))
+            self.assertEqual(chunks[1]["dealer_cards"].tolist(), everything["dealer_cards"][74:138])
+            deck = chunks[0]["deck_to_start_of_game"][0].tolist()
+            self.assertEqual([card for card in deck if card], everything["decks"][10])
+
+    def test_braces_in_strings_are_not_read(self):
+        file_name = "streaming reader braces.jsonl"
+        with open(self.TEST_OUTPUT_DIRECTORY + file_name, "w") as log_file:
+            log_file.write('{"id": 0, "player_score": 90, "dealer_score": 80}\n')
+            log_file.write('{"id": 1, "player_score": 90, "dealer_score": 80, "player_cards": ["{S"]}\n')
+        with self.assertRaises(ValueError):
+            list(DataProcessing.iter_games(self.TEST_OUTPUT_DIRECTORY, file_name))
+        os.remove(self.TEST_OUTPUT_DIRECTORY + file_name)
+
+    def test_filtered_results_of_every_format_are_equal(self):
+        results = []
+        for log_format in ["json", "jsonl", "binary"]:
+            file_name = self.log(log_format)
+            results.append(DataProcessing.get_results(self.TEST_OUTPUT_DIRECTORY, file_name, include_history=True,
+                                                      id_range=(5, 105), where=DataProcessing.player_won))
+            chunks = DataProcessing.iter_game_chunks(self.TEST_OUTPUT_DIRECTORY, file_name,
+                                                     ["player_score", "dealer_score", "player_history"],
+                                                     where=DataProcessing.is_draw)
+            for chunk in chunks:
+                self.assertTrue((chunk["player_score"] == chunk["dealer_score"]).all())
+        results[2].pop("header")
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+        self.assertTrue(0 < len(results[0]["player_scores"]) < 100)
+
+    def test_small_read_blocks(self):
+        for log_format in ["json", "jsonl"]:
+            file_name = self.log(log_format)
+            expected = DataProcessing.get_results(self.TEST_OUTPUT_DIRECTORY, file_name, include_cards=True,
+                                                  include_history=True, id_range=(3, 240))
+            games = list(DataProcessing.iter_games(self.TEST_OUTPUT_DIRECTORY, file_name))
+            # blocks of a few games, so games are cut off at the end of blocks and ranges cut blocks
+            with mock.patch.object(DataProcessing, "READ_BUFFER_SIZE", 1000):
+                self.assertEqual(DataProcessing.get_results(self.TEST_OUTPUT_DIRECTORY, file_name,
+                                                            include_cards=True, include_history=True,
+                                                            id_range=(3, 240)), expected)
+                self.assertEqual(list(DataProcessing.iter_games(self.TEST_OUTPUT_DIRECTORY, file_name)), games)
+                scores = list(DataProcessing.iter_games(self.TEST_OUTPUT_DIRECTORY, file_name,
+                                                        ["player_score"], id_range=(7, 9)))
+            self.assertEqual(len(games), 250)
+            self.assertEqual(scores, [{"player_score": game["player_score"]} for game in games[7:9]])
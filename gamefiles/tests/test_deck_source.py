@@ -0,0 +1,28 @@
+import unittest
+
+import numpy as np
+
+from code.LeHer import LeHer
+from code.DeckSource import DeckSource
+from code.Decks import STANDARD_DECK
+from code.CardEncoding import get_card_encoding
+
+
+class TestDeckSource(unittest.TestCase):
+    def test_stream_does_not_depend_on_how_games_are_taken(self):
+        deck_ids = get_card_encoding(STANDARD_DECK).deck_array
+        for remove_drawn_cards_from_deck in [True, False]:
+            taken = DeckSource(deck_ids, 13, remove_drawn_cards_from_deck, np.random.default_rng(1), block_size=7)
+            single = DeckSource(deck_ids, 13, remove_drawn_cards_from_deck, np.random.default_rng(1), block_size=7)
+            games = np.concatenate([taken.take(5), taken.take(0), taken.take(12)])
+            self.assertEqual(games.tolist(), [single.next_game() for _ in range(0, 17)])
+            if remove_drawn_cards_from_deck:
+                self.assertTrue((np.sort(games, axis=1) == np.sort(deck_ids)).all())
+
+    def test_scalar_and_batch_engine_play_same_games(self):
+        for remove_drawn_cards_from_deck in [True, False]:
+            statistics = LeHer(RNG_SEED=11).auto_play_statistics(300, remove_drawn_cards_from_deck, SILENT_MODE=True)
+            batch_statistics = LeHer(RNG_SEED=11).batch_play_statistics(300, remove_drawn_cards_from_deck)
+            self.assertEqual(statistics.player_score_histogram, batch_statistics.player_score_histogram)
+            self.assertEqual(statistics.dealer_score_histogram, batch_statistics.dealer_score_histogram)
+            self.assertEqual(statistics.redraw_successes, batch_statistics.redraw_successes)
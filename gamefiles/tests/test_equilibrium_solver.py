@@ -0,0 +1,85 @@
+import json
+import math
+import shutil
+import unittest
+
+import numpy as np
+
+from code.Checkpoint import Checkpoint
+from code.EquilibriumSolver import EquilibriumSolver
+from code.ExactEvaluator import evaluate_with_replacement
+from code.LeHer import LeHer
+from code.Strategies import KeepNAndAbove, KeepNAndAbovePerTurn
+
+
+class TestEquilibriumSolver(unittest.TestCase):
+    TEST_OUTPUT_DIRECTORY = "test_outputs/equilibrium solver/"
+
+    def setUp(self):
+        shutil.rmtree(self.TEST_OUTPUT_DIRECTORY, ignore_errors=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.TEST_OUTPUT_DIRECTORY, ignore_errors=True)
+
+    def test_same_rates_as_exact_evaluator(self):
+        solver = EquilibriumSolver()
+        for player_ai, dealer_ai in [(KeepNAndAbove(n=8, is_player=True), KeepNAndAbove(n=8, is_player=False)),
+                                     (KeepNAndAbovePerTurn(range(2, 15), is_player=True),
+                                      KeepNAndAbovePerTurn(range(14, 1, -1), is_player=False))]:
+            strategies = solver.strategies_of(player_ai, dealer_ai)
+            results = solver.evaluate(strategies)
+            expected = evaluate_with_replacement(player_ai, dealer_ai)
+            for key in ["win_rate", "draw_rate", "dealer_win_rate"]:
+                self.assertAlmostEqual(results[key], expected[key])
+            # the counterfactual values of every turn add up to the value of the game
+            values, value = solver.action_values(strategies)
+            self.assertAlmostEqual(value, results["net_win_rate"])
+            probabilities = np.stack([1 - strategies, strategies], axis=-1)
+            np.testing.assert_allclose((values * probabilities).sum(axis=(2, 3, 4)),
+                                       [[value] * 13, [-value] * 13], atol=1e-12)
+
+    def test_single_turn_equilibrium(self):
+        solver = EquilibriumSolver(turns=1)
+        strategies = solver.solve(300)
+        self.assertLess(solver.deviation_gains(strategies).sum(), 1e-3)
+        # the player trades everything below 8 and the dealer redraws everything below 9 if the player kept
+        np.testing.assert_array_equal(strategies[0, 0, :12, 0].round(), [1] * 7 + [0] * 5)
+        np.testing.assert_array_equal(strategies[1, 0, :12, 0].round(), [1] * 8 + [0] * 4)
+
+    def test_strategies_play_like_the_solution(self):
+        solver = EquilibriumSolver()
+        solver.solve(20)
+        value = solver.evaluate(solver.average_strategies())["net_win_rate"]
+        games = 20000
+        game = LeHer(PLAYER_AI=solver.strategy(True, rng_seed=1), DEALER_AI=solver.strategy(False, rng_seed=2),
+                     RNG_SEED=3)
+        statistics = game.auto_play_statistics(games, False, SILENT_MODE=True)
+        # fails by chance with p < 0.0001
+        self.assertLess(abs(statistics.net_win_rate - value), 4 * math.sqrt(statistics.net_win_rate_variance / games))
+
+    def test_random_state_includes_mixed_decisions(self):
+        # without iterations every infoset takes its action with probability 0.5
+        solver = EquilibriumSolver()
+        game = LeHer(PLAYER_AI=solver.strategy(True, rng_seed=1), DEALER_AI=solver.strategy(False, rng_seed=2),
+                     RNG_SEED=3)
+        game.auto_play_statistics(50, False, SILENT_MODE=True)
+        random_state = json.loads(json.dumps(game.get_random_state()))
+        first = game.auto_play_statistics(200, False, SILENT_MODE=True).to_dict()
+        game.set_random_state(random_state)
+        self.assertEqual(game.auto_play_statistics(200, False, SILENT_MODE=True).to_dict(), first)
+
+    def test_resume_from_checkpoint(self):
+        deck = ["2S", "5S", "9S", "KS", "AC"]
+        uninterrupted = EquilibriumSolver(unshuffled_deck=deck, turns=3)
+        expected = uninterrupted.solve(8)
+        checkpoint = Checkpoint(self.TEST_OUTPUT_DIRECTORY + "solver.json", every_games=3)
+        EquilibriumSolver(unshuffled_deck=deck, turns=3).solve(5, checkpoint)
+        resumed = EquilibriumSolver(unshuffled_deck=deck, turns=3)
+        np.testing.assert_array_equal(resumed.solve(8, checkpoint), expected)
+        np.testing.assert_array_equal(resumed.regrets, uninterrupted.regrets)
+        with self.assertRaises(ValueError):
+            EquilibriumSolver(unshuffled_deck=deck, turns=2).solve(8, checkpoint)
+
+
+if __name__ == '__main__':
+    unittest.main()
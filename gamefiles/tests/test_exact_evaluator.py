@@ -0,0 +1,81 @@
+import collections
+import itertools
+import math
+import unittest
+
+from code.ExactEvaluator import evaluate_with_replacement, evaluate_without_replacement
+from code.LeHer import LeHer
+from code.Strategies import KeepNAndAbove, KeepNAndAbovePerTurn
+
+
+class TestEvaluateWithReplacement(unittest.TestCase):
+    def test_single_turn_by_hand(self):
+        # with cards 2 and 3 both trade and redraw a 2, see the comments of the cases below
+        results = evaluate_with_replacement(KeepNAndAbove(n=3, is_player=True), KeepNAndAbove(n=3, is_player=False),
+                                            unshuffled_deck=["2S", "3S"], turns=1)
+        # 2 vs 2: trade, dealer redraws 2 (draw) or 3 (loss)
+        # 2 vs 3: trade to 3 vs 2, dealer redraws 2 (win) or 3 (draw)
+        # 3 vs 2: keep, dealer redraws 2 (win) or 3 (draw)
+        # 3 vs 3: keep, dealer keeps (draw)
+        self.assertAlmostEqual(results["win_rate"], 1 / 4)
+        self.assertAlmostEqual(results["draw_rate"], 5 / 8)
+        self.assertAlmostEqual(results["dealer_win_rate"], 1 / 8)
+        self.assertEqual(set(results["score_difference_distribution"]), {-1, 0, 1})
+
+    def test_only_seven_of_spades(self):
+        results = evaluate_with_replacement(KeepNAndAbove(n=8, is_player=True), KeepNAndAbove(n=8, is_player=False),
+                                            unshuffled_deck=["7S"])
+        self.assertAlmostEqual(results["draw_rate"], 1)
+
+    def test_same_rates_as_auto_play(self):
+        games = 20000
+        for player_threshold, dealer_threshold in [(8, 8), (6, 10)]:
+            player_ai = KeepNAndAbove(n=player_threshold, is_player=True)
+            dealer_ai = KeepNAndAbove(n=dealer_threshold, is_player=False)
+            results = evaluate_with_replacement(player_ai, dealer_ai)
+            statistics = LeHer(PLAYER_AI=player_ai, DEALER_AI=dealer_ai, RNG_SEED=7).auto_play_statistics(
+                games, False, SILENT_MODE=True)
+            for rate, simulated_rate in [(results["win_rate"], statistics.win_rate),
+                                         (results["draw_rate"], statistics.draw_rate)]:
+                # fails by chance with p < 0.0001
+                self.assertLess(abs(rate - simulated_rate), 4 * math.sqrt(rate * (1 - rate) / games))
+
+
+class TestEvaluateWithoutReplacement(unittest.TestCase):
+    def test_every_deck_order(self):
+        # two kings make trades and redraws fail, so the top card of the deck is known in some turns
+        deck = ["2S", "5S", "5H", "KS", "9S", "KD", "AC"]
+        for player_ai, dealer_ai in [(KeepNAndAbove(n=5, is_player=True), KeepNAndAbove(n=6, is_player=False)),
+                                     (KeepNAndAbovePerTurn([3, 9, 2], is_player=True),
+                                      KeepNAndAbovePerTurn([10, 2, 6], is_player=False))]:
+            games = collections.Counter()
+            for shuffled_deck in itertools.permutations(deck):
+                game = LeHer(PLAYER_AI=player_ai, DEALER_AI=dealer_ai, TURNS_PER_GAME=3, UNSHUFFLED_DECK=deck,
+                             PRE_SHUFFLED_DECK=list(shuffled_deck))
+                game.play_game(True)
+                player_score, dealer_score = game.get_scores()
+                games[player_score - dealer_score] += 1
+            results = evaluate_without_replacement(player_ai, dealer_ai, unshuffled_deck=deck, turns=3)
+            distribution = results["score_difference_distribution"]
+            self.assertEqual(set(distribution), set(games))
+            for difference, probability in distribution.items():
+                self.assertAlmostEqual(probability, games[difference] / math.factorial(len(deck)))
+
+    def test_same_rates_as_batch_play(self):
+        games = 100000
+        for player_threshold, dealer_threshold in [(8, 8), (6, 10)]:
+            player_ai = KeepNAndAbove(n=player_threshold, is_player=True)
+            dealer_ai = KeepNAndAbove(n=dealer_threshold, is_player=False)
+            results = evaluate_without_replacement(player_ai, dealer_ai)
+            self.assertAlmostEqual(sum(results["score_difference_distribution"].values()), 1)
+            statistics = LeHer(PLAYER_AI=player_ai, DEALER_AI=dealer_ai, RNG_SEED=7).batch_play_statistics(games,
+                                                                                                          True)
+            for rate, simulated_rate in [(results["win_rate"], statistics.win_rate),
+                                         (results["draw_rate"], statistics.draw_rate)]:
+                # fails by chance with p < 0.0001
+                self.assertLess(abs(rate - simulated_rate), 4 * math.sqrt(rate * (1 - rate) / games))
+
+    def test_deck_too_small(self):
+        with self.assertRaises(ValueError):
+            evaluate_without_replacement(KeepNAndAbove(n=8, is_player=True), KeepNAndAbove(n=8, is_player=False),
+                                         unshuffled_deck=["2S", "3S"], turns=1)
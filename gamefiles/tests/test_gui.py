@@ -0,0 +1,125 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+# the GUI is tested without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QDeadlineTimer, QEventLoop
+from PyQt5.QtWidgets import QApplication, QMainWindow
+
+from code import GUI
+
+
+def process_events_until(condition, timeout=10000):
+    """
+    Processes the events of the GUI thread until the signals of the worker threads satisfy a condition.
+
+    :param condition: function returning True once the condition is met
+    :param timeout: the maximum amount of milliseconds to wait
+    :return: returns whether the condition is met
+    """
+    deadline = QDeadlineTimer(timeout)
+    while not condition() and not deadline.hasExpired():
+        QApplication.processEvents(QEventLoop.AllEvents, 10)
+    return condition()
+
+
+class GUITestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def setUp(self):
+        GUI.card_art.cache_clear()
+        self.main_window = QMainWindow()
+        self.window = GUI.GUIWindow(os.path.dirname(GUI.__file__) + "/", self.main_window, RNG_SEED=1)
+
+    def tearDown(self):
+        self.window.stop_threads()
+
+    def wait_for_ai(self):
+        """
+        Waits until it is the turn of the user again or the game is over.
+        """
+        buttons = [self.window.PlayerNoAction, self.window.DealerNoAction]
+        self.assertTrue(process_events_until(lambda: any(button.isEnabled() for button in buttons)))
+
+
+class TestCardArt(GUITestCase):
+
+    def test_art_is_loaded_on_demand_and_cached(self):
+        # only the empty card is shown before the first game
+        self.assertEqual(GUI.card_art.cache_info().currsize, 1)
+        self.window.initialize_game(True, True)
+        loaded = GUI.card_art.cache_info().currsize
+        self.assertLessEqual(loaded, 4)
+        pixmap = self.window.playerCardLabels[0].pixmap()
+        # scaled once to fit the label
+        self.assertEqual(pixmap.width(), GUI.CARD_ART_WIDTH)
+        self.assertLessEqual(pixmap.height(), GUI.CARD_ART_HEIGHT)
+        # a second window uses the art loaded by the first
+        GUI.GUIWindow(os.path.dirname(GUI.__file__) + "/", QMainWindow(), RNG_SEED=1).stop_threads()
+        self.assertEqual(GUI.card_art.cache_info().currsize, loaded)
+
+    def test_unchanged_labels_are_not_set(self):
+        self.window.initialize_game(True, True)
+        # the user plays as player and never trades, the game reveals every card at its end
+        while self.window.current_turn < self.window.TURNS_PER_GAME:
+            self.window.player_no_action()
+            self.wait_for_ai()
+        with mock.patch.object(GUI, "card_art", wraps=GUI.card_art) as card_art:
+            # the first cards are shown already
+            self.window.change_card_art(True, self.window.game.get_card(True, 0), 0)
+            self.window.change_card_art(False, self.window.game.get_card(False, 0), 0)
+            self.assertEqual(card_art.call_count, 0)
+            self.window.reset_gui()
+            self.assertEqual(card_art.call_count, 2 * self.window.TURNS_PER_GAME)
+            self.window.reset_gui()
+            self.assertEqual(card_art.call_count, 2 * self.window.TURNS_PER_GAME)
+
+
+class TestWorkerThreads(GUITestCase):
+    def test_ai_decides_on_its_thread(self):
+        decisions = []
+        self.window.aiWorker.decided.connect(lambda asks_player_ai, action: decisions.append(asks_player_ai))
+        self.window.initialize_game(False, True)
+        # the buttons stay disabled until the player AI decided
+        self.assertFalse(self.window.DealerNoAction.isEnabled())
+        self.assertEqual(decisions, [])
+        self.wait_for_ai()
+        self.assertEqual(decisions, [True])
+        self.assertTrue(self.window.DealerNoAction.isEnabled())
+        self.assertFalse(self.window.PlayerNoAction.isEnabled())
+        # the user plays as dealer and never redraws, the player AI decides every turn
+        while self.window.current_turn < self.window.TURNS_PER_GAME:
+            self.window.dealer_no_action()
+            self.wait_for_ai()
+        self.assertEqual(decisions, [True] * self.window.TURNS_PER_GAME)
+        self.assertTrue(all(button.isEnabled() for button in [self.window.PlayerAction, self.window.DealerAction]))
+
+    def test_watch_mode(self):
+        self.window.watch(True, games_per_update=100, max_games=300)
+        watch_window = self.window.watchWindow
+        updates = []
+        watch_window.worker.updated.connect(lambda statistics: updates.append(statistics["games"]))
+        self.assertTrue(process_events_until(lambda: not watch_window.StopButton.isEnabled()))
+        process_events_until(lambda: watch_window.statistics is not None and watch_window.statistics.games == 300)
+        self.assertEqual(watch_window.statistics.games, 300)
+        self.assertEqual(updates[-1], 300)
+        self.assertEqual(sum(games for _, games in watch_window.Histogram.histogram), 300)
+        self.assertIn("300", watch_window.SummaryLabel.text())
+        watch_window.Histogram.grab()
+
+    def test_stopping_the_watch_mode(self):
+        self.window.watch(False, games_per_update=100)
+        watch_window = self.window.watchWindow
+        self.assertTrue(process_events_until(lambda: watch_window.statistics is not None))
+        watch_window.close()
+        self.assertTrue(watch_window.workerThread.isFinished())
+        self.assertFalse(watch_window.StopButton.isEnabled())
+
+
+if __name__ == '__main__':
+    unittest.main()
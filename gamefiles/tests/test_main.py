@@ -0,0 +1,97 @@
+import contextlib
+import csv
+import io
+import shutil
+import unittest
+
+import numpy as np
+
+from code import Main
+from code.DataProcessing import get_results
+from code.LeHer import LeHer
+from code.Strategies import KeepNAndAbove
+
+
+class TestTournamentSummary(unittest.TestCase):
+    TEST_OUTPUT_DIRECTORY = "test_outputs/tournament/"
+
+    def setUp(self):
+        shutil.rmtree(self.TEST_OUTPUT_DIRECTORY, ignore_errors=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.TEST_OUTPUT_DIRECTORY, ignore_errors=True)
+
+    def test_summary_of_logged_games(self):
+        player_strategies = [(KeepNAndAbove(n=n, is_player=True), "keep " + str(n)) for n in [7, 9]]
+        dealer_strategies = [(KeepNAndAbove(n=8, is_player=False), "keep 8")]
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = Main.tournament(player_strategies, dealer_strategies, self.TEST_OUTPUT_DIRECTORY,
+                                      GAMES_TO_AUTOPLAY=300, GAMES_PER_CHUNK=200, RNG_SEED=4)
+        self.assertEqual(summary["games"].tolist(), [[300], [300]])
+        self.assertTrue(np.allclose(summary["win_rate"] + summary["draw_rate"] + summary["dealer_win_rate"], 1))
+        # the summary equals the one computed from the logs of the second cell
+        scores = {key: [] for key in ["player_scores", "dealer_scores"]}
+        for part in range(0, 2):
+            results = get_results(self.TEST_OUTPUT_DIRECTORY + "output/",
+                                  "keep 9 (player) vs keep 8 (dealer) (part " + str(part) + ").jsonl")
+            for key in scores:
+                scores[key] += results[key]
+        differences = np.array(scores["player_scores"]) - np.array(scores["dealer_scores"])
+        self.assertAlmostEqual(summary["mean_margin"][1, 0], differences.mean())
+        self.assertAlmostEqual(summary["margin_std"][1, 0], differences.std(ddof=1))
+        self.assertAlmostEqual(summary["win_rate"][1, 0], np.mean(differences > 0))
+        self.assertGreater(summary["mean_margin_ci"][1, 0], 0)
+        counts = dict(zip(*np.unique(differences, return_counts=True)))
+        self.assertEqual(summary["score_difference_histograms"][1, 0].tolist(),
+                         [counts.get(difference, 0) for difference in summary["score_differences"]])
+
+        loaded = Main.load_tournament_summary(self.TEST_OUTPUT_DIRECTORY + "output/")
+        self.assertEqual(set(loaded), set(summary))
+        for key in summary:
+            np.testing.assert_array_equal(loaded[key], summary[key])
+        with open(self.TEST_OUTPUT_DIRECTORY + "output/results.csv", newline="") as csv_file:
+            rows = list(csv.DictReader(csv_file))
+        self.assertEqual([(row["player_strategy"], row["dealer_strategy"]) for row in rows],
+                         [("keep 7", "keep 8"), ("keep 9", "keep 8")])
+        self.assertAlmostEqual(float(rows[1]["net_win_rate_ci"]), summary["net_win_rate_ci"][1, 0])
+        with open(self.TEST_OUTPUT_DIRECTORY + "output/score_differences.csv", newline="") as csv_file:
+            rows = [row for row in csv.DictReader(csv_file) if row["player_strategy"] == "keep 9"]
+        self.assertEqual(sum(int(row["games"]) for row in rows), 300)
+
+    def test_results_do_not_depend_on_the_workers(self):
+        player_strategies = [(KeepNAndAbove(n=n, is_player=True), "keep " + str(n)) for n in [7, 9]]
+        dealer_strategies = [(KeepNAndAbove(n=n, is_player=False), "keep " + str(n)) for n in [7, 9]]
+        summaries = {}
+        for workers in [1, 2]:
+            output_folder = str(workers) + " workers/"
+            with contextlib.redirect_stdout(io.StringIO()):
+                Main.tournament(player_strategies, dealer_strategies, self.TEST_OUTPUT_DIRECTORY,
+                                OUTPUT_FOLDER=output_folder, GAMES_TO_AUTOPLAY=300, GAMES_PER_CHUNK=100, RNG_SEED=4,
+                                WORKERS=workers)
+            summaries[workers] = Main.load_tournament_summary(self.TEST_OUTPUT_DIRECTORY + output_folder)
+        self.assertEqual(set(summaries[1]), set(summaries[2]))
+        for key in summaries[1]:
+            np.testing.assert_array_equal(summaries[1][key], summaries[2][key])
+        file_name = "keep 9 (player) vs keep 7 (dealer) (part 2).jsonl"
+        self.assertEqual(get_results(self.TEST_OUTPUT_DIRECTORY + "1 workers/", file_name),
+                         get_results(self.TEST_OUTPUT_DIRECTORY + "2 workers/", file_name))
+
+    def test_no_games(self):
+        player_strategies = [(KeepNAndAbove(n=8, is_player=True), "keep 8")]
+        dealer_strategies = [(KeepNAndAbove(n=8, is_player=False), "keep 8")]
+        for use_batch_engine in [True, False]:
+            with self.assertRaises(ValueError):
+                Main.tournament(player_strategies, dealer_strategies, self.TEST_OUTPUT_DIRECTORY, GAMES_TO_AUTOPLAY=0,
+                                USE_BATCH_ENGINE=use_batch_engine)
+
+    def test_summary_of_statistics(self):
+        statistics = [[LeHer(RNG_SEED=seed).auto_play_statistics(100, True, SILENT_MODE=True) for seed in [1, 2]]]
+        summary = Main.tournament_summary(["keep 8"], ["keep 7", "keep 9"], statistics)
+        self.assertEqual(summary["dealer_strategies"].tolist(), ["keep 7", "keep 9"])
+        self.assertEqual(summary["player_wins"].tolist(), [[cell.player_wins for cell in statistics[0]]])
+        self.assertEqual(summary["score_difference_histograms"].sum(axis=2).tolist(), [[100, 100]])
+        self.assertAlmostEqual(summary["net_win_rate"][0, 1], statistics[0][1].net_win_rate)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,20 @@
+import unittest
+
+from code.Outcome import Outcome, pack_history, unpack_history, history_names
+
+
+class TestOutcome(unittest.TestCase):
+    def test_pack_and_unpack_history(self):
+        history = [Outcome.SUCCEEDED, Outcome.NOT_ATTEMPTED, Outcome.ATTEMPTED_BUT_FAILED]
+        history += [Outcome.NOT_ATTEMPTED] * 10
+        packed = pack_history(history)
+        self.assertLess(packed, 2 ** 27)
+        self.assertEqual(unpack_history(packed), history)
+        self.assertEqual(pack_history([outcome.name for outcome in history]), packed)
+        self.assertEqual(unpack_history(pack_history([])), [])
+
+    def test_history_names(self):
+        names = ["NOT_ATTEMPTED", "SUCCEEDED", "ATTEMPTED_BUT_FAILED"]
+        self.assertEqual(history_names([0, 1, 2]), names)
+        self.assertEqual(history_names(names), names)
+        self.assertEqual(history_names(pack_history(names)), names)
@@ -0,0 +1,53 @@
+import os
+import unittest
+
+from code.LeHer import LeHer
+from code.Progress import ProgressReporter, PrometheusTextfileOutput, PHASES
+
+
+class TestProgress(unittest.TestCase):
+    TEST_OUTPUT_DIRECTORY = "test_outputs/"
+
+    def test_reports_every_k_games(self):
+        reports = []
+        reporter = ProgressReporter([reports.append], every_games=100, every_seconds=None, phase_sample_every=7)
+        statistics = LeHer(RNG_SEED=3).auto_play_statistics(350, True, SILENT_MODE=True, PROGRESS=reporter)
+        self.assertEqual([report["games"] for report in reports], [100, 200, 300, 350])
+        self.assertEqual([report["finished"] for report in reports], [False, False, False, True])
+        self.assertEqual(reports[-1]["phase_samples"], 50)
+        self.assertEqual(set(reports[-1]["phase_seconds"]), set(PHASES))
+        # sampled games are played with play_game_timed, which has to play the same games as play_game
+        self.assertEqual(statistics.to_dict(), LeHer(RNG_SEED=3).auto_play_statistics(350, True, SILENT_MODE=True)
+                         .to_dict())
+
+    def test_reports_every_t_seconds(self):
+        ticks = iter(range(10 ** 6))
+        reports = []
+        reporter = ProgressReporter([reports.append], every_seconds=10, phase_sample_every=None,
+                                    clock=lambda: next(ticks))
+        next_check = reporter.start(1000)
+        played = 0
+        while played < 1000:
+            played = next_check
+            next_check = reporter.update(played)
+        reporter.finish(played)
+        # the clock advances by one second per call, the reporter checks about 4 times per report interval
+        self.assertTrue(all(0 < report["eta_seconds"] for report in reports[:-1]))
+        self.assertEqual(reports[-1]["games"], 1000)
+        self.assertTrue(len(reports) < played)
+
+    def test_prometheus_textfile(self):
+        file_path = self.TEST_OUTPUT_DIRECTORY + "progress.prom"
+        reporter = ProgressReporter([PrometheusTextfileOutput(file_path, run="test")], every_games=10,
+                                    phase_sample_every=5)
+        LeHer(RNG_SEED=3).auto_play_statistics(20, False, SILENT_MODE=True, PROGRESS=reporter)
+        with open(file_path) as metrics_file:
+            lines = metrics_file.read().splitlines()
+        os.remove(file_path)
+        self.assertIn('leher_games_played{run="test"} 20.0', lines)
+        self.assertIn("# TYPE leher_phase_seconds_per_game gauge", lines)
+        self.assertEqual(len([line for line in lines if line.startswith("leher_phase_seconds_per_game{")]), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
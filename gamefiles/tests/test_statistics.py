@@ -0,0 +1,53 @@
+import os
+import unittest
+
+import numpy as np
+
+from code.LeHer import LeHer
+from code.Statistics import GameStatistics
+
+
+class TestGameStatistics(unittest.TestCase):
+    TEST_OUTPUT_DIRECTORY = "test_outputs/"
+
+    def test_add_game_equals_add_batch_and_merge(self):
+        rng = np.random.default_rng(0)
+        player_scores = rng.integers(13, 170, size=500)
+        dealer_scores = rng.integers(13, 170, size=500)
+        histories = rng.integers(0, 3, size=(2, 500, 13))
+        names = ["NOT_ATTEMPTED", "SUCCEEDED", "ATTEMPTED_BUT_FAILED"]
+        single = GameStatistics()
+        for i in range(0, 500):
+            single.add_game(int(player_scores[i]), int(dealer_scores[i]), [names[code] for code in histories[0, i]],
+                            [names[code] for code in histories[1, i]])
+        merged = GameStatistics()
+        for start in range(0, 500, 150):
+            batch = GameStatistics()
+            batch.add_batch(player_scores[start:start + 150], dealer_scores[start:start + 150],
+                            histories[0, start:start + 150], histories[1, start:start + 150])
+            merged.merge(batch)
+        single_dict = single.to_dict()
+        merged_dict = merged.to_dict()
+        for key in ["score_difference_mean", "score_difference_variance", "score_difference_m2"]:
+            self.assertAlmostEqual(single_dict.pop(key), merged_dict.pop(key))
+        self.assertEqual(single_dict, merged_dict)
+        differences = player_scores - dealer_scores
+        self.assertAlmostEqual(single.score_difference_mean, differences.mean())
+        self.assertAlmostEqual(single.score_difference_variance, differences.var(ddof=1))
+        values, counts = np.unique(differences, return_counts=True)
+        self.assertEqual(single.score_difference_counts(values.tolist()), counts.tolist())
+        self.assertEqual(GameStatistics.from_dict(merged.to_dict()).score_difference_histogram,
+                         single.score_difference_histogram)
+
+    def test_same_counts_as_auto_play(self):
+        file_name = "statistics comparison.json"
+        if os.path.isfile(self.TEST_OUTPUT_DIRECTORY + file_name):
+            os.remove(self.TEST_OUTPUT_DIRECTORY + file_name)
+        results = LeHer(RNG_SEED=6).auto_play(300, self.TEST_OUTPUT_DIRECTORY, file_name, False, SILENT_MODE=True)
+        statistics = LeHer(RNG_SEED=6).auto_play_statistics(300, False, SILENT_MODE=True)
+        player_scores = np.array(results["player_scores"])
+        dealer_scores = np.array(results["dealer_scores"])
+        self.assertEqual(statistics.games, 300)
+        self.assertEqual(statistics.player_wins, np.count_nonzero(player_scores > dealer_scores))
+        self.assertEqual(statistics.draws, np.count_nonzero(player_scores == dealer_scores))
+        self.assertEqual(statistics.player_score_histogram, np.bincount(player_scores).tolist())
@@ -1,7 +1,8 @@
 import unittest
 
 from code.Decks import STANDARD_DECK
-from code.Strategies import KeepNAndAbove
+from code.Outcome import Outcome
+from code.Strategies import KeepNAndAbove, Strategy, TableStrategy
 from code.Scorer import standard_scorer
 
 
@@ -51,3 +52,66 @@ class TestKeepNAndAbove(unittest.TestCase):
                 revealed_player_cards=None, revealed_dealer_cards=None,
                 dealer_redraw_history=None, player_trade_history=None
             ), (standard_scorer(card) < 8))
+
+
+class TestDecisionTable(unittest.TestCase):
+    def test_decision_table_equals_action(self):
+        for n in range(1, 15):
+            for is_player in [True, False]:
+                strategy = KeepNAndAbove(n=n, is_player=is_player, scorer=standard_scorer)
+                table = strategy.decision_table(STANDARD_DECK)
+                for card, decision in zip(STANDARD_DECK, table):
+                    self.assertEqual(decision, strategy.action(
+                        my_cards=[card], current_turn=0,
+                        revealed_player_cards=None, revealed_dealer_cards=None,
+                        dealer_redraw_history=None, player_trade_history=None
+                    ))
+
+    def test_changed_threshold(self):
+        strategy = KeepNAndAbove(n=8, is_player=True)
+        arguments = dict(my_cards=["7S"], current_turn=0, revealed_player_cards=None, revealed_dealer_cards=None,
+                         dealer_redraw_history=None, player_trade_history=None)
+        self.assertTrue(strategy.action(**arguments))
+        strategy.threshold = 7
+        self.assertFalse(strategy.action(**arguments))
+        self.assertFalse(strategy.decision_table(["7S"])[0])
+
+    def test_stateful_strategy_has_no_decision_table(self):
+        strategy = Strategy(is_player=True)
+        self.assertFalse(strategy.STATELESS_BY_CARD)
+        self.assertRaises(NotImplementedError, strategy.decision_table, STANDARD_DECK)
+
+
+class TestTableStrategy(unittest.TestCase):
+    def test_looks_up_turn_card_and_outcome(self):
+        # card classes 2, 3 and king, the probabilities are indexed by the Outcome of the opponent
+        card_classes = [(2, False), (3, False), (13, True)]
+        table = [[[1, 0, 0], [0, 0, 0], [0, 0, 0]], [[0, 0, 1], [1, 1, 0], [0, 0, 0]]]
+        player_strategy = TableStrategy(table, card_classes, is_player=True)
+        # histories of Outcome names are looked up like histories of Outcomes
+        for cards, dealer_history, decision in [(["2S"], [], True), (["3S"], [], False),
+                                                (["KS", "2S"], ["NOT_ATTEMPTED"], False),
+                                                (["2S", "2H"], [Outcome.ATTEMPTED_BUT_FAILED], True),
+                                                (["2S", "3H"], [Outcome.SUCCEEDED], True)]:
+            self.assertEqual(player_strategy.action(
+                my_cards=cards, current_turn=len(cards) - 1,
+                revealed_player_cards=None, revealed_dealer_cards=None,
+                dealer_redraw_history=dealer_history, player_trade_history=None
+            ), decision)
+        dealer_strategy = TableStrategy(table, card_classes, is_player=False)
+        for cards, player_history, decision in [(["2S"], [Outcome.NOT_ATTEMPTED], True),
+                                                (["2S"], [Outcome.SUCCEEDED], False),
+                                                (["3S", "2D"], [Outcome.SUCCEEDED, Outcome.ATTEMPTED_BUT_FAILED],
+                                                 True)]:
+            self.assertEqual(dealer_strategy.action(
+                my_cards=cards, current_turn=len(cards) - 1,
+                revealed_player_cards=None, revealed_dealer_cards=None,
+                dealer_redraw_history=None, player_trade_history=player_history
+            ), decision)
+
+    def test_mixed_decisions(self):
+        strategy = TableStrategy([[[0.25, 0.25, 0.25]]], [(7, False)], is_player=True, rng_seed=1)
+        decisions = [strategy.action(my_cards=["7S"], current_turn=0, revealed_player_cards=None,
+                                     revealed_dealer_cards=None, dealer_redraw_history=None,
+                                     player_trade_history=None) for _ in range(0, 4000)]
+        self.assertAlmostEqual(sum(decisions) / len(decisions), 0.25, delta=0.03)
@@ -0,0 +1,47 @@
+import unittest
+
+from code.ExactEvaluator import evaluate_with_replacement
+from code.LeHer import LeHer
+from code.Strategies import KeepNAndAbove, KeepNAndAbovePerTurn
+from code import StrategySearch
+
+
+class TestStrategySearch(unittest.TestCase):
+    def test_best_response_close_to_exact_best(self):
+        dealer_ai = KeepNAndAbove(n=8, is_player=False)
+        result = StrategySearch.best_response(dealer_ai, True, rng_seed=3, tolerance=0.01)
+        exact_values = []
+        for n in StrategySearch.THRESHOLDS:
+            exact = evaluate_with_replacement(KeepNAndAbove(n=n, is_player=True), dealer_ai)
+            exact_values.append(exact["win_rate"] - exact["dealer_win_rate"])
+        # the remaining candidates can only be told apart to within the tolerance on both sides
+        self.assertLess(max(exact_values) - exact_values[result["best"]], 0.04)
+        self.assertNotIn(0, result["remaining"])
+        self.assertNotIn(13, result["remaining"])
+
+    def test_race_drops_clearly_worse_matchup_early(self):
+        dealer_ai = KeepNAndAbove(n=8, is_player=False)
+        player_ais = [KeepNAndAbove(n=1, is_player=True), KeepNAndAbove(n=8, is_player=True)]
+        result = StrategySearch.race(player_ais, [dealer_ai] * 2, True, rng_seed=4, batch_games=5000)
+        self.assertEqual(result["best"], 1)
+        self.assertEqual(result["remaining"], [1])
+        self.assertEqual(result["games"], 10000)
+
+    def test_per_turn_strategy_with_constant_thresholds_plays_like_keep_n_and_above(self):
+        for remove_drawn_cards_from_deck in [True, False]:
+            results = []
+            for player_ai in [KeepNAndAbove(n=7, is_player=True), KeepNAndAbovePerTurn([7] * 13, is_player=True)]:
+                game = LeHer(PLAYER_AI=player_ai, RNG_SEED=5)
+                results.append(game.batch_play(1000, remove_drawn_cards_from_deck)["player_scores"].tolist())
+            self.assertEqual(results[0], results[1])
+
+    def test_approximate_equilibrium_estimates_the_returned_pair(self):
+        result = StrategySearch.approximate_equilibrium(rng_seed=1, turns=1, batch_games=5000, max_games=20000,
+                                                        tolerance=0.02)
+        exact = evaluate_with_replacement(result["player_ai"], result["dealer_ai"], turns=1)
+        # the estimate is about the returned pair, fails by chance with p < 0.0001
+        self.assertLess(abs(result["estimate"]["value"] - (exact["win_rate"] - exact["dealer_win_rate"])),
+                        4 / 1.96 * result["estimate"]["half_width"])
+        self.assertGreater(result["games"], result["estimate"]["games"])
+        with self.assertRaises(ValueError):
+            StrategySearch.approximate_equilibrium(KeepNAndAbovePerTurn([8], is_player=True), turns=1)